@@ -3,4 +3,16 @@ from django.core.asgi import get_asgi_application
 
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# importado depois do setup do Django (usa models)
+from scheduler.push import sse_app  # noqa: E402
+
+# Caminho atendido direto pelo app SSE, sem passar pelo Django
+PUSH_STREAM_PATH = '/api/stream/'
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'] == PUSH_STREAM_PATH:
+        return await sse_app(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -2,21 +2,34 @@ import os
 from celery import Celery
 from django.conf import settings
 
+from app.metrics import install_celery_signals
+
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
 
 celery_app = Celery("app")
 celery_app.config_from_object("django.conf:settings", namespace="CELERY")
 celery_app.autodiscover_tasks()
 
+# Duração e consultas SQL por task (expostas em /metrics)
+install_celery_signals()
+
 # Alinhar timezone com o Django
 celery_app.conf.timezone = settings.TIME_ZONE
 celery_app.conf.enable_utc = False
 
-# Agenda do Beat: roda a cada 60s
+# Agenda do Beat: varredura a cada REMINDER_SWEEP_SECONDS (padrão 60s)
 celery_app.conf.beat_schedule = {
     "check-due-reminders-every-minute": {
         "task": "scheduler.check_due_reminders",
-        "schedule": 60.0,
+        "schedule": settings.REMINDER_SWEEP_SECONDS,
+    },
+    "materialize-recurring-reminders": {
+        "task": "scheduler.materialize_recurring_reminders",
+        "schedule": 15 * 60.0,
+    },
+    "compact-notification-logs": {
+        "task": "scheduler.compact_notification_logs",
+        "schedule": 60 * 60.0,
     },
 }
 
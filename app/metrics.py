@@ -0,0 +1,219 @@
+"""
+Latência, nº de consultas SQL e tempo de banco por view e por task Celery.
+
+Os histogramas vivem na memória de cada processo (web, asgi, worker) e são
+expostos em ``/metrics`` no formato texto do Prometheus; cada processo é um
+alvo de scrape. As consultas são contadas por ``execute_wrapper`` nas conexões
+da thread que atende a requisição/task, então não há custo fora delas.
+
+Com ``METRICS_SLOW_REQUEST_MS`` as requisições/tasks acima do limite vão para o
+log ``app.metrics`` com as ``METRICS_SLOW_QUERY_COUNT`` consultas mais pesadas.
+"""
+import heapq
+import logging
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def histogram_lines(name, documentation, label, buckets, series) -> list[str]:
+    """``series``: ``(valor do label, contagens cumulativas por bucket, soma, total)``."""
+    lines = [f'# HELP {name} {documentation}', f'# TYPE {name} histogram']
+    for label_value, counts, total, count in series:
+        pair = f'{label}="{_escape(label_value)}"'
+        for bound, n in zip(buckets, counts):
+            lines.append(f'{name}_bucket{{{pair},le="{bound:g}"}} {n}')
+        lines.append(f'{name}_bucket{{{pair},le="+Inf"}} {count}')
+        lines.append(f'{name}_sum{{{pair}}} {total:.6f}')
+        lines.append(f'{name}_count{{{pair}}} {count}')
+    return lines
+
+
+def metric_lines(name, documentation, kind, value) -> list[str]:
+    """Uma métrica sem labels (``gauge`` ou ``counter``)."""
+    return [f'# HELP {name} {documentation}', f'# TYPE {name} {kind}', f'{name} {value:g}']
+
+
+class Histogram:
+    """Histograma cumulativo com um único label; seguro entre threads."""
+
+    def __init__(self, name, documentation, label, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_value, value) -> None:
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                # contagem por bucket, soma, total
+                series = self._series[label_value] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list[str]:
+        with self._lock:
+            snapshot = [(k, list(v[0]), v[1], v[2]) for k, v in sorted(self._series.items())]
+        return histogram_lines(self.name, self.documentation, self.label, self.buckets, snapshot)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+REQUEST_LATENCY = Histogram('http_request_duration_seconds', 'Latência das requisições por view.', 'view', LATENCY_BUCKETS)
+REQUEST_QUERIES = Histogram('http_request_queries', 'Consultas SQL por requisição.', 'view', QUERY_BUCKETS)
+REQUEST_DB_TIME = Histogram('http_request_db_seconds', 'Tempo de banco por requisição.', 'view', LATENCY_BUCKETS)
+TASK_LATENCY = Histogram('celery_task_duration_seconds', 'Duração das tasks Celery.', 'task', LATENCY_BUCKETS)
+TASK_QUERIES = Histogram('celery_task_queries', 'Consultas SQL por task.', 'task', QUERY_BUCKETS)
+TASK_DB_TIME = Histogram('celery_task_db_seconds', 'Tempo de banco por task.', 'task', LATENCY_BUCKETS)
+
+REGISTRY = [REQUEST_LATENCY, REQUEST_QUERIES, REQUEST_DB_TIME, TASK_LATENCY, TASK_QUERIES, TASK_DB_TIME]
+# funções sem argumentos que devolvem linhas extras (ex.: scheduler.monitoring)
+COLLECTORS = []
+
+
+def register_collector(func):
+    if func not in COLLECTORS:
+        COLLECTORS.append(func)
+    return func
+
+
+class QueryStats:
+    """``execute_wrapper`` que soma consultas e tempo e guarda as ``keep`` mais pesadas."""
+
+    def __init__(self, keep=0):
+        self.queries = 0
+        self.seconds = 0.0
+        self.keep = keep
+        self.heaviest = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.seconds += elapsed
+            if self.keep:
+                item = (elapsed, self.queries, sql)
+                if len(self.heaviest) < self.keep:
+                    heapq.heappush(self.heaviest, item)
+                else:
+                    heapq.heappushpop(self.heaviest, item)
+
+
+def _slow_keep() -> int:
+    return settings.METRICS_SLOW_QUERY_COUNT if settings.METRICS_SLOW_REQUEST_MS else 0
+
+
+@contextmanager
+def track_queries(keep=0):
+    stats = QueryStats(keep)
+    with ExitStack() as stack:
+        for conn in connections.all():
+            stack.enter_context(conn.execute_wrapper(stats))
+        yield stats
+
+
+def _log_if_slow(kind, name, elapsed, stats) -> None:
+    threshold = settings.METRICS_SLOW_REQUEST_MS
+    if not threshold or elapsed * 1000 < threshold:
+        return
+    heaviest = ''.join(
+        f'\n  {seconds * 1000:.1f}ms {sql[:500]}' for seconds, _, sql in sorted(stats.heaviest, reverse=True)
+    )
+    logger.warning(
+        '%s lenta: %s em %.1fms, %d consultas (%.1fms de banco)%s',
+        kind, name, elapsed * 1000, stats.queries, stats.seconds * 1000, heaviest,
+    )
+
+
+class MetricsMiddleware:
+    """Deve ser o primeiro middleware: mede a requisição inteira."""
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        with track_queries(_slow_keep()) as stats:
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else '<unresolved>'
+        REQUEST_LATENCY.observe(view, elapsed)
+        REQUEST_QUERIES.observe(view, stats.queries)
+        REQUEST_DB_TIME.observe(view, stats.seconds)
+        _log_if_slow('Requisição', f'{request.method} {view}', elapsed, stats)
+        return response
+
+
+_running_tasks = {}
+
+
+def _task_prerun(task_id=None, task=None, **kwargs):
+    if not settings.METRICS_ENABLED:
+        return
+    stack = ExitStack()
+    stats = stack.enter_context(track_queries(_slow_keep()))
+    _running_tasks[task_id] = (time.perf_counter(), stack, stats)
+
+
+def _task_postrun(task_id=None, task=None, **kwargs):
+    running = _running_tasks.pop(task_id, None)
+    if running is None:
+        return
+    started, stack, stats = running
+    stack.close()
+    elapsed = time.perf_counter() - started
+    TASK_LATENCY.observe(task.name, elapsed)
+    TASK_QUERIES.observe(task.name, stats.queries)
+    TASK_DB_TIME.observe(task.name, stats.seconds)
+    _log_if_slow('Task', task.name, elapsed, stats)
+
+
+def install_celery_signals() -> None:
+    from celery.signals import task_postrun, task_prerun
+    task_prerun.connect(_task_prerun, weak=False, dispatch_uid='app.metrics.prerun')
+    task_postrun.connect(_task_postrun, weak=False, dispatch_uid='app.metrics.postrun')
+
+
+def render() -> str:
+    lines = []
+    for histogram in REGISTRY:
+        lines.extend(histogram.render())
+    for collector in COLLECTORS:
+        lines.extend(collector())
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    token = settings.METRICS_TOKEN
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponse('Token inválido.', status=403, content_type='text/plain; charset=utf-8')
+    return HttpResponse(render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,4 +1,6 @@
 from pathlib import Path
+from urllib.parse import urlsplit
+
 import environ
 
 
@@ -34,6 +36,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # primeiro: mede a requisição inteira (ver app/metrics.py)
+    "app.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -57,6 +61,7 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "scheduler.context_processors.push",
             ],
         },
     },
@@ -130,10 +135,24 @@ REST_FRAMEWORK = {
         "rest_framework.filters.SearchFilter",
     ],
 }
+# Listagens usam paginação por cursor (ver scheduler/pagination.py); tamanho padrão da página
+API_PAGE_SIZE = env.int("API_PAGE_SIZE", default=50)
 
 # CORS
 CORS_ALLOWED_ORIGINS = env.list("CORS_ALLOWED_ORIGINS", default=[])
 
+# Cache compartilhado entre web/worker/scheduler: as versões por usuário e a da agenda de
+# lembretes são escritas fora do processo web. Sem CACHE_URL usa o Redis de REDIS_URL (banco 2);
+# locmem só num processo único (dev/testes). "check --deploy" falha com cache local (scheduler.E001).
+REDIS_URL = env("REDIS_URL", default="")
+CACHES = {
+    "default": env.cache(
+        "CACHE_URL",
+        # troca só o path (o banco): redis://redis:6379 e redis://redis:6379/0 viram .../2
+        default=urlsplit(REDIS_URL)._replace(path="/2").geturl() if REDIS_URL else "locmemcache://",
+    ),
+}
+
 # E-mail
 EMAIL_BACKEND = env(
     "EMAIL_BACKEND",
@@ -149,5 +168,86 @@ CELERY_TIMEZONE = TIME_ZONE
 CELERY_TASK_TIME_LIMIT = 60
 CELERY_TASK_SOFT_TIME_LIMIT = 45
 
+# Despacho de lembretes
+# Com FANOUT=True cada lote reservado vira uma task separada (escala com nº de workers)
+REMINDER_DISPATCH_FANOUT = env.bool("REMINDER_DISPATCH_FANOUT", default=False)
+REMINDER_CLAIM_BATCH_SIZE = env.int("REMINDER_CLAIM_BATCH_SIZE", default=100)
+# O lease precisa durar mais que uma task, senão outro worker pode reservar de novo
+REMINDER_CLAIM_LEASE_SECONDS = env.int("REMINDER_CLAIM_LEASE_SECONDS", default=CELERY_TASK_TIME_LIMIT * 2)
+REMINDER_MAX_BATCHES_PER_RUN = env.int("REMINDER_MAX_BATCHES_PER_RUN", default=50)
+# Uma execução do despacho para de reservar lotes depois de N s (fica abaixo do soft time limit
+# com folga para o último lote) e agenda a continuação; o outbox é o checkpoint
+REMINDER_DISPATCH_BUDGET_SECONDS = env.float("REMINDER_DISPATCH_BUDGET_SECONDS", default=CELERY_TASK_SOFT_TIME_LIMIT / 2)
+# Lembretes vencidos de eventos que já terminaram (ex.: depois de uma queda do SMTP):
+# "send" envia assim mesmo, "expire" descarta, "summary" descarta e deixa um aviso in-app por usuário
+REMINDER_STALE_POLICY = env("REMINDER_STALE_POLICY", default="summary")
+# ...só depois de N s do fim: evento sem duração (ICS sem DTEND) termina no mesmo instante em que o
+# lembrete "na hora" vence, e ainda precisa recebê-lo
+REMINDER_STALE_GRACE_SECONDS = env.int("REMINDER_STALE_GRACE_SECONDS", default=900)
+# Resultados do envio são gravados em blocos (bulk) deste tamanho
+REMINDER_PERSIST_CHUNK_SIZE = env.int("REMINDER_PERSIST_CHUNK_SIZE", default=25)
+# Digest: lembretes do mesmo usuário que vencem em até N s saem num e-mail só (0 desliga)
+REMINDER_DIGEST_WINDOW_SECONDS = env.int("REMINDER_DIGEST_WINDOW_SECONDS", default=300)
+# Canal webhook: entregas simultâneas (e conexões keep-alive por host) e timeout de cada POST
+WEBHOOK_CONCURRENCY = env.int("WEBHOOK_CONCURRENCY", default=8)
+WEBHOOK_TIMEOUT_SECONDS = env.float("WEBHOOK_TIMEOUT_SECONDS", default=5.0)
+# Webhooks só para endereços públicos (sem loopback/rede privada/link-local); True só em desenvolvimento
+WEBHOOK_ALLOW_PRIVATE = env.bool("WEBHOOK_ALLOW_PRIVATE", default=False)
+# Push (SSE em /api/stream/, só sob ASGI): Redis pub/sub entre processos; vazio = só no processo
+PUSH_REDIS_URL = env("PUSH_REDIS_URL", default="")
+# Páginas servidas por WSGI só abrem o SSE se um proxy encaminha /api/stream/ ao serviço asgi
+PUSH_STREAM_ENABLED = env.bool("PUSH_STREAM_ENABLED", default=False)
+PUSH_KEEPALIVE_SECONDS = env.float("PUSH_KEEPALIVE_SECONDS", default=25.0)
+PUSH_QUEUE_SIZE = env.int("PUSH_QUEUE_SIZE", default=100)
+# Falhas: nova tentativa após BASE * 2^(n-1) s (até MAX); depois de MAX_ATTEMPTS vai para o dead-letter
+REMINDER_RETRY_BASE_SECONDS = env.int("REMINDER_RETRY_BASE_SECONDS", default=60)
+REMINDER_RETRY_MAX_SECONDS = env.int("REMINDER_RETRY_MAX_SECONDS", default=6 * 3600)
+REMINDER_MAX_ATTEMPTS = env.int("REMINDER_MAX_ATTEMPTS", default=6)
+# /health/ fica "degraded" quando o lembrete vencido mais antigo passa deste atraso (s)
+REMINDER_LAG_DEGRADED_SECONDS = env.int("REMINDER_LAG_DEGRADED_SECONDS", default=300)
+# Varredura do beat; com o scheduler dedicado (run_reminder_scheduler) pode ser espaçada
+REMINDER_SWEEP_SECONDS = env.float("REMINDER_SWEEP_SECONDS", default=60.0)
+# Scheduler dedicado: janela pré-carregada em memória e precisão do disparo
+REMINDER_WINDOW_MINUTES = env.int("REMINDER_WINDOW_MINUTES", default=10)
+REMINDER_SCHEDULER_TICK_SECONDS = env.float("REMINDER_SCHEDULER_TICK_SECONDS", default=1.0)
+# Vários schedulers dedicados dividem o outbox em N shards (por usuário) com leases no banco.
+# Mudar REMINDER_SHARDS com lembretes pendentes exige "manage.py reshard_outbox".
+REMINDER_SHARDS = env.int("REMINDER_SHARDS", default=16)
+# Nó que não renova em N s perde os shards (heartbeat a cada N/3 s)
+REMINDER_SHARD_LEASE_SECONDS = env.int("REMINDER_SHARD_LEASE_SECONDS", default=30)
+# Séries recorrentes: lembretes só são materializados até este horizonte
+REMINDER_RECURRENCE_HORIZON_HOURS = env.int("REMINDER_RECURRENCE_HORIZON_HOURS", default=48)
+EVENT_OCCURRENCES_MAX_DAYS = env.int("EVENT_OCCURRENCES_MAX_DAYS", default=366)
+# Limites das regras RRULE (COUNT e distância do UNTIL ao início), para a série caber numa requisição
+RECURRENCE_MAX_COUNT = env.int("RECURRENCE_MAX_COUNT", default=1000)
+RECURRENCE_MAX_YEARS = env.int("RECURRENCE_MAX_YEARS", default=10)
+# check_conflicts de uma série nova/alterada olha as ocorrências dos próximos N dias
+CONFLICT_HORIZON_DAYS = env.int("CONFLICT_HORIZON_DAYS", default=90)
+# Import de ICS: eventos gravados por bulk_create
+ICS_IMPORT_BATCH_SIZE = env.int("ICS_IMPORT_BATCH_SIZE", default=500)
+# POST /api/events/batch/: limite de itens (upserts + deletes) por requisição
+EVENT_BATCH_MAX_ITEMS = env.int("EVENT_BATCH_MAX_ITEMS", default=500)
+
+# Free/busy: limites da consulta e TTL do cache (a invalidação é por versão do usuário)
+FREEBUSY_MAX_USERS = env.int("FREEBUSY_MAX_USERS", default=20)
+FREEBUSY_MAX_DAYS = env.int("FREEBUSY_MAX_DAYS", default=62)
+FREEBUSY_CACHE_SECONDS = env.int("FREEBUSY_CACHE_SECONDS", default=3600)
+
+# Retenção do NotificationLog: logs vencidos viram contagens diárias (NotificationDailyStat)
+NOTIFICATION_LOG_RETENTION_DAYS = env.int("NOTIFICATION_LOG_RETENTION_DAYS", default=90)
+NOTIFICATION_LOG_FAILED_RETENTION_DAYS = env.int("NOTIFICATION_LOG_FAILED_RETENTION_DAYS", default=7)
+NOTIFICATION_PURGE_BATCH_SIZE = env.int("NOTIFICATION_PURGE_BATCH_SIZE", default=1000)
+NOTIFICATION_PURGE_MAX_BATCHES = env.int("NOTIFICATION_PURGE_MAX_BATCHES", default=200)
+
+# Cache das respostas de /api/events/ (lista e detalhe), versionado por usuário; 0 desliga
+EVENT_RESPONSE_CACHE_SECONDS = env.int("EVENT_RESPONSE_CACHE_SECONDS", default=900)
+
+# /metrics (Prometheus): latência e consultas por view/task; com token exige "Authorization: Bearer <token>"
+METRICS_ENABLED = env.bool("METRICS_ENABLED", default=True)
+METRICS_TOKEN = env("METRICS_TOKEN", default="")
+# Requisições/tasks acima do limite (ms) vão para o log com as consultas mais pesadas; 0 desliga
+METRICS_SLOW_REQUEST_MS = env.float("METRICS_SLOW_REQUEST_MS", default=1000.0)
+METRICS_SLOW_QUERY_COUNT = env.int("METRICS_SLOW_QUERY_COUNT", default=5)
+
 LOGIN_REDIRECT_URL = "home"
 LOGOUT_REDIRECT_URL = "home"
\ No newline at end of file
@@ -6,15 +6,20 @@ from django.http import JsonResponse
 from django.views.generic import TemplateView
 from django.db import connection
 from rest_framework.authtoken.views import obtain_auth_token
+from app.metrics import metrics_view
 from app.views_accounts import signup
+from scheduler import monitoring
 
 
 def health(_):
+    reminders = monitoring.health()
     return JsonResponse({
-        'status': 'ok',
+        # degraded: lembretes atrasados além de REMINDER_LAG_DEGRADED_SECONDS
+        'status': reminders['status'],
         'db': connection.vendor,
         'engine': connection.settings_dict['ENGINE'],
         'name': connection.settings_dict['NAME'],
+        'reminders': reminders,
     })
 
 
@@ -27,6 +32,9 @@ urlpatterns = [
     # Health-check com info do DB
     path('health/', health, name='health'),
 
+    # Métricas no formato do Prometheus (por processo)
+    path('metrics', metrics_view, name='metrics'),
+
     # Auth por token (DRF)
     path('api/auth/token/', obtain_auth_token, name='api-token'),
 
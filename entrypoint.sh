@@ -20,6 +20,9 @@ if [[ "$role" != "web" ]]; then
   wait_for redis 6379
 fi
 
+# Falha cedo em configuração que quebra com vários processos (ex.: cache local)
+python manage.py check --deploy --fail-level ERROR
+
 python manage.py migrate --noinput
 
 case "$role" in
@@ -29,12 +32,19 @@ case "$role" in
     python manage.py collectstatic --noinput
     exec python manage.py runserver 0.0.0.0:8000
     ;;
+  asgi)
+    # ASGI (inclui o push SSE em /api/stream/)
+    exec python -m uvicorn app.asgi:application --host 0.0.0.0 --port 8000
+    ;;
   worker)
     exec celery -A app.celery worker -l info
     ;;
   beat)
     exec celery -A app.celery beat -l info
     ;;
+  scheduler)
+    exec python manage.py run_reminder_scheduler
+    ;;
   *)
     exec "$@"
     ;;
@@ -1,22 +1,96 @@
 from django.contrib import admin
-from .models import Event, Reminder, NotificationLog
+from .models import (
+    CalendarFeed, Event, InAppNotification, Reminder, ReminderOutbox, NotificationDailyStat, NotificationLog,
+    SchedulerNode, ShardLease, WebhookEndpoint,
+)
+from .services import requeue_reminders
 
 
 @admin.register(Event)
 class EventAdmin(admin.ModelAdmin):
     list_display = ('title', 'owner', 'start', 'end', 'is_all_day')
+    list_select_related = ('owner',)
     list_filter = ('is_all_day',)
     search_fields = ('title', 'description', 'location')
     autocomplete_fields = ('owner',)
 
 @admin.register(Reminder)
 class ReminderAdmin(admin.ModelAdmin):
-    list_display = ('event', 'minutes_before', 'channel', 'scheduled_for', 'is_sent', 'sent_at')
-    list_filter = ('channel', 'is_sent')
+    list_display = ('event', 'minutes_before', 'channel', 'scheduled_for', 'is_sent', 'sent_at', 'attempts', 'dead_lettered_at')
+    list_select_related = ('event',)
+    list_filter = ('channel', 'is_sent', ('dead_lettered_at', admin.EmptyFieldListFilter))
     search_fields = ('event__title',)
+    readonly_fields = ('attempts', 'next_attempt_at', 'last_error', 'dead_lettered_at')
+    actions = ['requeue']
+
+    @admin.action(description='Devolver à fila (zera tentativas)')
+    def requeue(self, request, queryset):
+        count = requeue_reminders(queryset)
+        self.message_user(request, f'{count} lembrete(s) devolvido(s) à fila.')
+
+@admin.register(ReminderOutbox)
+class ReminderOutboxAdmin(admin.ModelAdmin):
+    # a fila é mantida pelo código (outbox.sync_outbox): só leitura aqui
+    list_display = ('title', 'recipient', 'channel', 'shard', 'due_at', 'claimed_by', 'claimed_until')
+    list_filter = ('channel', 'shard')
+    search_fields = ('title', 'recipient')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(SchedulerNode)
+class SchedulerNodeAdmin(admin.ModelAdmin):
+    list_display = ('name', 'last_seen')
+
+    def has_add_permission(self, request):
+        return False
+
+@admin.register(ShardLease)
+class ShardLeaseAdmin(admin.ModelAdmin):
+    # a divisão é feita pelos nós (scheduler/sharding.py): só leitura aqui
+    list_display = ('shard', 'owner', 'expires_at')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
 
 @admin.register(NotificationLog)
 class NotificationAdmin(admin.ModelAdmin):
     list_display = ('event', 'user', 'channel', 'status', 'created_at')
+    list_select_related = ('event', 'user')
+    list_filter = ('status', 'channel')
+    search_fields = ('event__title', 'user__username')
+
+@admin.register(NotificationDailyStat)
+class NotificationDailyStatAdmin(admin.ModelAdmin):
+    list_display = ('day', 'user', 'channel', 'status', 'count')
+    list_select_related = ('user',)
     list_filter = ('status', 'channel')
-    search_fields = ('event__title', 'user__username')
\ No newline at end of file
+    search_fields = ('user__username',)
+    date_hierarchy = 'day'
+
+@admin.register(CalendarFeed)
+class CalendarFeedAdmin(admin.ModelAdmin):
+    list_display = ('user', 'created_at')
+    list_select_related = ('user',)
+    search_fields = ('user__username',)
+    readonly_fields = ('token',)
+
+@admin.register(WebhookEndpoint)
+class WebhookEndpointAdmin(admin.ModelAdmin):
+    list_display = ('user', 'url', 'is_active', 'created_at')
+    list_select_related = ('user',)
+    list_filter = ('is_active',)
+    search_fields = ('user__username', 'url')
+    readonly_fields = ('secret',)
+
+@admin.register(InAppNotification)
+class InAppNotificationAdmin(admin.ModelAdmin):
+    list_display = ('title', 'user', 'created_at', 'read_at')
+    list_select_related = ('user',)
+    search_fields = ('title', 'user__username')
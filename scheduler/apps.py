@@ -4,4 +4,9 @@ from django.apps import AppConfig
 class SchedulerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'scheduler'
-    verbose_name = 'Agenda & Lembretes'
\ No newline at end of file
+    verbose_name = 'Agenda & Lembretes'
+
+    def ready(self):
+        from app.metrics import register_collector
+        from . import checks, monitoring, signals  # noqa: F401
+        register_collector(monitoring.render_metrics)
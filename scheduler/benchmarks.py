@@ -0,0 +1,344 @@
+"""
+Massa de dados sintética e benchmarks repetíveis do agendador.
+
+``generate_dataset`` cria usuários, eventos, lembretes e histórico de envios
+com distribuições fixas por ``seed`` (ver ``manage.py generate_scheduler_data``).
+``run_benchmarks`` mede os cenários registrados com ``@scenario`` e devolve,
+por cenário, percentis de latência, consultas SQL e pico de memória; o
+resultado é gravado em JSON para comparar execuções
+(ver ``manage.py run_scheduler_benchmarks``).
+"""
+import json
+import platform
+import random
+import statistics
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core import mail
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from . import recurrence as rec
+from .caching import bump_user_version
+from . import outbox
+from .models import Event, NotificationLog, Reminder
+
+User = get_user_model()
+
+# (valor, peso)
+DURATIONS = [(15, 10), (30, 35), (45, 10), (60, 25), (90, 8), (120, 8), (240, 4)]
+REMINDER_COUNTS = [(0, 20), (1, 50), (2, 22), (3, 8)]
+REMINDER_MINUTES = [(5, 15), (10, 25), (15, 25), (30, 15), (60, 12), (1440, 8)]
+CHANNELS = [(Reminder.CHANNEL_EMAIL, 80), (Reminder.CHANNEL_INAPP, 15), (Reminder.CHANNEL_WEBHOOK, 5)]
+RECURRENCES = ['FREQ=WEEKLY', 'FREQ=DAILY;COUNT=10', 'FREQ=WEEKLY;BYDAY=MO,WE,FR;COUNT=12', 'FREQ=MONTHLY']
+ALL_DAY_RATE = 0.1
+RECURRING_RATE = 0.05
+FAILED_RATE = 0.03
+
+WORDS = [
+    'reunião', 'planning', 'review', 'retro', 'standup', 'cliente', 'projeto', 'orçamento',
+    'entrevista', 'dentista', 'academia', 'almoço', 'treinamento', 'deploy', 'relatório', 'viagem',
+]
+PLACES = ['', '', 'Sala 1', 'Sala 2', 'Auditório', 'Remoto', 'Escritório', 'Café']
+
+
+def _pick(rng, weighted):
+    values, weights = zip(*weighted)
+    return rng.choices(values, weights)[0]
+
+
+def generate_dataset(users=100, events_per_user=50, seed=0, history_days=30, prefix='bench', now=None):
+    """
+    Cria ``users`` usuários ``<prefix>NNNNNN`` com eventos espalhados entre
+    ``history_days`` atrás e 60 dias à frente. Lembretes de ocorrências já
+    passadas saem como enviados, cada um com seu ``NotificationLog``
+    (``FAILED_RATE`` deles com falha). Tudo via ``bulk_create``.
+    """
+    rng = random.Random(seed)
+    now = (now or timezone.now()).replace(second=0, microsecond=0)
+    password = make_password('bench-Passw0rd!')
+
+    with transaction.atomic():
+        owners = User.objects.bulk_create([
+            User(username=f'{prefix}{i:06d}', email=f'{prefix}{i:06d}@example.com', password=password)
+            for i in range(users)
+        ])
+
+        events = []
+        for owner in owners:
+            for _ in range(events_per_user):
+                start = now + timedelta(minutes=rng.randint(-history_days * 24 * 60, 60 * 24 * 60))
+                start = start.replace(minute=start.minute - start.minute % 15)
+                ev = Event(
+                    owner=owner, title=' '.join(rng.sample(WORDS, rng.randint(1, 3))).capitalize(),
+                    description=' '.join(rng.choices(WORDS, k=rng.randint(0, 12))),
+                    location=rng.choice(PLACES), start=start,
+                    end=start + timedelta(minutes=_pick(rng, DURATIONS)),
+                )
+                if rng.random() < ALL_DAY_RATE:
+                    ev.is_all_day = True
+                    ev.start = start.replace(hour=0, minute=0)
+                    ev.end = start.replace(hour=23, minute=59, second=59)
+                elif rng.random() < RECURRING_RATE:
+                    ev.recurrence = rng.choice(RECURRENCES)
+                    ev.recurrence_end = rec.series_end(ev)
+                events.append(ev)
+        Event.objects.bulk_create(events, batch_size=1000)
+
+        reminders = []
+        for ev in events:
+            count = _pick(rng, REMINDER_COUNTS)
+            for minutes in sorted({_pick(rng, REMINDER_MINUTES) for _ in range(count)}):
+                r = Reminder(event=ev, minutes_before=minutes, channel=_pick(rng, CHANNELS))
+                r.scheduled_for = r.compute_scheduled_for()
+                if r.scheduled_for < now:
+                    r.is_sent, r.sent_at = True, r.scheduled_for
+                reminders.append(r)
+        Reminder.objects.bulk_create(reminders, batch_size=1000)
+        outbox.enqueue(reminders)
+
+        logs = []
+        for r in reminders:
+            if not r.is_sent:
+                continue
+            failed = rng.random() < FAILED_RATE
+            logs.append(NotificationLog(
+                event=r.event, reminder=r, user_id=r.event.owner_id, channel=r.channel,
+                status=NotificationLog.STATUS_FAILED if failed else NotificationLog.STATUS_SENT,
+                error_message='Falha sintética' if failed else '',
+            ))
+        NotificationLog.objects.bulk_create(logs, batch_size=1000)
+        # created_at é auto_now_add: o histórico é reposicionado com um UPDATE por hora
+        hours = {}
+        for log in logs:
+            hours.setdefault(log.reminder.sent_at.replace(minute=0), []).append(log.pk)
+        for hour, pks in hours.items():
+            NotificationLog.objects.filter(pk__in=pks).update(created_at=hour)
+
+    return {'users': len(owners), 'events': len(events), 'reminders': len(reminders), 'logs': len(logs)}
+
+
+def delete_dataset(prefix='bench') -> int:
+    """Remove os usuários sintéticos (e, em cascata, tudo o que é deles)."""
+    deleted, _ = User.objects.filter(username__startswith=prefix).delete()
+    return deleted
+
+
+_scenarios = {}
+
+
+def scenario(name):
+    """
+    Registra um cenário: um context manager que prepara o estado (fora da
+    medição) e entrega a função cronometrada.
+    """
+    def decorator(func):
+        _scenarios[name] = contextmanager(func)
+        return func
+    return decorator
+
+
+def scenario_names():
+    return list(_scenarios)
+
+
+class Context:
+    def __init__(self, prefix='bench', backlog=1000):
+        self.prefix = prefix
+        self.backlog = backlog
+        # o usuário com mais eventos: o pior caso das listagens
+        self.user = (
+            User.objects.filter(username__startswith=prefix)
+            .annotate(n=Count('events')).order_by('-n', 'pk').first()
+        )
+        if self.user is None:
+            raise LookupError(f'Nenhum usuário "{prefix}*": gere a massa com generate_scheduler_data.')
+        self.event = Event.objects.filter(owner=self.user).order_by('pk').first()
+        words = Event.objects.filter(owner=self.user).values_list('title', flat=True)[:1]
+        self.search_term = words[0].split()[0] if words else WORDS[0]
+        self.client = Client()
+        self.client.force_login(self.user)
+
+
+def _get(ctx, path, params=None, headers=None):
+    def request():
+        resp = ctx.client.get(path, params or {}, headers=headers or {})
+        if resp.status_code != 200:
+            raise RuntimeError(f'GET {path} respondeu {resp.status_code}')
+        # força a renderização completa do corpo
+        return len(resp.content)
+    return request
+
+
+@scenario('reminders.drain')
+def _drain(ctx):
+    from .tasks import dispatch_due_reminders
+    with transaction.atomic():
+        now = timezone.now()
+        pks = list(
+            Reminder.objects.filter(event__owner__username__startswith=ctx.prefix)
+            .order_by('pk').values_list('pk', flat=True)[:ctx.backlog]
+        )
+        Reminder.objects.filter(pk__in=pks).update(
+            scheduled_for=now - timedelta(minutes=1), is_sent=False, sent_at=None,
+            attempts=0, next_attempt_at=None, last_error='', dead_lettered_at=None,
+        )
+        outbox.sync_outbox(pks)
+        mail.outbox = []
+        yield dispatch_due_reminders
+        # cada repetição drena o mesmo backlog
+        transaction.set_rollback(True)
+
+
+@scenario('api.events.list')
+def _events_list(ctx):
+    bump_user_version(ctx.user.pk)  # sem cache de resposta
+    yield _get(ctx, '/api/events/')
+
+
+@scenario('api.events.list.cached')
+def _events_list_cached(ctx):
+    yield _get(ctx, '/api/events/')
+
+
+@scenario('api.events.filter')
+def _events_filter(ctx):
+    bump_user_version(ctx.user.pk)
+    now = timezone.now()
+    yield _get(ctx, '/api/events/', {
+        'start_after': now.isoformat(), 'end_before': (now + timedelta(days=14)).isoformat(),
+        'is_all_day': 'false', 'ordering': 'start',
+    })
+
+
+@scenario('api.events.search')
+def _events_search(ctx):
+    bump_user_version(ctx.user.pk)
+    yield _get(ctx, '/api/events/', {'search': ctx.search_term})
+
+
+@scenario('api.events.export_ics')
+def _export_ics(ctx):
+    yield _get(ctx, f'/api/events/{ctx.event.pk}/export/ics/')
+
+
+@scenario('ui.events')
+def _ui_events(ctx):
+    yield _get(ctx, '/ui/events/', headers={'HX-Request': 'true'})
+
+
+@scenario('web.events')
+def _web_events(ctx):
+    yield _get(ctx, '/web/events/')
+
+
+def _percentile(sorted_values, p):
+    k = (len(sorted_values) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def measure(ctx, name, repeat=20, warmup=2):
+    """
+    Roda o cenário ``warmup + repeat`` vezes e mais uma sob ``tracemalloc``
+    (separada, para o rastreamento não pesar nas latências).
+    """
+    factory = _scenarios[name]
+    timings, queries = [], []
+    for i in range(warmup + repeat):
+        with factory(ctx) as func:
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                func()
+                elapsed = time.perf_counter() - started
+        if i >= warmup:
+            timings.append(elapsed * 1000)
+            queries.append(len(captured))
+
+    with factory(ctx) as func:
+        tracemalloc.start()
+        try:
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    timings.sort()
+    return {
+        'runs': repeat,
+        'p50_ms': round(_percentile(timings, 50), 3),
+        'p95_ms': round(_percentile(timings, 95), 3),
+        'p99_ms': round(_percentile(timings, 99), 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'max_ms': round(timings[-1], 3),
+        'queries': max(queries),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def run_benchmarks(names=None, repeat=20, warmup=2, prefix='bench', backlog=1000, progress=None):
+    overrides = override_settings(
+        EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+        REMINDER_DISPATCH_FANOUT=False,
+        ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+    )
+    with overrides:
+        ctx = Context(prefix=prefix, backlog=backlog)
+        results = {}
+        for name in names or scenario_names():
+            results[name] = measure(ctx, name, repeat=repeat, warmup=warmup)
+            if progress:
+                progress(name, results[name])
+    return {
+        'created_at': timezone.now().isoformat(),
+        'vendor': connection.vendor,
+        'python': platform.python_version(),
+        'dataset': {
+            'users': User.objects.filter(username__startswith=prefix).count(),
+            'events': Event.objects.filter(owner__username__startswith=prefix).count(),
+            'reminders': Reminder.objects.filter(event__owner__username__startswith=prefix).count(),
+            'backlog': backlog,
+        },
+        'scenarios': results,
+    }
+
+
+def save_report(report, directory) -> Path:
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    stamp = report['created_at'][:19].replace(':', '').replace('-', '')
+    path = directory / f'{stamp}-{report["vendor"]}.json'
+    path.write_text(json.dumps(report, indent=2))
+    return path
+
+
+def latest_report(directory, exclude=None):
+    paths = sorted(p for p in Path(directory).glob('*.json') if p != exclude)
+    return paths[-1] if paths else None
+
+
+def compare_reports(previous, current, metrics=('p50_ms', 'p95_ms', 'queries', 'peak_kb')):
+    """Linhas ``(cenário, métrica, antes, depois, variação %)`` dos cenários presentes nos dois."""
+    rows = []
+    for name, stats in current['scenarios'].items():
+        before = previous['scenarios'].get(name)
+        if before is None:
+            continue
+        for metric in metrics:
+            old, new = before.get(metric), stats.get(metric)
+            if old is None or new is None:
+                continue
+            change = ((new - old) / old * 100) if old else 0.0
+            rows.append((name, metric, old, new, round(change, 1)))
+    return rows
@@ -0,0 +1,59 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+def _version_key(user_id) -> str:
+    return f'scheduler:user:{user_id}:version'
+
+
+def user_versions(user_ids) -> dict:
+    """
+    Versão atual da agenda de cada usuário. Toda escrita incrementa a versão,
+    então qualquer chave de cache que a inclua fica obsoleta em O(1).
+    """
+    keys = {_version_key(uid): uid for uid in user_ids}
+    found = cache.get_many(list(keys))
+    versions = {keys[k]: v for k, v in found.items()}
+    for key, uid in keys.items():
+        if uid not in versions:
+            # começa num valor único para não reaproveitar entradas antigas se a chave for despejada
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[uid] = cache.get(key)
+    return versions
+
+
+def user_version(user_id) -> int:
+    return user_versions([user_id])[user_id]
+
+
+def _bump(user_ids) -> None:
+    for uid in user_ids:
+        key = _version_key(uid)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+
+
+def bump_user_version(*user_ids) -> None:
+    """
+    Invalida o cache dos usuários. Dentro de uma transação incrementa de novo
+    no commit: uma leitura concorrente que cacheou o estado antigo nesse meio
+    tempo fica com uma versão que não volta a ser usada.
+    """
+    ids = {uid for uid in user_ids if uid is not None}
+    if not ids:
+        return
+    _bump(ids)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump(ids))
+
+
+def response_cache_key(request, version) -> str:
+    """Chave de cache de uma resposta GET: usuário + versão da agenda + URL completa."""
+    url = hashlib.sha1(request.build_absolute_uri().encode()).hexdigest()
+    accept = request.META.get('HTTP_ACCEPT', '')
+    return f'scheduler:response:{request.user.pk}:{version}:{url}:{hashlib.sha1(accept.encode()).hexdigest()[:8]}'
@@ -0,0 +1,275 @@
+"""
+Canais de entrega dos lembretes.
+
+Cada canal separa a preparação (thread principal, pode ler o banco) da entrega
+(I/O puro). ``services.notify_reminders`` roda a entrega de cada canal no seu
+próprio pool de threads, limitado por ``concurrency``: um webhook lento não
+segura os e-mails do mesmo lote. Toda gravação de resultado continua na thread
+principal.
+"""
+import hashlib
+import hmac
+import http.client
+import json
+import logging
+import queue
+import threading
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import netguard, push
+from .models import InAppNotification, Reminder, WebhookEndpoint
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def register(channel_cls):
+    _registry[channel_cls.name] = channel_cls
+    return channel_cls
+
+
+def get_channel(name):
+    """Instância nova do canal (uma por lote), ou None se o canal não existe."""
+    channel_cls = _registry.get(name)
+    return channel_cls() if channel_cls else None
+
+
+class Channel:
+    name = ''
+    # entregas simultâneas deste canal
+    concurrency = 1
+    # False: entrega na thread principal (ex.: só grava no banco)
+    threaded = True
+
+    def open(self) -> None:
+        """Antes do lote (thread principal). Uma exceção aqui falha todos os lembretes do canal."""
+
+    def close(self) -> None:
+        """Depois do lote (thread principal)."""
+
+    def prepare(self, groups) -> list:
+        """Um item entregável por grupo de linhas do outbox do mesmo usuário."""
+        raise NotImplementedError
+
+    def deliver(self, items) -> list[tuple[bool, str]]:
+        """Entrega os itens; ``(ok, erro)`` para cada um, na mesma ordem."""
+        raise NotImplementedError
+
+
+@register
+class EmailChannel(Channel):
+    # uma sessão SMTP reaproveitada pelo lote inteiro
+    name = Reminder.CHANNEL_EMAIL
+
+    def __init__(self):
+        self.connection = None
+
+    def open(self):
+        from . import services
+        self.connection = services.get_connection(fail_silently=False)
+        self.connection.open()
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def prepare(self, groups):
+        from . import services
+        return [services.build_digest_message(group) for group in groups]
+
+    def deliver(self, items):
+        from . import services
+        return services.send_event_emails(items, connection=self.connection)
+
+
+class HTTPPool:
+    """
+    Conexões keep-alive reaproveitadas por host (só stdlib). Seguro entre
+    threads; guarda até ``maxsize`` conexões ociosas por host.
+    """
+
+    def __init__(self, maxsize=8, timeout=5.0, connect=None):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        # substitui socket.create_connection (ex.: netguard.create_connection)
+        self.connect = connect
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def _queue(self, key):
+        with self._lock:
+            return self._idle.setdefault(key, queue.LifoQueue(self.maxsize))
+
+    def _new(self, scheme, host, port):
+        cls = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        conn = cls(host, port, timeout=self.timeout)
+        if self.connect is not None:
+            conn._create_connection = self.connect
+        return conn
+
+    def request(self, method, url, body=None, headers=None) -> tuple[int, bytes]:
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port)
+        path = parts.path or '/'
+        if parts.query:
+            path += f'?{parts.query}'
+        idle = self._queue(key)
+        try:
+            conn, reused = idle.get_nowait(), True
+        except queue.Empty:
+            conn, reused = self._new(*key), False
+        try:
+            conn.request(method, path, body=body, headers=headers or {})
+            resp = conn.getresponse()
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            conn.close()
+            if not reused:
+                raise
+            # o servidor fechou a conexão ociosa: uma nova tentativa com conexão nova
+            conn = self._new(*key)
+            conn.request(method, path, body=body, headers=headers or {})
+            resp = conn.getresponse()
+        except Exception:
+            conn.close()
+            raise
+        data = resp.read()
+        if resp.will_close:
+            conn.close()
+        else:
+            try:
+                idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+        return resp.status, data
+
+    def close(self):
+        with self._lock:
+            queues, self._idle = list(self._idle.values()), {}
+        for idle in queues:
+            while not idle.empty():
+                idle.get_nowait().close()
+
+
+def sign_payload(secret: str, body: bytes) -> str:
+    return 'sha256=' + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+_webhook_pool = None
+_webhook_pool_lock = threading.Lock()
+
+
+def webhook_pool() -> HTTPPool:
+    # o pool vive com o processo: lotes seguidos reaproveitam as conexões
+    global _webhook_pool
+    with _webhook_pool_lock:
+        if _webhook_pool is None:
+            _webhook_pool = HTTPPool(
+                maxsize=settings.WEBHOOK_CONCURRENCY, timeout=settings.WEBHOOK_TIMEOUT_SECONDS,
+                connect=netguard.create_connection,
+            )
+        return _webhook_pool
+
+
+@register
+class WebhookChannel(Channel):
+    name = Reminder.CHANNEL_WEBHOOK
+    # o log é visível ao usuário: status/erro de conexão revelariam portas da rede interna
+    failure = 'Falha na entrega do webhook.'
+
+    def __init__(self):
+        self.concurrency = settings.WEBHOOK_CONCURRENCY
+        self.pool = None
+
+    def open(self):
+        self.pool = webhook_pool()
+
+    def prepare(self, groups):
+        endpoints = WebhookEndpoint.objects.in_bulk(
+            {group[0].user_id for group in groups}, field_name='user_id'
+        )
+        items = []
+        for group in groups:
+            endpoint = endpoints.get(group[0].user_id)
+            if endpoint is None or not endpoint.is_active:
+                items.append(None)
+                continue
+            body = json.dumps({
+                'user': endpoint.user_id,
+                'sent_at': timezone.now().isoformat(),
+                'reminders': [
+                    {
+                        'id': r.pk,
+                        'event': r.event_id,
+                        'title': r.title,
+                        'location': r.location,
+                        'start': r.occurrence_start.isoformat(),
+                        'minutes_before': r.minutes_before,
+                    }
+                    for r in group
+                ],
+            }).encode()
+            items.append((endpoint.url, body, sign_payload(endpoint.secret, body)))
+        return items
+
+    def deliver(self, items):
+        results = []
+        for item in items:
+            if item is None:
+                results.append((False, 'Webhook não configurado.'))
+                continue
+            url, body, signature = item
+            try:
+                if urlsplit(url).scheme not in netguard.SCHEMES:
+                    raise netguard.BlockedAddress(f'esquema não permitido: {url}')
+                status, _ = self.pool.request('POST', url, body=body, headers={
+                    'Content-Type': 'application/json',
+                    'X-Agenda-Signature': signature,
+                })
+            except Exception as exc:
+                logger.warning('Webhook %s falhou: %s', url, str(exc) or exc.__class__.__name__)
+                results.append((False, self.failure))
+                continue
+            if 200 <= status < 300:
+                results.append((True, ''))
+            else:
+                logger.warning('Webhook %s respondeu HTTP %s', url, status)
+                results.append((False, self.failure))
+        return results
+
+
+@register
+class InAppChannel(Channel):
+    name = Reminder.CHANNEL_INAPP
+    threaded = False
+
+    def prepare(self, groups):
+        items = []
+        for group in groups:
+            first = group[0]
+            if len(group) == 1:
+                start = timezone.localtime(first.occurrence_start).strftime('%d/%m %H:%M')
+                title, body = first.title, f'Começa em {first.minutes_before} minutos ({start}).'
+            else:
+                title = f'{len(group)} lembretes'
+                body = '\n'.join(
+                    f'{timezone.localtime(r.occurrence_start).strftime("%d/%m %H:%M")} {r.title}' for r in group
+                )
+            items.append(InAppNotification(
+                user_id=first.user_id, event_id=first.event_id if len(group) == 1 else None,
+                title=title, body=body,
+            ))
+        return items
+
+    def deliver(self, items):
+        InAppNotification.objects.bulk_create(items)
+        for item in items:
+            push.publish(item.user_id, {
+                'id': item.pk, 'event': item.event_id, 'title': item.title,
+                'body': item.body, 'created_at': item.created_at,
+            })
+        return [(True, '')] * len(items)
@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# caches que vivem dentro de um processo: o web não vê o que worker/scheduler escrevem
+PROCESS_LOCAL_CACHES = {'django.core.cache.backends.locmem.LocMemCache'}
+
+
+@register(Tags.caches, deploy=True)
+def shared_cache_check(app_configs, **kwargs):
+    """Em produção (web + worker + scheduler) as versões do cache precisam ser vistas por todos."""
+    if settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Error(
+        'O cache padrão é local ao processo: as versões por usuário e da agenda gravadas pelo worker/scheduler '
+        'não chegam ao web e as respostas em cache ficam velhas.',
+        hint='Defina CACHE_URL (ou REDIS_URL) apontando para o Redis.',
+        id='scheduler.E001',
+    )]
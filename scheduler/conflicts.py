@@ -0,0 +1,84 @@
+from bisect import bisect_left
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from .filters import series_touching
+from .models import Event
+from .recurrence import occurrences
+
+_span_table = {}
+
+
+def _has_span_table() -> bool:
+    # a tabela R*Tree só existe se o SQLite tiver o módulo (ver migração 0006)
+    if connection.alias not in _span_table:
+        _span_table[connection.alias] = 'scheduler_event_span' in connection.introspection.table_names()
+    return _span_table[connection.alias]
+
+
+def _overlapping(qs, owner_id, start, end):
+    """Eventos únicos do dono que se sobrepõem a [start, end), usando o índice de intervalos."""
+    table = Event._meta.db_table
+    if connection.vendor == 'postgresql':
+        qs = qs.filter(RawSQL(
+            f'tstzrange("{table}"."start", "{table}"."end", \'[)\') && tstzrange(%s, %s, \'[)\')',
+            (start, end), output_field=BooleanField(),
+        ))
+    elif connection.vendor == 'sqlite' and _has_span_table():
+        # R*Tree em minutos (arredondado para fora); o filtro exato abaixo refina
+        qs = qs.filter(RawSQL(
+            f'"{table}"."id" IN (SELECT id FROM scheduler_event_span '
+            'WHERE owner_lo <= %s AND owner_hi >= %s AND start_lo < %s AND end_hi > %s)',
+            (owner_id, owner_id, -(-int(end.timestamp()) // 60), int(start.timestamp()) // 60),
+            output_field=BooleanField(),
+        ))
+    return qs.filter(start__lt=end, end__gt=start)
+
+
+def _slots(start, end, recurrence):
+    """Intervalos a checar: o próprio, ou as ocorrências da série até ``CONFLICT_HORIZON_DAYS``."""
+    if not recurrence:
+        return [(start, end)]
+    # de agora em diante (séries antigas sendo editadas não conflitam com o passado)
+    window_start = max(start, timezone.now())
+    window_end = window_start + timedelta(days=settings.CONFLICT_HORIZON_DAYS)
+    series = Event(start=start, end=end, recurrence=recurrence)
+    return [(o.start, o.end) for o in occurrences(series, window_start, window_end)]
+
+
+def _hits(slots, starts, start, end) -> bool:
+    # mesma duração em todas: os fins também estão ordenados, basta o último que começa antes de ``end``
+    i = bisect_left(starts, end)
+    return i > 0 and slots[i - 1][1] > start
+
+
+def find_conflicts(owner_id, start, end, exclude_pk=None, recurrence='') -> list[Event]:
+    """
+    Eventos do usuário que se sobrepõem a ``[start, end)`` (encostar não conta).
+
+    Séries recorrentes são verificadas pelas ocorrências dentro do intervalo.
+    Com ``recurrence``, ``[start, end)`` é a primeira ocorrência de uma série e
+    todas as ocorrências até ``CONFLICT_HORIZON_DAYS`` são checadas: uma
+    consulta para o período inteiro e a sobreposição exata em memória.
+    """
+    slots = _slots(start, end, recurrence)
+    if not slots:
+        return []
+    starts = [s for s, _ in slots]
+    span_start, span_end = slots[0][0], slots[-1][1]
+    qs = Event.objects.filter(owner_id=owner_id)
+    if exclude_pk is not None:
+        qs = qs.exclude(pk=exclude_pk)
+    conflicts = [
+        e for e in _overlapping(qs.filter(recurrence=''), owner_id, span_start, span_end).order_by('start', 'id')
+        if _hits(slots, starts, e.start, e.end)
+    ]
+    for series in qs.filter(series_touching(span_start, span_end)):
+        if any(_hits(slots, starts, o.start, o.end) for o in occurrences(series, span_start, span_end)):
+            conflicts.append(series)
+    return conflicts
@@ -0,0 +1,11 @@
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+
+
+def push(request):
+    """
+    ``push_stream``: abrir o SSE de ``/api/stream/`` nas páginas. A rota só
+    existe no app ASGI; sob WSGI só quando ``PUSH_STREAM_ENABLED`` diz que um
+    proxy a encaminha para o serviço asgi.
+    """
+    return {'push_stream': settings.PUSH_STREAM_ENABLED or isinstance(request, ASGIRequest)}
@@ -1,11 +1,33 @@
 from datetime import datetime, time
 from django.conf import settings
+from django.db.models import Q
 from django.utils import timezone
 import django_filters
 from .models import Event
 
+
+def series_touching(window_start=None, window_end=None) -> Q:
+    """Séries recorrentes que podem ter ocorrências na janela (refinadas na expansão)."""
+    q = Q(recurrence__gt='')
+    if window_start is not None:
+        q &= Q(recurrence_end__isnull=True) | Q(recurrence_end__gte=window_start)
+    if window_end is not None:
+        q &= Q(start__lte=window_end)
+    return q
+
+
+def day_bounds(value):
+    if settings.USE_TZ:
+        tz = timezone.get_current_timezone()
+        return (
+            timezone.make_aware(datetime.combine(value, time.min), tz),
+            timezone.make_aware(datetime.combine(value, time.max), tz),
+        )
+    return datetime.combine(value, time.min), datetime.combine(value, time.max)
+
+
 class EventFilter(django_filters.FilterSet):
-    start_after = django_filters.IsoDateTimeFilter(field_name='start', lookup_expr='gte')
+    start_after = django_filters.IsoDateTimeFilter(method='filter_start_after')
     end_before = django_filters.IsoDateTimeFilter(field_name='end', lookup_expr='lte')
     date = django_filters.DateFilter(method='filter_by_date')
 
@@ -13,14 +35,21 @@ class EventFilter(django_filters.FilterSet):
         model = Event
         fields = ['start_after', 'end_before', 'date', 'is_all_day']
 
+    def filter_start_after(self, queryset, name, value):
+        # a primeira ocorrência é a mais cedo, então end_before vale igual para séries
+        return queryset.filter(Q(start__gte=value) | series_touching(window_start=value))
+
     def filter_by_date(self, queryset, name, value):
         # Retorna eventos que tocam o dia 'value'
-        if settings.USE_TZ:
-            tz = timezone.get_current_timezone()
-            start_day = timezone.make_aware(datetime.combine(value, time.min), tz)
-            end_day = timezone.make_aware(datetime.combine(value, time.max), tz)
-        else:
-            start_day = datetime.combine(value, time.min)
-            end_day = datetime.combine(value, time.max)
-
-        return queryset.filter(end__gte=start_day, start__lte=end_day)
+        start_day, end_day = day_bounds(value)
+        return queryset.filter(
+            Q(end__gte=start_day, start__lte=end_day) | series_touching(start_day, end_day)
+        )
+
+    def window(self):
+        """Janela (início, fim) pedida pelos filtros; usada na expansão de ocorrências."""
+        data = self.form.cleaned_data if self.is_bound and self.form.is_valid() else {}
+        start, end = data.get('start_after'), data.get('end_before')
+        if data.get('date'):
+            start, end = day_bounds(data['date'])
+        return start, end
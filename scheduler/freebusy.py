@@ -0,0 +1,74 @@
+import heapq
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .caching import user_versions
+from .filters import series_touching
+from .models import Event
+from .recurrence import occurrences
+
+
+def merge_intervals(intervals):
+    """Une intervalos ``(início, fim)`` já ordenados por início, numa passada só."""
+    merged = []
+    for start, end in intervals:
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [tuple(i) for i in merged]
+
+
+def free_slots(busy, range_start, range_end):
+    slots = []
+    cursor = range_start
+    for start, end in busy:
+        if start > cursor:
+            slots.append((cursor, start))
+        cursor = max(cursor, end)
+    if cursor < range_end:
+        slots.append((cursor, range_end))
+    return slots
+
+
+def _query_busy(user_id, range_start, range_end):
+    # Só eventos que se sobrepõem ao intervalo, já ordenados pelo índice (owner, start)
+    single = (
+        Event.objects
+        .filter(owner_id=user_id, recurrence='', start__lt=range_end, end__gt=range_start)
+        .order_by('start')
+        .values_list('start', 'end')
+    )
+    series = Event.objects.filter(series_touching(range_start, range_end), owner_id=user_id)
+    expanded = heapq.merge(*(
+        ((o.start, o.end) for o in occurrences(e, range_start, range_end) if o.end > range_start)
+        for e in series
+    ))
+    clipped = (
+        (max(start, range_start), min(end, range_end))
+        for start, end in heapq.merge(single.iterator(), expanded)
+    )
+    return merge_intervals(clipped)
+
+
+def busy_intervals(user_ids, range_start, range_end) -> dict:
+    """
+    Intervalos ocupados (já unidos) de cada usuário em ``[range_start, range_end)``.
+
+    O resultado fica em cache por usuário, com a versão da agenda na chave:
+    qualquer alteração de evento do usuário invalida as entradas dele.
+    """
+    versions = user_versions(user_ids)
+    span = f'{range_start.timestamp()}:{range_end.timestamp()}'
+    keys = {uid: f'freebusy:{uid}:{versions[uid]}:{span}' for uid in user_ids}
+    cached = cache.get_many(list(keys.values()))
+    result = {}
+    for uid, key in keys.items():
+        if key in cached:
+            result[uid] = cached[key]
+            continue
+        result[uid] = _query_busy(uid, range_start, range_end)
+        cache.set(key, result[uid], timeout=settings.FREEBUSY_CACHE_SECONDS)
+    return result
@@ -0,0 +1,173 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.utils import timezone
+
+CALENDAR_HEADER = (
+    'BEGIN:VCALENDAR\r\n'
+    'VERSION:2.0\r\n'
+    'PRODID:-//Agenda//PT-BR//EN\r\n'
+    'CALSCALE:GREGORIAN\r\n'
+    'METHOD:PUBLISH\r\n'
+)
+CALENDAR_FOOTER = 'END:VCALENDAR\r\n'
+
+
+def ics_escape(value: str) -> str:
+    if value is None:
+        return ''
+    return (
+        value.replace('\\', '\\\\')
+             .replace('\n', '\\n')
+             .replace(',', '\\,')
+             .replace(';', '\\;')
+    )
+
+
+def ics_datetime(value) -> str:
+    return timezone.localtime(value).strftime('%Y%m%dT%H%M%S')
+
+
+def vevent(event, dtstamp: str) -> str:
+    lines = [
+        'BEGIN:VEVENT\r\n',
+        f'UID:event-{event.id}@agenda\r\n',
+        f'DTSTAMP:{dtstamp}\r\n',
+        f'DTSTART:{ics_datetime(event.start)}\r\n',
+        f'DTEND:{ics_datetime(event.end)}\r\n',
+    ]
+    if event.recurrence:
+        lines.append(f'RRULE:{event.recurrence.removeprefix("RRULE:")}\r\n')
+    lines += [
+        f'SUMMARY:{ics_escape(event.title or "")}\r\n',
+        f'DESCRIPTION:{ics_escape(event.description or "")}\r\n',
+        f'LOCATION:{ics_escape(event.location or "")}\r\n',
+        'END:VEVENT\r\n',
+    ]
+    return ''.join(lines)
+
+
+def iter_calendar(events):
+    """Gera o VCALENDAR evento a evento (para StreamingHttpResponse)."""
+    dtstamp = timezone.now().strftime('%Y%m%dT%H%M%S')
+    yield CALENDAR_HEADER
+    for event in events:
+        yield vevent(event, dtstamp)
+    yield CALENDAR_FOOTER
+
+
+async def aiter_calendar(events):
+    """``iter_calendar`` para ASGI, a partir de um iterável assíncrono (``QuerySet.aiterator()``)."""
+    dtstamp = timezone.now().strftime('%Y%m%dT%H%M%S')
+    yield CALENDAR_HEADER
+    async for event in events:
+        yield vevent(event, dtstamp)
+    yield CALENDAR_FOOTER
+
+
+# ---- Leitura (import) ----
+
+def ics_unescape(value: str) -> str:
+    out = []
+    chars = iter(value)
+    for ch in chars:
+        if ch == '\\':
+            nxt = next(chars, '')
+            out.append('\n' if nxt in ('n', 'N') else nxt)
+        else:
+            out.append(ch)
+    return ''.join(out)
+
+
+def unfold_lines(lines):
+    """Desfaz o "line folding" do RFC 5545 linha a linha, sem ler o arquivo inteiro."""
+    buf = None
+    for raw in lines:
+        if isinstance(raw, bytes):
+            raw = raw.decode('utf-8', errors='replace')
+        line = raw.rstrip('\r\n')
+        if buf is not None and line[:1] in (' ', '\t'):
+            buf += line[1:]
+            continue
+        if buf is not None:
+            yield buf
+        buf = line
+    if buf:
+        yield buf
+
+
+def iter_vevents(lines):
+    """
+    Gera um dict por VEVENT: ``{NOME: (params, valor)}``.
+
+    Componentes aninhados (ex.: VALARM) são ignorados; se uma propriedade se
+    repete, vale a primeira.
+    """
+    current = None
+    nested = 0
+    for line in unfold_lines(lines):
+        upper = line.upper()
+        if upper == 'BEGIN:VEVENT':
+            current, nested = {}, 0
+        elif upper == 'END:VEVENT':
+            if current is not None:
+                yield current
+            current = None
+        elif current is None:
+            continue
+        elif upper.startswith('BEGIN:'):
+            nested += 1
+        elif upper.startswith('END:'):
+            nested -= 1
+        elif nested == 0 and ':' in line:
+            head, value = line.split(':', 1)
+            name, *params = head.split(';')
+            current.setdefault(name.upper(), (params, value))
+
+
+def _param(params, key):
+    for p in params:
+        k, _, v = p.partition('=')
+        if k.upper() == key:
+            return v.strip('"')
+    return None
+
+
+def parse_ics_datetime(params, value):
+    """Retorna ``(datetime aware, is_date)`` para DTSTART/DTEND."""
+    value = value.strip()
+    if _param(params, 'VALUE') == 'DATE' or len(value) == 8:
+        day = datetime.strptime(value[:8], '%Y%m%d')
+        return timezone.make_aware(day), True
+    if value.endswith('Z'):
+        return datetime.strptime(value, '%Y%m%dT%H%M%SZ').replace(tzinfo=dt_timezone.utc), False
+    naive = datetime.strptime(value, '%Y%m%dT%H%M%S')
+    tzid = _param(params, 'TZID')
+    try:
+        tz = ZoneInfo(tzid) if tzid else timezone.get_current_timezone()
+    except (ZoneInfoNotFoundError, ValueError):
+        tz = timezone.get_current_timezone()
+    return timezone.make_aware(naive, tz), False
+
+
+def vevent_to_fields(props) -> dict:
+    """Converte as propriedades de um VEVENT nos campos de ``Event``."""
+    if 'DTSTART' not in props:
+        raise ValueError('VEVENT sem DTSTART.')
+    start, is_date = parse_ics_datetime(*props['DTSTART'])
+    if 'DTEND' in props:
+        end, _ = parse_ics_datetime(*props['DTEND'])
+        if is_date:
+            # em eventos de dia inteiro o DTEND é exclusivo
+            end -= timedelta(seconds=1)
+    else:
+        end = start
+    return {
+        'title': ics_unescape(props.get('SUMMARY', ([], ''))[1])[:200] or '(sem título)',
+        'description': ics_unescape(props.get('DESCRIPTION', ([], ''))[1]),
+        'location': ics_unescape(props.get('LOCATION', ([], ''))[1])[:200],
+        'start': start,
+        'end': end,
+        'is_all_day': is_date,
+        'recurrence': props.get('RRULE', ([], ''))[1],
+    }
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from scheduler.retention import compact_notification_logs
+
+
+class Command(BaseCommand):
+    help = 'Agrega os NotificationLogs vencidos em contagens diárias e os remove, em lotes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.NOTIFICATION_PURGE_BATCH_SIZE)
+        parser.add_argument(
+            '--max-batches', type=int, default=settings.NOTIFICATION_PURGE_MAX_BATCHES,
+            help='Limite de lotes nesta execução (o restante fica para a próxima).',
+        )
+
+    def handle(self, *args, **options):
+        result = compact_notification_logs(batch_size=options['batch_size'], max_batches=options['max_batches'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{result["compacted"]} logs compactados em {result["batches"]} lotes.'
+        ))
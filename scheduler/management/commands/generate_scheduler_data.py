@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+
+from scheduler.benchmarks import delete_dataset, generate_dataset
+
+
+class Command(BaseCommand):
+    help = 'Gera massa sintética (usuários, eventos, lembretes e histórico de envios) para benchmarks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--events-per-user', type=int, default=50)
+        parser.add_argument('--history-days', type=int, default=30, help='Dias de histórico de envios.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='bench', help='Prefixo dos usernames gerados.')
+        parser.add_argument('--replace', action='store_true', help='Apaga antes a massa com o mesmo prefixo.')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if options['replace']:
+            self.stdout.write(f'{delete_dataset(prefix)} objetos removidos.')
+        elif get_user_model().objects.filter(username__startswith=prefix).exists():
+            raise CommandError(f'Já existem usuários "{prefix}*"; use --replace ou outro --prefix.')
+
+        result = generate_dataset(
+            users=options['users'], events_per_user=options['events_per_user'],
+            seed=options['seed'], history_days=options['history_days'], prefix=prefix,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'{result["users"]} usuários, {result["events"]} eventos, '
+            f'{result["reminders"]} lembretes e {result["logs"]} logs criados.'
+        ))
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from scheduler.services import import_ics
+
+
+class Command(BaseCommand):
+    help = 'Importa eventos de um arquivo .ics para um usuário (em lotes, com bulk_create).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('path', help='Arquivo .ics')
+        parser.add_argument('--batch-size', type=int, default=settings.ICS_IMPORT_BATCH_SIZE)
+        parser.add_argument(
+            '--reminder-minutes', type=int, default=15,
+            help='Lembrete padrão criado para cada evento (use -1 para não criar).',
+        )
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f'Usuário "{options["username"]}" não encontrado.')
+
+        minutes = options['reminder_minutes']
+
+        def progress(processed, created):
+            self.stdout.write(f'{processed} lidos, {created} criados...')
+
+        with open(options['path'], 'rb') as fh:
+            result = import_ics(
+                user, fh,
+                batch_size=options['batch_size'],
+                reminder_minutes=None if minutes < 0 else minutes,
+                progress=progress,
+            )
+
+        for err in result['errors']:
+            self.stderr.write(f'#{err["index"]} {err["uid"] or "(sem UID)"}: {err["errors"]}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{result["created"]} evento(s) importado(s), {len(result["errors"])} com erro.'
+        ))
@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from scheduler.sharding import reshard_outbox
+
+
+class Command(BaseCommand):
+    help = 'Redistribui o outbox de lembretes entre REMINDER_SHARDS shards (rode após mudar a configuração).'
+
+    def handle(self, *args, **options):
+        updated = reshard_outbox()
+        self.stdout.write(self.style.SUCCESS(
+            f'{updated} linha(s) do outbox movida(s); {settings.REMINDER_SHARDS} shards.'
+        ))
@@ -0,0 +1,53 @@
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from scheduler.sharding import ShardCoordinator
+from scheduler.timing import ReminderScheduler
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+class Command(BaseCommand):
+    help = 'Dispara lembretes com precisão de ~1s a partir de uma janela pré-carregada em memória.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--window', type=int, default=settings.REMINDER_WINDOW_MINUTES,
+            help='Minutos de lembretes pendentes mantidos em memória.',
+        )
+        parser.add_argument(
+            '--tick', type=float, default=settings.REMINDER_SCHEDULER_TICK_SECONDS,
+            help='Intervalo máximo (s) entre verificações.',
+        )
+        parser.add_argument(
+            '--node', default=None,
+            help='Nome do nó na divisão de shards (padrão: host:pid).',
+        )
+
+    def handle(self, *args, **options):
+        coordinator = ShardCoordinator(node=options['node'])
+        scheduler = ReminderScheduler(window_minutes=options['window'], coordinator=coordinator)
+        # docker stop manda SIGTERM: sai pelo mesmo caminho do Ctrl+C e solta os shards
+        signal.signal(signal.SIGTERM, _interrupt)
+        self.stdout.write(
+            f'Scheduler de lembretes {coordinator.node} iniciado (janela de {options["window"]} min).'
+        )
+        try:
+            while True:
+                now = timezone.now()
+                if scheduler.rebalance(now):
+                    self.stdout.write(f'Shards: {scheduler.shards}')
+                fired = scheduler.tick(now)
+                if fired:
+                    self.stdout.write(f'{len(fired)} lembrete(s) disparado(s).')
+                time.sleep(scheduler.seconds_until_next(timezone.now(), options['tick']))
+        except KeyboardInterrupt:
+            self.stdout.write('Scheduler encerrado.')
+        finally:
+            coordinator.leave()
@@ -0,0 +1,66 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from scheduler.benchmarks import (
+    compare_reports, latest_report, run_benchmarks, save_report, scenario_names,
+)
+
+
+class Command(BaseCommand):
+    help = 'Mede os cenários do agendador sobre a massa sintética e grava o relatório em JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenarios', nargs='*', help=f'Padrão: todos ({", ".join(scenario_names())}).')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--backlog', type=int, default=1000, help='Lembretes vencidos em reminders.drain.')
+        parser.add_argument('--prefix', default='bench')
+        parser.add_argument('--output-dir', default=str(settings.BASE_DIR / 'benchmarks' / 'results'))
+        parser.add_argument(
+            '--compare', metavar='ARQUIVO', nargs='?', const='latest',
+            help='Compara com um relatório anterior (sem valor: o mais recente do diretório).',
+        )
+        parser.add_argument('--no-save', action='store_true')
+
+    def handle(self, *args, **options):
+        unknown = set(options['scenarios']) - set(scenario_names())
+        if unknown:
+            raise CommandError(f'Cenário(s) desconhecido(s): {", ".join(sorted(unknown))}')
+
+        previous = None
+        if options['compare']:
+            path = options['compare']
+            if path == 'latest':
+                path = latest_report(options['output_dir'])
+                if path is None:
+                    raise CommandError(f'Nenhum relatório em {options["output_dir"]} para comparar.')
+            with open(path) as fh:
+                previous = json.load(fh)
+
+        def progress(name, stats):
+            self.stdout.write(
+                f'{name:<26} p50 {stats["p50_ms"]:>9.2f}ms  p95 {stats["p95_ms"]:>9.2f}ms  '
+                f'p99 {stats["p99_ms"]:>9.2f}ms  {stats["queries"]:>4} consultas  {stats["peak_kb"]:>9.1f} KiB'
+            )
+
+        try:
+            report = run_benchmarks(
+                options['scenarios'] or None, repeat=options['repeat'], warmup=options['warmup'],
+                prefix=options['prefix'], backlog=options['backlog'], progress=progress,
+            )
+        except LookupError as exc:
+            raise CommandError(str(exc))
+
+        if not options['no_save']:
+            path = save_report(report, options['output_dir'])
+            self.stdout.write(self.style.SUCCESS(f'Relatório gravado em {path}'))
+
+        if previous is not None:
+            self.stdout.write(f'\nComparação com {previous["created_at"]} ({previous["vendor"]}):')
+            for name, metric, old, new, change in compare_reports(previous, report):
+                line = f'{name:<26} {metric:<8} {old:>10} -> {new:<10} {change:+.1f}%'
+                if change > 10:
+                    line = self.style.WARNING(line)
+                self.stdout.write(line)
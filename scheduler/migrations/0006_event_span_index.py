@@ -0,0 +1,87 @@
+from django.db import migrations, transaction
+from django.db.utils import DatabaseError
+
+# Índice de intervalos para detectar conflitos de horário em O(log n):
+# - Postgres: GiST sobre (owner_id, tstzrange(start, end)), com btree_gist se
+#   disponível; senão só sobre o range.
+# - SQLite: tabela R*Tree (owner, [início, fim] em minutos) mantida por triggers.
+# Outros bancos seguem sem índice (a consulta cai num filtro comum).
+
+SQLITE_FORWARD = [
+    'CREATE VIRTUAL TABLE IF NOT EXISTS scheduler_event_span USING rtree_i32(id, owner_lo, owner_hi, start_lo, end_hi)',
+    '''CREATE TRIGGER IF NOT EXISTS scheduler_event_span_ai AFTER INSERT ON scheduler_event BEGIN
+        INSERT INTO scheduler_event_span VALUES (
+            new.id, new.owner_id, new.owner_id,
+            CAST(strftime('%s', new.start) AS INTEGER) / 60,
+            (CAST(strftime('%s', new."end") AS INTEGER) + 59) / 60
+        );
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS scheduler_event_span_au AFTER UPDATE ON scheduler_event BEGIN
+        UPDATE scheduler_event_span SET
+            owner_lo = new.owner_id, owner_hi = new.owner_id,
+            start_lo = CAST(strftime('%s', new.start) AS INTEGER) / 60,
+            end_hi = (CAST(strftime('%s', new."end") AS INTEGER) + 59) / 60
+        WHERE id = new.id;
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS scheduler_event_span_ad AFTER DELETE ON scheduler_event BEGIN
+        DELETE FROM scheduler_event_span WHERE id = old.id;
+    END''',
+    '''INSERT INTO scheduler_event_span
+        SELECT id, owner_id, owner_id,
+               CAST(strftime('%s', start) AS INTEGER) / 60,
+               (CAST(strftime('%s', "end") AS INTEGER) + 59) / 60
+        FROM scheduler_event''',
+]
+
+SQLITE_BACKWARD = [
+    'DROP TRIGGER IF EXISTS scheduler_event_span_ai',
+    'DROP TRIGGER IF EXISTS scheduler_event_span_au',
+    'DROP TRIGGER IF EXISTS scheduler_event_span_ad',
+    'DROP TABLE IF EXISTS scheduler_event_span',
+]
+
+
+def forwards(apps, schema_editor):
+    conn = schema_editor.connection
+    if conn.vendor == 'postgresql':
+        try:
+            with transaction.atomic(using=conn.alias):
+                schema_editor.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+                schema_editor.execute(
+                    'CREATE INDEX IF NOT EXISTS scheduler_event_span_gist ON scheduler_event '
+                    'USING gist (owner_id, tstzrange(start, "end", \'[)\'))'
+                )
+        except DatabaseError:
+            # sem permissão para a extensão: GiST só no intervalo
+            schema_editor.execute(
+                'CREATE INDEX IF NOT EXISTS scheduler_event_span_gist ON scheduler_event '
+                'USING gist (tstzrange(start, "end", \'[)\'))'
+            )
+    elif conn.vendor == 'sqlite':
+        try:
+            with transaction.atomic(using=conn.alias):
+                for sql in SQLITE_FORWARD:
+                    # params=None: sem isso o '%s' do strftime vira placeholder
+                    schema_editor.execute(sql, None)
+        except DatabaseError:
+            pass  # SQLite compilado sem R*Tree
+
+
+def backwards(apps, schema_editor):
+    conn = schema_editor.connection
+    if conn.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS scheduler_event_span_gist')
+    elif conn.vendor == 'sqlite':
+        for sql in SQLITE_BACKWARD:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0005_calendar_feed'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,84 @@
+from django.db import migrations, transaction
+from django.db.utils import DatabaseError
+
+# Índice de texto completo de título/local/descrição (ver scheduler/search.py):
+# - Postgres: coluna tsvector gerada (sempre atualizada pelo próprio banco) + GIN.
+# - SQLite: tabela FTS5 de conteúdo externo mantida por triggers.
+# Sem suporte no banco, a busca volta ao icontains do SearchFilter.
+
+POSTGRES_FORWARD = [
+    '''ALTER TABLE scheduler_event ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('portuguese'::regconfig, coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('portuguese'::regconfig, coalesce(location, '')), 'B') ||
+            setweight(to_tsvector('portuguese'::regconfig, coalesce(description, '')), 'C')
+        ) STORED''',
+    'CREATE INDEX IF NOT EXISTS scheduler_event_search_gin ON scheduler_event USING gin (search_vector)',
+]
+
+POSTGRES_BACKWARD = [
+    'DROP INDEX IF EXISTS scheduler_event_search_gin',
+    'ALTER TABLE scheduler_event DROP COLUMN IF EXISTS search_vector',
+]
+
+SQLITE_FORWARD = [
+    '''CREATE VIRTUAL TABLE IF NOT EXISTS scheduler_event_fts USING fts5(
+        title, description, location,
+        content='scheduler_event', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )''',
+    '''CREATE TRIGGER IF NOT EXISTS scheduler_event_fts_ai AFTER INSERT ON scheduler_event BEGIN
+        INSERT INTO scheduler_event_fts(rowid, title, description, location)
+        VALUES (new.id, new.title, new.description, new.location);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS scheduler_event_fts_ad AFTER DELETE ON scheduler_event BEGIN
+        INSERT INTO scheduler_event_fts(scheduler_event_fts, rowid, title, description, location)
+        VALUES ('delete', old.id, old.title, old.description, old.location);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS scheduler_event_fts_au
+    AFTER UPDATE OF title, description, location ON scheduler_event BEGIN
+        INSERT INTO scheduler_event_fts(scheduler_event_fts, rowid, title, description, location)
+        VALUES ('delete', old.id, old.title, old.description, old.location);
+        INSERT INTO scheduler_event_fts(rowid, title, description, location)
+        VALUES (new.id, new.title, new.description, new.location);
+    END''',
+    "INSERT INTO scheduler_event_fts(scheduler_event_fts) VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARD = [
+    'DROP TRIGGER IF EXISTS scheduler_event_fts_ai',
+    'DROP TRIGGER IF EXISTS scheduler_event_fts_ad',
+    'DROP TRIGGER IF EXISTS scheduler_event_fts_au',
+    'DROP TABLE IF EXISTS scheduler_event_fts',
+]
+
+
+def forwards(apps, schema_editor):
+    conn = schema_editor.connection
+    if conn.vendor == 'postgresql':
+        for sql in POSTGRES_FORWARD:
+            schema_editor.execute(sql)
+    elif conn.vendor == 'sqlite':
+        try:
+            with transaction.atomic(using=conn.alias):
+                for sql in SQLITE_FORWARD:
+                    schema_editor.execute(sql, None)
+        except DatabaseError:
+            pass  # SQLite compilado sem FTS5
+
+
+def backwards(apps, schema_editor):
+    conn = schema_editor.connection
+    statements = {'postgresql': POSTGRES_BACKWARD, 'sqlite': SQLITE_BACKWARD}.get(conn.vendor, [])
+    for sql in statements:
+        schema_editor.execute(sql, None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0006_event_span_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
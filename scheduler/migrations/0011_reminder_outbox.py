@@ -0,0 +1,92 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:57
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import migrations, models
+
+
+def fill_outbox(apps, schema_editor):
+    """Uma linha por lembrete pendente fora do dead-letter, renderizada a partir do evento/dono."""
+    Reminder = apps.get_model('scheduler', 'Reminder')
+    ReminderOutbox = apps.get_model('scheduler', 'ReminderOutbox')
+    username_field = get_user_model().USERNAME_FIELD
+    pending = (
+        Reminder.objects.using(schema_editor.connection.alias)
+        .select_related('event', 'event__owner')
+        .filter(is_sent=False, dead_lettered_at__isnull=True)
+    )
+    rows = []
+    for reminder in pending.iterator(chunk_size=2000):
+        event, owner = reminder.event, reminder.event.owner
+        due_at = reminder.scheduled_for
+        if reminder.next_attempt_at and reminder.next_attempt_at > due_at:
+            due_at = reminder.next_attempt_at
+        rows.append(ReminderOutbox(
+            reminder_id=reminder.pk, event_id=event.pk, user_id=owner.pk, channel=reminder.channel,
+            due_at=due_at, occurrence_start=reminder.scheduled_for + timedelta(minutes=reminder.minutes_before),
+            minutes_before=reminder.minutes_before, recipient=owner.email,
+            username=getattr(owner, username_field), title=event.title,
+            location=event.location, description=event.description,
+        ))
+        if len(rows) >= 2000:
+            ReminderOutbox.objects.using(schema_editor.connection.alias).bulk_create(rows)
+            rows = []
+    ReminderOutbox.objects.using(schema_editor.connection.alias).bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0010_notification_channels'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReminderOutbox',
+            fields=[
+                ('reminder', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='outbox', serialize=False, to='scheduler.reminder')),
+                ('channel', models.CharField(max_length=20)),
+                ('due_at', models.DateTimeField()),
+                ('occurrence_start', models.DateTimeField()),
+                ('minutes_before', models.PositiveIntegerField()),
+                ('recipient', models.CharField(max_length=254)),
+                ('username', models.CharField(max_length=150)),
+                ('title', models.CharField(max_length=200)),
+                ('location', models.CharField(blank=True, max_length=200)),
+                ('description', models.TextField(blank=True)),
+                ('claimed_by', models.CharField(blank=True, default='', max_length=32)),
+                ('claimed_until', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='reminder',
+            name='scheduler_reminder_due_idx',
+        ),
+        migrations.RemoveField(
+            model_name='reminder',
+            name='claimed_by',
+        ),
+        migrations.RemoveField(
+            model_name='reminder',
+            name='claimed_until',
+        ),
+        migrations.AddField(
+            model_name='reminderoutbox',
+            name='event',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='scheduler.event'),
+        ),
+        migrations.AddField(
+            model_name='reminderoutbox',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='reminderoutbox',
+            index=models.Index(fields=['due_at'], name='scheduler_outbox_due_idx'),
+        ),
+        migrations.RunPython(fill_outbox, migrations.RunPython.noop),
+    ]
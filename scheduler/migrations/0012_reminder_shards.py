@@ -0,0 +1,49 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:03
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Mod
+
+
+def assign_shards(apps, schema_editor):
+    """Shard das linhas já no outbox: mesma conta de ``sharding.shard_for``."""
+    ReminderOutbox = apps.get_model('scheduler', 'ReminderOutbox')
+    ReminderOutbox.objects.using(schema_editor.connection.alias).update(
+        shard=Mod('user_id', settings.REMINDER_SHARDS),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0011_reminder_outbox'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchedulerNode',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('last_seen', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ShardLease',
+            fields=[
+                ('shard', models.PositiveSmallIntegerField(primary_key=True, serialize=False)),
+                ('owner', models.CharField(blank=True, default='', max_length=100)),
+                ('expires_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='reminderoutbox',
+            name='shard',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.RunPython(assign_shards, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='reminderoutbox',
+            index=models.Index(fields=['shard', 'due_at'], name='scheduler_outbox_shard_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+from django.db import migrations, models
+
+
+def fill_occurrence_end(apps, schema_editor):
+    """Fim da ocorrência = início da ocorrência + duração do evento."""
+    ReminderOutbox = apps.get_model('scheduler', 'ReminderOutbox')
+    rows = ReminderOutbox.objects.using(schema_editor.connection.alias).select_related('event')
+    batch = []
+    for row in rows.iterator(chunk_size=2000):
+        row.occurrence_end = row.occurrence_start + (row.event.end - row.event.start)
+        batch.append(row)
+        if len(batch) >= 2000:
+            ReminderOutbox.objects.using(schema_editor.connection.alias).bulk_update(batch, ['occurrence_end'])
+            batch = []
+    if batch:
+        ReminderOutbox.objects.using(schema_editor.connection.alias).bulk_update(batch, ['occurrence_end'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0012_reminder_shards'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reminderoutbox',
+            name='occurrence_end',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(fill_occurrence_end, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='reminderoutbox',
+            name='occurrence_end',
+            field=models.DateTimeField(),
+        ),
+        migrations.AddIndex(
+            model_name='reminderoutbox',
+            index=models.Index(fields=['occurrence_start', 'due_at'], name='scheduler_outbox_start_idx'),
+        ),
+        migrations.AlterField(
+            model_name='notificationlog',
+            name='status',
+            field=models.CharField(choices=[('sent', 'Enviado'), ('failed', 'Falhou'), ('expired', 'Expirado')], max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='notificationdailystat',
+            name='status',
+            field=models.CharField(choices=[('sent', 'Enviado'), ('failed', 'Falhou'), ('expired', 'Expirado')], max_length=10),
+        ),
+    ]
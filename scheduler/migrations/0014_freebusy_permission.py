@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:28
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0013_outbox_occurrence_end'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='event',
+            options={'ordering': ['start'], 'permissions': [('view_others_freebusy', 'Pode ver o livre/ocupado de outros usuários')]},
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:46
+
+import scheduler.netguard
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0014_freebusy_permission'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='webhookendpoint',
+            name='url',
+            field=models.URLField(max_length=500, validators=[scheduler.netguard.validate_webhook_url]),
+        ),
+    ]
@@ -1,9 +1,15 @@
+import secrets
 from datetime import timedelta
 
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import models
-from django.db.models import F, Q
+from django.db.models import ExpressionWrapper, F, Q, Value
+from django.utils import timezone
+
+from . import recurrence as rec
+from .caching import bump_user_version
+from .netguard import validate_webhook_url
 
 User = settings.AUTH_USER_MODEL
 
@@ -16,6 +22,10 @@ class Event(models.Model):
     start = models.DateTimeField()
     end = models.DateTimeField()
     is_all_day = models.BooleanField(default=False)
+    # Regra RRULE (RFC 5545), ex.: "FREQ=WEEKLY;BYDAY=MO;COUNT=10". Vazio = evento único.
+    recurrence = models.CharField(max_length=500, blank=True)
+    # Fim da última ocorrência (None = série sem fim); usado para filtrar janelas
+    recurrence_end = models.DateTimeField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -28,23 +38,83 @@ class Event(models.Model):
         constraints = [
             models.CheckConstraint(check=Q(end__gte=F('start')), name='event_end_gte_start'),
         ]
+        # /api/freebusy/ de outros usuários (sem ela, só o próprio)
+        permissions = [('view_others_freebusy', 'Pode ver o livre/ocupado de outros usuários')]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # guarda o horário carregado para detectar quando o evento foi movido
+        instance._loaded_schedule = (instance.__dict__.get('start'), instance.__dict__.get('recurrence'))
+        return instance
+
+    @staticmethod
+    def all_day_bounds(start, end):
+        """``(start, end)`` estendidos ao dia inteiro, como ficam gravados quando is_all_day=True."""
+        return (
+            start.replace(hour=0, minute=0, second=0, microsecond=0),
+            end.replace(hour=23, minute=59, second=59, microsecond=0),
+        )
 
     def clean(self):
         if self.end < self.start:
             raise ValidationError('Fim do evento não pode ser anterior ao início.')
         if self.is_all_day:
             # normaliza sempre para o dia inteiro quando is_all_day=True
-            self.start = self.start.replace(hour=0, minute=0, second=0, microsecond=0)
-            self.end = self.end.replace(hour=23, minute=59, second=59, microsecond=0)
+            self.start, self.end = self.all_day_bounds(self.start, self.end)
+        if self.recurrence:
+            try:
+                rec.parse_rrule(self.recurrence, self.start)
+            except (ValueError, TypeError) as exc:
+                raise ValidationError({'recurrence': f'Regra de recorrência inválida: {exc}'})
+
+    @property
+    def is_recurring(self) -> bool:
+        return bool(self.recurrence)
+
+    def next_occurrence_start(self, after=None):
+        """Início da próxima ocorrência a partir de ``after``; para eventos únicos, o próprio start."""
+        if not self.recurrence:
+            return self.start
+        return rec.next_occurrence_start(self, after or timezone.now())
 
     def save(self, *args, **kwargs):
         # Normaliza antes de validar/salvar para garantir consistência
         if self.is_all_day and self.start and self.end:
-            self.start = self.start.replace(hour=0, minute=0, second=0, microsecond=0)
-            self.end = self.end.replace(hour=23, minute=59, second=59, microsecond=0)
+            self.start, self.end = self.all_day_bounds(self.start, self.end)
         # Validação de modelo (inclui clean() e validações de campo)
         self.full_clean()
-        return super().save(*args, **kwargs)
+        self.recurrence_end = rec.series_end(self) if self.recurrence else None
+        loaded = getattr(self, '_loaded_schedule', None)
+        adding = self._state.adding
+        moved = self.pk is not None and loaded is not None and loaded != (self.start, self.recurrence)
+        result = super().save(*args, **kwargs)
+        self._loaded_schedule = (self.start, self.recurrence)
+        if moved:
+            self.reschedule_reminders()
+        elif not adding:
+            # título/local/descrição vão renderizados no outbox
+            from .outbox import sync_outbox
+            sync_outbox(event_ids=[self.pk])
+        return result
+
+    def reschedule_reminders(self) -> int:
+        """Recalcula ``scheduled_for`` de todos os lembretes pendentes num único UPDATE."""
+        # séries: os lembretes apontam sempre para a próxima ocorrência
+        anchor = self.next_occurrence_start() or self.start
+        # o SQLite só multiplica duração por IntegerField "puro"
+        minutes = ExpressionWrapper(F('minutes_before'), output_field=models.IntegerField())
+        offset = ExpressionWrapper(minutes * Value(timedelta(minutes=1)), output_field=models.DurationField())
+        updated = self.reminders.filter(is_sent=False).update(
+            scheduled_for=ExpressionWrapper(Value(anchor) - offset, output_field=models.DateTimeField())
+        )
+        if updated:
+            from .outbox import sync_outbox
+            from .timing import touch_schedule
+            sync_outbox(event_ids=[self.pk])
+            touch_schedule()
+            bump_user_version(self.owner_id)
+        return updated
 
     def __str__(self) -> str:
         return f'{self.title} ({self.start:%Y-%m-%d %H:%M})'
@@ -52,7 +122,11 @@ class Event(models.Model):
 
 class Reminder(models.Model):
     CHANNEL_EMAIL = 'email'
-    CHANNEL_CHOICES = [(CHANNEL_EMAIL, 'E-mail')]
+    CHANNEL_WEBHOOK = 'webhook'
+    CHANNEL_INAPP = 'inapp'
+    # entrega de cada canal: scheduler/channels.py
+    CHANNEL_CHOICES = [(CHANNEL_EMAIL, 'E-mail'), (CHANNEL_WEBHOOK, 'Webhook'), (CHANNEL_INAPP, 'No app')]
+    RETRY_FIELDS = ['attempts', 'next_attempt_at', 'last_error', 'dead_lettered_at']
 
     event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='reminders')
     minutes_before = models.PositiveIntegerField(default=15)
@@ -60,6 +134,11 @@ class Reminder(models.Model):
     scheduled_for = models.DateTimeField(editable=False)
     is_sent = models.BooleanField(default=False)
     sent_at = models.DateTimeField(null=True, blank=True)
+    # Falhas de envio: nova tentativa com backoff exponencial; esgotadas, vai para o dead-letter
+    attempts = models.PositiveSmallIntegerField(default=0, editable=False)
+    next_attempt_at = models.DateTimeField(null=True, blank=True, editable=False)
+    last_error = models.TextField(blank=True, editable=False)
+    dead_lettered_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     class Meta:
         ordering = ['scheduled_for']
@@ -69,12 +148,27 @@ class Reminder(models.Model):
                 name='uniq_reminder_event_minutes_channel',
             ),
         ]
-        indexes = [
-            models.Index(fields=['is_sent', 'scheduled_for']),
-        ]
 
     def compute_scheduled_for(self):
-        return self.event.start - timedelta(minutes=self.minutes_before)
+        # em séries o lembrete aponta para a próxima ocorrência (horizonte rolante)
+        start = self.event.next_occurrence_start() or self.event.start
+        return start - timedelta(minutes=self.minutes_before)
+
+    @property
+    def is_dead_lettered(self) -> bool:
+        return self.dead_lettered_at is not None
+
+    def reset_attempts(self) -> None:
+        """Zera o histórico de falhas (ver ``RETRY_FIELDS``); não salva."""
+        self.attempts = 0
+        self.next_attempt_at = None
+        self.last_error = ''
+        self.dead_lettered_at = None
+
+    @property
+    def occurrence_start(self):
+        """Início da ocorrência a que este lembrete se refere."""
+        return self.scheduled_for + timedelta(minutes=self.minutes_before)
 
     def clean(self):
         if not self.event or self.event.start is None:
@@ -90,10 +184,75 @@ class Reminder(models.Model):
         return f'Lembrete {self.minutes_before}m antes de "{self.event.title}"'
 
 
+class ReminderOutbox(models.Model):
+    """
+    Fila estreita dos lembretes a enviar: uma linha por lembrete pendente fora
+    do dead-letter, já com destinatário e textos renderizados. O despacho só
+    lê esta tabela (sem joins); a linha some quando o lembrete é enviado.
+    Mantida por ``scheduler.outbox.sync_outbox``.
+    """
+    reminder = models.OneToOneField(Reminder, on_delete=models.CASCADE, primary_key=True, related_name='outbox')
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='+')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    # partição do despacho (ver scheduler/sharding.py); por usuário, para o digest não cruzar shards
+    shard = models.PositiveSmallIntegerField(default=0)
+    channel = models.CharField(max_length=20)
+    # scheduled_for, ou a próxima tentativa durante o backoff
+    due_at = models.DateTimeField()
+    occurrence_start = models.DateTimeField()
+    # fim da ocorrência: depois dele o lembrete segue REMINDER_STALE_POLICY
+    occurrence_end = models.DateTimeField()
+    minutes_before = models.PositiveIntegerField()
+    recipient = models.CharField(max_length=254)
+    username = models.CharField(max_length=150)
+    title = models.CharField(max_length=200)
+    location = models.CharField(max_length=200, blank=True)
+    description = models.TextField(blank=True)
+    # Reserva (lease) feita pelo despacho: quem reservou e até quando
+    claimed_by = models.CharField(max_length=32, blank=True, default='')
+    claimed_until = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['due_at'], name='scheduler_outbox_due_idx'),
+            models.Index(fields=['shard', 'due_at'], name='scheduler_outbox_shard_idx'),
+            # recuperação de backlog: eventos que ainda não começaram, os mais próximos primeiro
+            models.Index(fields=['occurrence_start', 'due_at'], name='scheduler_outbox_start_idx'),
+        ]
+
+    @property
+    def scheduled_for(self):
+        return self.occurrence_start - timedelta(minutes=self.minutes_before)
+
+    def __str__(self) -> str:
+        return f'{self.title} -> {self.recipient} ({self.due_at:%Y-%m-%d %H:%M})'
+
+
+class SchedulerNode(models.Model):
+    """Nó de despacho vivo (heartbeat); os shards são divididos entre os nós vistos há pouco."""
+    name = models.CharField(max_length=100, primary_key=True)
+    last_seen = models.DateTimeField()
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class ShardLease(models.Model):
+    """Posse temporária de um shard do outbox por um nó; vence se o nó parar de renovar."""
+    shard = models.PositiveSmallIntegerField(primary_key=True)
+    owner = models.CharField(max_length=100, blank=True, default='')
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self) -> str:
+        return f'shard {self.shard}: {self.owner or "-"}'
+
+
 class NotificationLog(models.Model):
     STATUS_SENT = 'sent'
     STATUS_FAILED = 'failed'
-    STATUS_CHOICES = [(STATUS_SENT, 'Enviado'), (STATUS_FAILED, 'Falhou')]
+    # vencido depois do fim do evento (REMINDER_STALE_POLICY): não entregue
+    STATUS_EXPIRED = 'expired'
+    STATUS_CHOICES = [(STATUS_SENT, 'Enviado'), (STATUS_FAILED, 'Falhou'), (STATUS_EXPIRED, 'Expirado')]
 
     event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='notifications')
     reminder = models.ForeignKey(
@@ -107,7 +266,80 @@ class NotificationLog(models.Model):
 
     class Meta:
         ordering = ['-created_at']
-        indexes = [models.Index(fields=['user', 'created_at'])]
+        indexes = [
+            models.Index(fields=['user', 'created_at']),
+            # varredura da retenção (ver services.compact_notification_logs)
+            models.Index(fields=['created_at'], name='scheduler_notif_created_idx'),
+        ]
 
     def __str__(self) -> str:
         return f'{self.status} - {self.channel} - {self.event.title} - {self.created_at:%Y-%m-%d %H:%M}'
+
+
+class NotificationDailyStat(models.Model):
+    """Contagem diária de envios por usuário/canal/status; sobrevive à limpeza dos logs."""
+    day = models.DateField()
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notification_stats')
+    channel = models.CharField(max_length=20)
+    status = models.CharField(max_length=10, choices=NotificationLog.STATUS_CHOICES)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-day', 'channel', 'status']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'day', 'channel', 'status'], name='uniq_notification_daily_stat'),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.day} - {self.user} - {self.channel}/{self.status}: {self.count}'
+
+
+def _webhook_secret() -> str:
+    return secrets.token_hex(32)
+
+
+class WebhookEndpoint(models.Model):
+    """URL do usuário que recebe os lembretes do canal webhook (POST JSON assinado com HMAC)."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='webhook')
+    url = models.URLField(max_length=500, validators=[validate_webhook_url])
+    secret = models.CharField(max_length=64, default=_webhook_secret)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f'Webhook de {self.user}: {self.url}'
+
+
+class InAppNotification(models.Model):
+    """Aviso exibido dentro do app (canal inapp)."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='inapp_notifications')
+    event = models.ForeignKey(Event, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    title = models.CharField(max_length=200)
+    body = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    read_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['user', 'created_at'])]
+
+    def __str__(self) -> str:
+        return f'{self.user}: {self.title}'
+
+
+def _feed_token() -> str:
+    return secrets.token_urlsafe(24)
+
+
+class CalendarFeed(models.Model):
+    """Link secreto para assinar a agenda do usuário em clientes de calendário."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='calendar_feed')
+    token = models.CharField(max_length=64, unique=True, default=_feed_token)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def rotate(self) -> None:
+        self.token = _feed_token()
+        self.save(update_fields=['token'])
+
+    def __str__(self) -> str:
+        return f'Feed de {self.user}'
@@ -0,0 +1,144 @@
+"""
+Atraso de entrega, fila e vazão do despacho de lembretes.
+
+O despacho roda nos workers Celery, que não servem HTTP; por isso o histograma
+de atraso (``sent_at - scheduled_for``) e os dados da última execução ficam no
+cache compartilhado (``incr``), lidos por ``/metrics`` e ``/health/`` em
+qualquer processo web. A fila é medida direto no banco por ``backlog_stats``.
+"""
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from .models import Reminder, ReminderOutbox
+
+LAG_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600)
+_LAG_FIELDS = [*LAG_BUCKETS, 'sum_ms', 'count']
+_LAST_RUN_KEY = 'scheduler:dispatch:last_run'
+
+
+def _lag_key(channel, field) -> str:
+    return f'scheduler:lag:{channel}:{field}'
+
+
+def _total_key(name) -> str:
+    return f'scheduler:dispatch:{name}_total'
+
+
+def _incr(key, delta) -> None:
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        if not cache.add(key, delta, timeout=None):
+            cache.incr(key, delta)
+
+
+def record_lag(reminders, sent_at) -> None:
+    """Soma ao histograma o atraso dos lembretes enviados em ``sent_at`` (um ``incr`` por bucket)."""
+    counts = defaultdict(Counter)
+    for reminder in reminders:
+        # digest: lembretes puxados antes da hora contam como atraso zero
+        lag = max((sent_at - reminder.scheduled_for).total_seconds(), 0)
+        c = counts[reminder.channel]
+        c['count'] += 1
+        c['sum_ms'] += int(lag * 1000)
+        for bound in LAG_BUCKETS:
+            if lag <= bound:
+                c[bound] += 1
+    for channel, c in counts.items():
+        for field, n in c.items():
+            _incr(_lag_key(channel, field), n)
+
+
+def lag_histogram() -> dict:
+    """``{canal: (contagens cumulativas, soma em s, total)}`` dos canais com envios."""
+    channels = [value for value, _ in Reminder.CHANNEL_CHOICES]
+    found = cache.get_many([_lag_key(ch, f) for ch in channels for f in _LAG_FIELDS])
+    series = {}
+    for channel in channels:
+        count = found.get(_lag_key(channel, 'count'), 0)
+        if count:
+            series[channel] = (
+                [found.get(_lag_key(channel, b), 0) for b in LAG_BUCKETS],
+                found.get(_lag_key(channel, 'sum_ms'), 0) / 1000,
+                count,
+            )
+    return series
+
+
+def backlog_stats(now=None) -> dict:
+    """
+    Profundidade da fila e idade do lembrete vencido mais antigo.
+
+    Lê só o índice ``due_at`` do outbox (COUNT/MIN cobertos pelo índice). Inclui
+    os reservados; falhas em backoff contam a partir da próxima tentativa.
+    """
+    now = now or timezone.now()
+    row = ReminderOutbox.objects.filter(due_at__lte=now).aggregate(depth=Count('*'), oldest=Min('due_at'))
+    oldest = row['oldest']
+    return {
+        'depth': row['depth'],
+        'oldest_due_seconds': round((now - oldest).total_seconds(), 3) if oldest else 0.0,
+    }
+
+
+def record_run(result: dict) -> None:
+    cache.set(_LAST_RUN_KEY, {**result, 'finished_at': timezone.now().isoformat()}, timeout=None)
+    _incr(_total_key('runs'), 1)
+    _incr(_total_key('claimed'), result['claimed'])
+    _incr(_total_key('expired'), result.get('expired', 0))
+
+
+def last_run():
+    return cache.get(_LAST_RUN_KEY)
+
+
+def health() -> dict:
+    """Bloco do ``/health/``: ``degraded`` quando o vencido mais antigo passa de ``REMINDER_LAG_DEGRADED_SECONDS``."""
+    backlog = backlog_stats()
+    return {
+        'status': 'degraded' if backlog['oldest_due_seconds'] > settings.REMINDER_LAG_DEGRADED_SECONDS else 'ok',
+        'backlog': backlog['depth'],
+        'oldest_due_seconds': backlog['oldest_due_seconds'],
+        'last_run': last_run(),
+    }
+
+
+def render_metrics() -> list[str]:
+    from app.metrics import histogram_lines, metric_lines
+
+    backlog = backlog_stats()
+    lines = metric_lines(
+        'scheduler_reminder_backlog', 'Lembretes vencidos e não enviados.', 'gauge', backlog['depth'],
+    )
+    lines += metric_lines(
+        'scheduler_reminder_oldest_due_seconds', 'Idade do lembrete vencido mais antigo.',
+        'gauge', backlog['oldest_due_seconds'],
+    )
+    lines += histogram_lines(
+        'scheduler_reminder_delivery_lag_seconds', 'Atraso entre scheduled_for e o envio.', 'channel',
+        LAG_BUCKETS, [(ch, *values) for ch, values in sorted(lag_histogram().items())],
+    )
+    # enviados: scheduler_reminder_delivery_lag_seconds_count
+    totals = cache.get_many([_total_key(name) for name in ('runs', 'claimed', 'expired')])
+    for name, documentation in (
+        ('runs', 'Execuções do despacho.'),
+        ('claimed', 'Lembretes reservados pelo despacho.'),
+        ('expired', 'Lembretes de eventos já terminados tirados da fila (REMINDER_STALE_POLICY).'),
+    ):
+        lines += metric_lines(
+            f'scheduler_dispatch_{name}_total', documentation, 'counter', totals.get(_total_key(name), 0),
+        )
+    run = last_run()
+    if run:
+        lines += metric_lines(
+            'scheduler_dispatch_last_run_seconds', 'Duração da última execução.', 'gauge', run['seconds'],
+        )
+        lines += metric_lines(
+            'scheduler_dispatch_last_run_claimed_per_second', 'Vazão da última execução.',
+            'gauge', run['claimed_per_second'],
+        )
+    return lines
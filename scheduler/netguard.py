@@ -0,0 +1,64 @@
+"""
+Destinos de webhook: só http/https para endereços públicos.
+
+A URL vem do usuário; sem esta checagem o worker vira um cliente HTTP para a
+rede interna (loopback, redes privadas, metadata da nuvem em 169.254.169.254).
+Ela roda ao salvar (validador do campo) e de novo ao conectar, contra os IPs
+efetivamente usados na conexão, o que cobre DNS que muda depois do cadastro.
+``WEBHOOK_ALLOW_PRIVATE`` desliga as duas (desenvolvimento local).
+"""
+import ipaddress
+import socket
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+
+SCHEMES = ('http', 'https')
+
+
+class BlockedAddress(OSError):
+    """O host resolve para um endereço fora da internet pública."""
+
+
+def is_public(address) -> bool:
+    ip = ipaddress.ip_address(address.split('%')[0])
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+def public_addresses(host, port) -> list:
+    """``getaddrinfo`` de ``host``; BlockedAddress se algum endereço não for público."""
+    infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    if not settings.WEBHOOK_ALLOW_PRIVATE and not all(is_public(info[4][0]) for info in infos):
+        raise BlockedAddress(f'{host} resolve para um endereço não público')
+    return infos
+
+
+def create_connection(address, timeout=socket._GLOBAL_DEFAULT_TIMEOUT, source_address=None):
+    """``socket.create_connection`` que só conecta nos IPs já checados (sem nova resolução)."""
+    host, port = address
+    error = None
+    for *_, sockaddr in public_addresses(host, port):
+        try:
+            return socket.create_connection(sockaddr[:2], timeout, source_address)
+        except OSError as exc:
+            error = exc
+    raise error or OSError(f'{host}: nenhum endereço')
+
+
+def validate_webhook_url(url) -> None:
+    parts = urlsplit(url)
+    try:
+        port = parts.port
+    except ValueError:
+        raise ValidationError('Porta inválida.')
+    if parts.scheme not in SCHEMES or not parts.hostname:
+        raise ValidationError('Use uma URL http ou https.')
+    try:
+        public_addresses(parts.hostname, port or (443 if parts.scheme == 'https' else 80))
+    except BlockedAddress:
+        raise ValidationError('O webhook precisa apontar para um endereço público.')
+    except (OSError, UnicodeError):
+        raise ValidationError('Não foi possível resolver o host do webhook.')
@@ -0,0 +1,71 @@
+"""
+Manutenção do outbox (``ReminderOutbox``): a fila que o despacho varre.
+
+Toda escrita que cria, reagenda, reenfileira ou muda o texto de lembretes
+chama ``sync_outbox`` com os lembretes ou eventos afetados; o despacho apaga
+as linhas dos enviados e adia as das falhas (ver ``services._persist_results``).
+Assim a varredura de vencidos não cresce com o histórico de ``Reminder``.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Reminder, ReminderOutbox
+from .sharding import shard_for
+
+
+def outbox_row(reminder) -> ReminderOutbox:
+    """Linha (não salva) do outbox; usa ``reminder.event`` e ``event.owner``."""
+    event = reminder.event
+    owner = event.owner
+    due_at = reminder.scheduled_for
+    if reminder.next_attempt_at and reminder.next_attempt_at > due_at:
+        due_at = reminder.next_attempt_at
+    return ReminderOutbox(
+        reminder=reminder, event_id=event.pk, user_id=owner.pk, shard=shard_for(owner.pk), channel=reminder.channel,
+        due_at=due_at, occurrence_start=reminder.occurrence_start,
+        occurrence_end=reminder.occurrence_start + (event.end - event.start), minutes_before=reminder.minutes_before,
+        recipient=owner.email, username=owner.get_username(),
+        title=event.title, location=event.location, description=event.description,
+    )
+
+
+def enqueue(reminders) -> None:
+    """Lembretes recém-criados, com evento e dono já em memória: um INSERT, sem leituras."""
+    ReminderOutbox.objects.bulk_create([outbox_row(r) for r in reminders if not r.is_sent], batch_size=500)
+
+
+def sync_outbox(reminder_ids=None, event_ids=None) -> int:
+    """
+    Reescreve as linhas dos lembretes dados (ou de todos os lembretes dos
+    eventos dados): pendentes fora do dead-letter entram, os demais saem.
+    Reservas ainda válidas são preservadas, para não reenviar o que um worker
+    está enviando. Retorna quantas linhas ficaram.
+    """
+    if reminder_ids is not None:
+        lookup = {'pk__in': list(reminder_ids)}
+    else:
+        lookup = {'event_id__in': list(event_ids)}
+    if not next(iter(lookup.values())):
+        return 0
+    now = timezone.now()
+    with transaction.atomic():
+        claims = {
+            pk: (by, until)
+            for pk, by, until in ReminderOutbox.objects.filter(claimed_until__gt=now, **lookup)
+            .values_list('pk', 'claimed_by', 'claimed_until')
+        }
+        rows = [
+            outbox_row(reminder)
+            for reminder in Reminder.objects.select_related('event', 'event__owner')
+            .filter(is_sent=False, dead_lettered_at__isnull=True, **lookup)
+        ]
+        for row in rows:
+            row.claimed_by, row.claimed_until = claims.get(row.pk, ('', None))
+        ReminderOutbox.objects.filter(**lookup).delete()
+        ReminderOutbox.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
+
+
+def refresh_recipient(user) -> int:
+    """E-mail/nome do usuário mudou: atualiza as linhas pendentes dele."""
+    return ReminderOutbox.objects.filter(user=user).update(recipient=user.email, username=user.get_username())
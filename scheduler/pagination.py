@@ -0,0 +1,123 @@
+import json
+from datetime import date
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, _reverse_ordering
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Paginação por cursor (keyset) sobre a tupla inteira da ordenação.
+
+    O ``CursorPagination`` do DRF posiciona só pela primeira coluna e resolve
+    empates com OFFSET (lento e limitado a ``offset_cutoff``). Aqui o cursor
+    guarda os valores de todas as colunas da ordenação, que sempre termina no
+    id, e cada página é ``col > v OR (col = v AND id > i)``: exato com valores
+    repetidos e com custo constante em qualquer profundidade.
+    """
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        # ?ordering=title não é único: o id desempata para o cursor ser exato
+        if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            ordering += ('-id' if ordering[-1].startswith('-') else 'id',)
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = bool(self.cursor and self.cursor.reverse)
+        position = self._decode_position(self.cursor.position) if self.cursor else None
+
+        queryset = queryset.order_by(*(_reverse_ordering(self.ordering) if reverse else self.ordering))
+        if position is not None:
+            queryset = queryset.filter(self._after(position, reverse))
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        more = len(results) > self.page_size
+        if reverse:
+            self.page.reverse()
+        self.has_next = position is not None if reverse else more
+        self.has_previous = more if reverse else position is not None
+        self.display_page_controls = (self.has_previous or self.has_next) and self.template is not None
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        position = (
+            self._get_position_from_instance(self.page[-1], self.ordering) if self.page else self.cursor.position
+        )
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        position = (
+            self._get_position_from_instance(self.page[0], self.ordering) if self.page else self.cursor.position
+        )
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def _after(self, position, reverse):
+        """Linhas depois de ``position`` na ordenação (antes, se ``reverse``)."""
+        terms = []
+        for i, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') != reverse else 'gt'
+            equal = {f.lstrip('-'): v for f, v in zip(self.ordering[:i], position)}
+            terms.append(Q(**equal, **{f'{name}__{lookup}': position[i]}))
+        return reduce(or_, terms)
+
+    def _decode_position(self, raw):
+        if raw is None:
+            return None
+        try:
+            position = json.loads(raw)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for field in ordering:
+            name = field.lstrip('-')
+            value = instance[name] if isinstance(instance, dict) else getattr(instance, name)
+            # isoformat completo: o DjangoJSONEncoder corta os microssegundos e o cursor deixaria de ser exato
+            values.append(value.isoformat() if isinstance(value, date) else value)
+        return json.dumps(values, separators=(',', ':'))
+
+
+class EventPagination(KeysetPagination):
+    ordering = ('start', 'id')
+
+    def get_ordering(self, request, queryset, view):
+        # ?search= sem ?ordering: mais relevantes primeiro
+        if 'search_rank' in queryset.query.annotations and not request.query_params.get('ordering'):
+            return ('-search_rank', '-id')
+        return super().get_ordering(request, queryset, view)
+
+
+class ReminderPagination(KeysetPagination):
+    ordering = ('scheduled_for', 'id')
+
+
+class NotificationLogPagination(KeysetPagination):
+    ordering = ('-created_at', '-id')
+
+
+class InAppNotificationPagination(KeysetPagination):
+    ordering = ('-created_at', '-id')
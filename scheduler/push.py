@@ -0,0 +1,181 @@
+"""
+Push em tempo real (Server-Sent Events) dos avisos in-app.
+
+O despacho chama ``publish`` (código síncrono, qualquer processo). Com
+``PUSH_REDIS_URL`` a mensagem vai por Redis pub/sub e cada processo ASGI mantém
+uma única assinatura, repassada pelo ``Hub`` às filas dos clientes conectados
+daquele usuário; sem Redis, o hub local só alcança clientes do mesmo processo.
+
+``sse_app`` é um app ASGI puro (ver ``app/asgi.py``): uma conexão ociosa custa
+uma fila e uma corrotina parada, sem request/middlewares do Django.
+"""
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from http.cookies import SimpleCookie
+from importlib import import_module
+from types import SimpleNamespace
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import auth
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.authtoken.models import Token
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = 'scheduler:push:'
+
+_redis_client = None
+
+
+def _redis():
+    global _redis_client
+    if _redis_client is None:
+        import redis
+        _redis_client = redis.Redis.from_url(settings.PUSH_REDIS_URL)
+    return _redis_client
+
+
+def publish(user_id, payload: dict) -> None:
+    """Envia ``payload`` aos clientes conectados do usuário. Nunca levanta: push é best-effort."""
+    data = json.dumps(payload, cls=DjangoJSONEncoder)
+    try:
+        if settings.PUSH_REDIS_URL:
+            _redis().publish(f'{CHANNEL_PREFIX}{user_id}', data)
+        else:
+            hub.publish_threadsafe(user_id, data)
+    except Exception:
+        logger.warning('Falha ao publicar push para o usuário %s', user_id, exc_info=True)
+
+
+class Hub:
+    """Fan-out dentro do processo ASGI: usuário -> filas dos clientes conectados."""
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._loop = None
+        self._listener = None
+
+    def subscribe(self, user_id) -> asyncio.Queue:
+        self._loop = asyncio.get_running_loop()
+        if settings.PUSH_REDIS_URL and (self._listener is None or self._listener.done()):
+            self._listener = self._loop.create_task(self._listen())
+        queue = asyncio.Queue(maxsize=settings.PUSH_QUEUE_SIZE)
+        self._subscribers[user_id].add(queue)
+        return queue
+
+    def unsubscribe(self, user_id, queue) -> None:
+        queues = self._subscribers.get(user_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[user_id]
+
+    def connections(self) -> int:
+        return sum(len(q) for q in self._subscribers.values())
+
+    def dispatch(self, user_id, data: str) -> None:
+        for queue in self._subscribers.get(user_id, ()):
+            if queue.full():
+                # cliente lento: descarta o mais antigo em vez de crescer sem limite
+                queue.get_nowait()
+            queue.put_nowait(data)
+
+    def publish_threadsafe(self, user_id, data: str) -> None:
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self.dispatch, user_id, data)
+
+    async def _listen(self):
+        import redis.asyncio as aioredis
+        while True:
+            client = aioredis.Redis.from_url(settings.PUSH_REDIS_URL)
+            try:
+                async with client.pubsub() as pubsub:
+                    await pubsub.psubscribe(f'{CHANNEL_PREFIX}*')
+                    async for message in pubsub.listen():
+                        if message['type'] != 'pmessage':
+                            continue
+                        user_id = int(message['channel'].decode()[len(CHANNEL_PREFIX):])
+                        self.dispatch(user_id, message['data'].decode())
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning('Assinatura de push no Redis caiu; reconectando', exc_info=True)
+                await asyncio.sleep(1)
+            finally:
+                await client.aclose()
+
+
+hub = Hub()
+
+
+def _authenticate(headers: dict, query: dict):
+    """Usuário da sessão (cookie) ou do token DRF (header ``Authorization`` ou ``?token=``)."""
+    key = query.get('token', [''])[0]
+    authorization = headers.get('authorization', '')
+    if authorization.lower().startswith('token '):
+        key = authorization[6:].strip()
+    if key:
+        token = Token.objects.select_related('user').filter(key=key).first()
+        return token.user if token and token.user.is_active else None
+
+    cookie = SimpleCookie(headers.get('cookie', ''))
+    morsel = cookie.get(settings.SESSION_COOKIE_NAME)
+    if morsel is None:
+        return None
+    store = import_module(settings.SESSION_ENGINE).SessionStore(morsel.value)
+    user = auth.get_user(SimpleNamespace(session=store))
+    return user if user.is_authenticated else None
+
+
+async def _send_text(send, status, text):
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'text/plain; charset=utf-8')]})
+    await send({'type': 'http.response.body', 'body': text.encode()})
+
+
+async def _wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def sse_app(scope, receive, send):
+    """``GET /api/stream/``: eventos ``reminder`` do usuário autenticado, com ping periódico."""
+    if scope['method'] != 'GET':
+        return await _send_text(send, 405, 'Use GET.')
+    headers = {k.decode('latin-1').lower(): v.decode('latin-1') for k, v in scope['headers']}
+    query = parse_qs(scope.get('query_string', b'').decode())
+    user = await sync_to_async(_authenticate)(headers, query)
+    if user is None:
+        return await _send_text(send, 401, 'Autenticação necessária.')
+
+    queue = hub.subscribe(user.pk)
+    disconnected = asyncio.ensure_future(_wait_disconnect(receive))
+    try:
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),  # nginx: não bufferizar
+        ]})
+        await send({'type': 'http.response.body', 'body': b'retry: 5000\n\n', 'more_body': True})
+        while True:
+            getter = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait(
+                {getter, disconnected}, timeout=settings.PUSH_KEEPALIVE_SECONDS,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if disconnected in done:
+                getter.cancel()
+                break
+            if getter in done:
+                chunk = f'event: reminder\ndata: {getter.result()}\n\n'
+            else:
+                getter.cancel()
+                chunk = ': ping\n\n'
+            await send({'type': 'http.response.body', 'body': chunk.encode(), 'more_body': True})
+    finally:
+        hub.unsubscribe(user.pk, queue)
+        disconnected.cancel()
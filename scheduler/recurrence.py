@@ -0,0 +1,119 @@
+import heapq
+import itertools
+from collections import namedtuple
+from datetime import timedelta, timezone as dt_timezone
+
+from dateutil.parser import isoparse
+from dateutil.rrule import rrule, rrulestr
+from django.conf import settings
+from django.utils import timezone
+
+Occurrence = namedtuple('Occurrence', ['event', 'start', 'end'])
+
+
+# Frequências sub-diárias geram séries grandes demais para expandir numa requisição
+ALLOWED_FREQS = {'YEARLY', 'MONTHLY', 'WEEKLY', 'DAILY'}
+
+
+def _parse(rule: str, dtstart):
+    """``(rrule, partes)`` de uma regra de uma linha só, já dentro dos limites."""
+    text = rule.strip()
+    if text.upper().startswith('RRULE:'):
+        text = text[len('RRULE:'):]
+    # EXDATE/RDATE/várias linhas viram rruleset: só uma RRULE simples é aceita
+    if not text or '\n' in text or '\r' in text or ':' in text:
+        raise ValueError('informe uma única linha RRULE.')
+    parts = {}
+    for item in text.split(';'):
+        key, sep, value = item.partition('=')
+        if not sep:
+            raise ValueError(f'parte inválida: {item!r}.')
+        parts[key.strip().upper()] = value.strip()
+    if parts.get('FREQ', '').upper() not in ALLOWED_FREQS:
+        raise ValueError(f'FREQ deve ser uma de {", ".join(sorted(ALLOWED_FREQS))}.')
+    if 'COUNT' in parts:
+        count = int(parts['COUNT'])
+        if not 0 < count <= settings.RECURRENCE_MAX_COUNT:
+            raise ValueError(f'COUNT deve estar entre 1 e {settings.RECURRENCE_MAX_COUNT}.')
+        parts['COUNT'] = count
+    if 'UNTIL' in parts:
+        raw = parts['UNTIL']
+        until = isoparse(raw)
+        if len(raw) == 8:
+            # só a data (séries de dia inteiro no ICS): inclui o dia todo
+            until = until.replace(hour=23, minute=59, second=59)
+        if timezone.is_naive(until):
+            until = timezone.make_aware(until, timezone.get_current_timezone())
+        if until > dtstart + timedelta(days=365 * settings.RECURRENCE_MAX_YEARS):
+            raise ValueError(f'UNTIL pode estar no máximo {settings.RECURRENCE_MAX_YEARS} anos após o início.')
+        parts['UNTIL'] = until
+        # com DTSTART aware o dateutil só aceita UNTIL em UTC
+        text = ';'.join(
+            f'{key}={until.astimezone(dt_timezone.utc):%Y%m%dT%H%M%SZ}' if key == 'UNTIL' else f'{key}={value}'
+            for key, value in parts.items()
+        )
+    parsed = rrulestr(text, dtstart=timezone.localtime(dtstart), forceset=False)
+    if not isinstance(parsed, rrule):
+        raise ValueError('informe uma única linha RRULE.')
+    return parsed, parts
+
+
+def parse_rrule(rule: str, dtstart):
+    """
+    Interpreta uma regra no formato RRULE (RFC 5545), com ou sem o prefixo
+    ``RRULE:``. A expansão é feita no fuso local para que "toda segunda às 9h"
+    continue às 9h depois de uma troca de horário de verão.
+
+    Só frequências diárias ou maiores; COUNT e UNTIL têm teto
+    (``RECURRENCE_MAX_COUNT``/``RECURRENCE_MAX_YEARS``). Levanta ValueError.
+    """
+    return _parse(rule, dtstart)[0]
+
+
+def series_end(event):
+    """Fim da última ocorrência, ou None se a série não tem fim (sem COUNT/UNTIL)."""
+    rule, parts = _parse(event.recurrence, event.start)
+    if 'COUNT' in parts:
+        # no máximo RECURRENCE_MAX_COUNT passos, e só até a última ocorrência
+        last = next(itertools.islice(rule, parts['COUNT'] - 1, None), None)
+    elif 'UNTIL' in parts:
+        last = rule.before(parts['UNTIL'], inc=True)
+    else:
+        return None
+    if last is None:
+        return event.end
+    return last + (event.end - event.start)
+
+
+def next_occurrence_start(event, after):
+    """Início da primeira ocorrência com início >= ``after`` (None se a série acabou)."""
+    if not event.recurrence:
+        return event.start if event.start >= after else None
+    return parse_rrule(event.recurrence, event.start).after(after, inc=True)
+
+
+def occurrences(event, window_start, window_end):
+    """
+    Gera, sob demanda, as ocorrências do evento que tocam a janela.
+
+    Nada é materializado no banco: séries infinitas são expandidas só até
+    ``window_end``.
+    """
+    duration = event.end - event.start
+    if not event.recurrence:
+        if event.start <= window_end and event.end >= window_start:
+            yield Occurrence(event, event.start, event.end)
+        return
+    rule = parse_rrule(event.recurrence, event.start)
+    for start in rule.xafter(window_start - duration, inc=True):
+        if start > window_end:
+            break
+        yield Occurrence(event, start, start + duration)
+
+
+def expand_events(events, window_start, window_end):
+    """Intercala as ocorrências de vários eventos em ordem de início."""
+    return heapq.merge(
+        *(occurrences(e, window_start, window_end) for e in events),
+        key=lambda occ: (occ.start, occ.event.pk),
+    )
@@ -0,0 +1,90 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import NotificationDailyStat, NotificationLog
+
+
+def expired_logs(now=None):
+    """Logs além do TTL do seu status (falhas vencem antes: uma por minuto por lembrete)."""
+    now = now or timezone.now()
+    return NotificationLog.objects.filter(
+        Q(status=NotificationLog.STATUS_FAILED,
+          created_at__lt=now - timedelta(days=settings.NOTIFICATION_LOG_FAILED_RETENTION_DAYS))
+        | Q(created_at__lt=now - timedelta(days=settings.NOTIFICATION_LOG_RETENTION_DAYS))
+    )
+
+
+def _add_daily_stats(rows) -> None:
+    """Soma as contagens ``(user_id, day, channel, status, n)`` nas linhas agregadas."""
+    if not rows:
+        return
+    existing = {
+        (s.user_id, s.day, s.channel, s.status): s
+        for s in NotificationDailyStat.objects.select_for_update().filter(
+            user_id__in={r['user_id'] for r in rows}, day__in={r['day'] for r in rows},
+        )
+    }
+    new, changed = [], []
+    for r in rows:
+        stat = existing.get((r['user_id'], r['day'], r['channel'], r['status']))
+        if stat is None:
+            new.append(NotificationDailyStat(
+                user_id=r['user_id'], day=r['day'], channel=r['channel'], status=r['status'], count=r['n'],
+            ))
+        else:
+            stat.count += r['n']
+            changed.append(stat)
+    NotificationDailyStat.objects.bulk_create(new)
+    NotificationDailyStat.objects.bulk_update(changed, ['count'])
+
+
+def _compact_batch(now, batch_size) -> int:
+    with transaction.atomic():
+        qs = expired_logs(now).order_by('created_at', 'pk')
+        if connection.features.has_select_for_update_skip_locked:
+            # execuções concorrentes pegam lotes disjuntos
+            qs = qs.select_for_update(skip_locked=True)
+        ids = list(qs.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return 0
+        batch = NotificationLog.objects.filter(pk__in=ids)
+        rows = list(
+            batch.annotate(day=TruncDate('created_at'))
+            .values('user_id', 'day', 'channel', 'status')
+            .annotate(n=Count('pk'))
+            .order_by()
+        )
+        _add_daily_stats(rows)
+        deleted, _ = batch.delete()
+        if deleted != len(ids):
+            # outra execução apagou parte do lote (SQLite): desfaz para não contar duas vezes
+            transaction.set_rollback(True)
+            return -1
+        return deleted
+
+
+def compact_notification_logs(now=None, batch_size=None, max_batches=None) -> dict:
+    """
+    Compacta os logs vencidos em ``NotificationDailyStat`` e os remove.
+
+    Cada lote (``NOTIFICATION_PURGE_BATCH_SIZE`` linhas, pelo índice de
+    ``created_at``) é agregado e apagado numa transação curta, então a limpeza
+    nunca segura locks por muito tempo; o que passar de ``max_batches`` fica
+    para a próxima execução.
+    """
+    now = now or timezone.now()
+    batch_size = batch_size or settings.NOTIFICATION_PURGE_BATCH_SIZE
+    max_batches = max_batches or settings.NOTIFICATION_PURGE_MAX_BATCHES
+    compacted = batches = 0
+    while batches < max_batches:
+        n = _compact_batch(now, batch_size)
+        if n == 0:
+            break
+        batches += 1
+        compacted += max(n, 0)
+    return {'compacted': compacted, 'batches': batches}
@@ -0,0 +1,68 @@
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import SearchFilter
+
+from .models import Event
+
+# mesma configuração da coluna gerada na migração 0007
+SEARCH_CONFIG = 'portuguese'
+
+_fts_table = {}
+
+
+def _has_fts_table() -> bool:
+    if connection.alias not in _fts_table:
+        _fts_table[connection.alias] = 'scheduler_event_fts' in connection.introspection.table_names()
+    return _fts_table[connection.alias]
+
+
+def search_supported() -> bool:
+    return connection.vendor == 'postgresql' or (connection.vendor == 'sqlite' and _has_fts_table())
+
+
+def search_terms(text: str) -> list[str]:
+    # só letras/dígitos: a consulta é montada a partir deles e nunca do texto cru
+    return re.findall(r'\w+', text or '')
+
+
+def search_events(queryset, text: str):
+    """
+    Filtra pelo índice de texto completo e anota ``search_rank`` (maior = mais
+    relevante). Todos os termos precisam aparecer; cada um vale como prefixo
+    ("reun" acha "Reunião"). Título pesa mais que local, que pesa mais que a
+    descrição.
+    """
+    terms = search_terms(text)
+    if not terms:
+        return queryset
+    table = Event._meta.db_table
+    if connection.vendor == 'postgresql':
+        query = ' & '.join(f'{t}:*' for t in terms)
+        tsquery = f"to_tsquery('{SEARCH_CONFIG}', %s)"
+        queryset = queryset.filter(RawSQL(
+            f'"{table}"."search_vector" @@ {tsquery}', (query,), output_field=BooleanField(),
+        ))
+        rank = RawSQL(f'ts_rank_cd("{table}"."search_vector", {tsquery})::float8', (query,), output_field=FloatField())
+    else:
+        query = ' '.join(f'"{t}"*' for t in terms)
+        queryset = queryset.filter(id__in=RawSQL(
+            'SELECT rowid FROM scheduler_event_fts WHERE scheduler_event_fts MATCH %s', (query,)
+        ))
+        # bm25 é "menor = melhor"; pesos na ordem das colunas (título, descrição, local)
+        rank = RawSQL(
+            '(SELECT -bm25(scheduler_event_fts, 10.0, 1.0, 4.0) FROM scheduler_event_fts '
+            f'WHERE scheduler_event_fts MATCH %s AND rowid = "{table}"."id")', (query,), output_field=FloatField(),
+        )
+    return queryset.annotate(search_rank=rank)
+
+
+class FullTextSearchFilter(SearchFilter):
+    """``?search=`` pelo índice de texto completo, com o ``SearchFilter`` como fallback."""
+
+    def filter_queryset(self, request, queryset, view):
+        if not search_supported():
+            return super().filter_queryset(request, queryset, view)
+        return search_events(queryset, request.query_params.get(self.search_param, ''))
@@ -1,33 +1,69 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
 from rest_framework import serializers
-from .models import Event, Reminder, NotificationLog
+from rest_framework.exceptions import PermissionDenied
+from .conflicts import find_conflicts
+from .models import Event, InAppNotification, Reminder, NotificationLog, WebhookEndpoint
+from .recurrence import parse_rrule
+from .services import sync_event_reminders
 
 
 class ReminderInlineSerializer(serializers.ModelSerializer):
     class Meta:
         model = Reminder
-        fields = ['id', 'minutes_before', 'channel', 'scheduled_for', 'is_sent', 'sent_at']
-        read_only_fields = ['scheduled_for', 'is_sent', 'sent_at']
+        fields = ['id', 'minutes_before', 'channel', 'scheduled_for', 'is_sent', 'sent_at', *Reminder.RETRY_FIELDS]
+        read_only_fields = ['scheduled_for', 'is_sent', 'sent_at', *Reminder.RETRY_FIELDS]
 
 
 class ReminderSerializer(serializers.ModelSerializer):
     # usado nos endpoints de /api/reminders/ (inclui o campo event)
     class Meta:
         model = Reminder
-        fields = ['id', 'event', 'minutes_before', 'channel', 'scheduled_for', 'is_sent', 'sent_at']
-        read_only_fields = ['scheduled_for', 'is_sent', 'sent_at']
+        fields = ['id', 'event', 'minutes_before', 'channel', 'scheduled_for', 'is_sent', 'sent_at', *Reminder.RETRY_FIELDS]
+        read_only_fields = ['scheduled_for', 'is_sent', 'sent_at', *Reminder.RETRY_FIELDS]
 
 
 class EventSerializer(serializers.ModelSerializer):
     # usado nos endpoints de /api/events/ (aninha lembretes sem o campo event para evitar recursão)
     reminders = ReminderInlineSerializer(many=True, required=False)
+    # opcional: recusa o evento se ele se sobrepõe a outro do mesmo usuário
+    check_conflicts = serializers.BooleanField(write_only=True, required=False, default=False)
 
     class Meta:
         model = Event
         fields = [
             'id', 'title', 'description', 'location',
-            'start', 'end', 'is_all_day', 'reminders',
+            'start', 'end', 'is_all_day', 'recurrence', 'reminders', 'check_conflicts',
         ]
 
+    def validate(self, attrs):
+        rule = attrs.get('recurrence', getattr(self.instance, 'recurrence', ''))
+        start = attrs.get('start', getattr(self.instance, 'start', None))
+        if rule and start:
+            try:
+                parse_rrule(rule, start)
+            except (ValueError, TypeError) as exc:
+                raise serializers.ValidationError({'recurrence': f'Regra de recorrência inválida: {exc}'})
+        if attrs.pop('check_conflicts', False):
+            end = attrs.get('end', getattr(self.instance, 'end', None))
+            if start and end:
+                # compara com os horários que vão ser gravados
+                if attrs.get('is_all_day', getattr(self.instance, 'is_all_day', False)):
+                    start, end = Event.all_day_bounds(start, end)
+                self._check_conflicts(start, end, rule)
+        return attrs
+
+    def _check_conflicts(self, start, end, rule=''):
+        owner = self.instance.owner_id if self.instance else self.context['request'].user.pk
+        pk = self.instance.pk if self.instance else None
+        conflicts = find_conflicts(owner, start, end, exclude_pk=pk, recurrence=rule)
+        if conflicts:
+            raise serializers.ValidationError({'conflicts': [
+                {'id': e.pk, 'title': e.title, 'start': e.start, 'end': e.end} for e in conflicts
+            ]})
+
     def create(self, validated_data):
         reminders_data = validated_data.pop('reminders', [])
         event = Event.objects.create(owner=self.context['request'].user, **validated_data)
@@ -43,15 +79,71 @@ class EventSerializer(serializers.ModelSerializer):
             setattr(instance, attr, val)
         instance.save()
 
+        # mudança de horário já reagenda os pendentes em Event.save()
         if reminders_data is not None:
-            instance.reminders.all().delete()
-            for r in reminders_data:
-                Reminder.objects.create(event=instance, **r)
+            sync_event_reminders(instance, reminders_data)
         return instance
 
 
+class OccurrenceSerializer(serializers.Serializer):
+    # ocorrência expandida (não persistida) de um evento ou série
+    event = serializers.IntegerField(source='event.pk')
+    title = serializers.CharField(source='event.title')
+    location = serializers.CharField(source='event.location')
+    is_all_day = serializers.BooleanField(source='event.is_all_day')
+    is_recurring = serializers.BooleanField(source='event.is_recurring')
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+
+
 class NotificationLogSerializer(serializers.ModelSerializer):
     class Meta:
         model = NotificationLog
         fields = ['id', 'event', 'reminder', 'user', 'channel', 'status', 'error_message', 'created_at']
         read_only_fields = fields
+
+
+class InAppNotificationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = InAppNotification
+        fields = ['id', 'event', 'title', 'body', 'created_at', 'read_at']
+        read_only_fields = fields
+
+
+class WebhookEndpointSerializer(serializers.ModelSerializer):
+    # o segredo só é mostrado ao dono, para validar a assinatura X-Agenda-Signature
+    class Meta:
+        model = WebhookEndpoint
+        fields = ['url', 'is_active', 'secret', 'created_at']
+        read_only_fields = ['secret', 'created_at']
+
+
+class FreeBusyQuerySerializer(serializers.Serializer):
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+    # ids separados por vírgula; vazio = o próprio usuário
+    users = serializers.CharField(required=False, allow_blank=True)
+
+    def validate_users(self, value):
+        try:
+            ids = sorted({int(v) for v in value.split(',') if v.strip()})
+        except ValueError:
+            raise serializers.ValidationError('Use ids numéricos separados por vírgula.')
+        user = self.context['request'].user
+        # antes de procurar os usuários: sem a permissão não dá nem para saber quais ids existem
+        if set(ids) - {user.pk} and not user.has_perm('scheduler.view_others_freebusy'):
+            raise PermissionDenied('Sem permissão para ver o livre/ocupado de outros usuários.')
+        if len(ids) > settings.FREEBUSY_MAX_USERS:
+            raise serializers.ValidationError(f'Máximo de {settings.FREEBUSY_MAX_USERS} usuários.')
+        found = set(get_user_model().objects.filter(pk__in=ids, is_active=True).values_list('pk', flat=True))
+        missing = [i for i in ids if i not in found]
+        if missing:
+            raise serializers.ValidationError(f'Usuários não encontrados: {missing}')
+        return ids
+
+    def validate(self, attrs):
+        if attrs['end'] <= attrs['start']:
+            raise serializers.ValidationError({'end': 'Fim deve ser posterior ao início.'})
+        if attrs['end'] - attrs['start'] > timedelta(days=settings.FREEBUSY_MAX_DAYS):
+            raise serializers.ValidationError({'end': f'Intervalo máximo: {settings.FREEBUSY_MAX_DAYS} dias.'})
+        return attrs
@@ -1,7 +1,23 @@
-from django.core.mail import send_mail
+import smtplib
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection, send_mail
 from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db import models
+from django.db.models import Case, F, OuterRef, Q, Subquery, Value, When
 from django.utils import timezone
-from .models import Reminder, NotificationLog
+from . import monitoring, recurrence as rec
+from .caching import bump_user_version
+from .channels import get_channel
+from .ics import iter_vevents, vevent_to_fields
+from . import push
+from .models import Event, InAppNotification, Reminder, ReminderOutbox, NotificationLog
+from .outbox import enqueue, outbox_row, sync_outbox
+from .timing import touch_schedule
 
 def send_event_email(user_email: str, subject: str, message: str) -> None:
     send_mail(
@@ -12,38 +28,623 @@ def send_event_email(user_email: str, subject: str, message: str) -> None:
         fail_silently= False,
     )
 
-def notify_reminder(reminder: Reminder):
-    event = reminder.event
-    user = event.owner
-    subject = f'Lembrete: {event.title}'
-    start_fmt = timezone.localtime(event.start).strftime("%d/%m/%Y %H:%M")
+
+def send_event_emails(messages: list[EmailMessage], connection=None) -> list[tuple[bool, str]]:
+    """
+    Envia várias mensagens reaproveitando uma única conexão do backend.
+
+    Retorna ``(ok, erro)`` para cada mensagem, na mesma ordem. Uma falha em uma
+    mensagem não interrompe as demais; se o servidor derrubar a conexão ela é
+    reaberta na próxima mensagem. Uma ``connection`` já aberta pode ser passada
+    para reaproveitá-la entre chamadas (quem abriu fecha).
+    """
+    if not messages:
+        return []
+    own_conn = connection is None
+    conn = connection or get_connection(fail_silently=False)
+    if own_conn:
+        try:
+            conn.open()
+        except Exception as exc:
+            return [(False, str(exc))] * len(messages)
+
+    results = []
+    try:
+        for msg in messages:
+            msg.connection = conn
+            try:
+                if conn.send_messages([msg]):
+                    results.append((True, ''))
+                else:
+                    results.append((False, 'Mensagem sem destinatário.'))
+            except Exception as exc:
+                if isinstance(exc, smtplib.SMTPServerDisconnected):
+                    conn.close()
+                results.append((False, str(exc)))
+    finally:
+        if own_conn:
+            conn.close()
+    return results
+
+
+def build_reminder_message(entry: ReminderOutbox) -> EmailMessage:
+    subject = f'Lembrete: {entry.title}'
+    start_fmt = timezone.localtime(entry.occurrence_start).strftime("%d/%m/%Y %H:%M")
     body = (
-        f'Olá {user.get_username()},\n\n'
-        f'Seu evento "{event.title}" começa em {reminder.minutes_before} minutos.\n'
+        f'Olá {entry.username},\n\n'
+        f'Seu evento "{entry.title}" começa em {entry.minutes_before} minutos.\n'
         f'Início: {start_fmt}\n'
-        f'Local: {event.location or '-'}\n\n'
-        f'Descrição:\n{event.description or '-'}\n'
+        f'Local: {entry.location or '-'}\n\n'
+        f'Descrição:\n{entry.description or '-'}\n'
+    )
+    return EmailMessage(
+        subject=subject,
+        body=body,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[entry.recipient],
+    )
+
+
+def build_digest_message(entries) -> EmailMessage:
+    """
+    Uma mensagem para vários lembretes do mesmo usuário. Cada ocorrência
+    aparece uma vez, mesmo que tenha mais de um lembrete no grupo.
+    """
+    occurrences = {}
+    for entry in entries:
+        occurrences.setdefault((entry.event_id, entry.occurrence_start), entry)
+    if len(occurrences) == 1:
+        return build_reminder_message(entries[0])
+    lines = []
+    for (_, start), entry in sorted(occurrences.items(), key=lambda item: item[0][1]):
+        lines.append(
+            f'- {timezone.localtime(start).strftime("%d/%m %H:%M")} {entry.title}'
+            f' (Local: {entry.location or '-'})'
+        )
+    body = (
+        f'Olá {entries[0].username},\n\n'
+        f'Seus próximos eventos:\n' + '\n'.join(lines) + '\n'
+    )
+    return EmailMessage(
+        subject=f'Lembretes: {len(occurrences)} eventos em breve',
+        body=body,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[entries[0].recipient],
+    )
+
+
+def group_for_digest(entries) -> list[list[ReminderOutbox]]:
+    """Agrupa por usuário e canal (na ordem de chegada); sem janela de digest, um por grupo."""
+    if not settings.REMINDER_DIGEST_WINDOW_SECONDS:
+        return [[e] for e in entries]
+    groups = {}
+    for entry in entries:
+        groups.setdefault((entry.user_id, entry.channel), []).append(entry)
+    return list(groups.values())
+
+
+def retry_delay(attempt: int) -> timedelta:
+    """Espera antes da tentativa seguinte à ``attempt``-ésima falha (exponencial, com teto)."""
+    seconds = settings.REMINDER_RETRY_BASE_SECONDS * 2 ** (attempt - 1)
+    return timedelta(seconds=min(seconds, settings.REMINDER_RETRY_MAX_SECONDS))
+
+
+def _failure_updates(now, error: str) -> dict:
+    """
+    Campos do UPDATE das falhas de um bloco. O backoff depende de ``attempts``
+    de cada linha, então vai num CASE: continua sendo um UPDATE só.
+    """
+    max_attempts = settings.REMINDER_MAX_ATTEMPTS
+    retry_at = Case(
+        *[When(attempts=n - 1, then=Value(now + retry_delay(n))) for n in range(1, max_attempts)],
+        default=Value(None), output_field=models.DateTimeField(),
     )
+    return {
+        'attempts': F('attempts') + 1,
+        'next_attempt_at': retry_at,
+        'dead_lettered_at': Case(
+            When(attempts__gte=max_attempts - 1, then=Value(now)),
+            default=Value(None), output_field=models.DateTimeField(),
+        ),
+        'last_error': error,
+    }
+
+
+def _persist_results(entries, results, token=None) -> None:
+    """
+    Grava o resultado de um bloco de linhas do outbox: um bulk_create dos logs,
+    um UPDATE dos lembretes enviados e um DELETE das suas linhas; as falhas
+    levam um UPDATE por mensagem de erro distinta (backoff) e as linhas delas
+    são adiadas para a próxima tentativa ou saem (dead-letter).
+
+    Com ``token`` só conta o que ainda está reservado por este worker (um
+    SELECT travando as linhas): se o lease venceu e outro worker reservou de
+    novo, nem o estado nem o log registram esta entrega.
+    """
+    now = timezone.now()
+
+    def claimed(ids):
+        qs = ReminderOutbox.objects.filter(pk__in=ids)
+        if token:
+            # Só mexe no que ainda está reservado por este worker
+            qs = qs.filter(claimed_by=token)
+        return qs
+
+    with transaction.atomic():
+        if token:
+            held = set(claimed([e.pk for e in entries]).select_for_update().values_list('pk', flat=True))
+            pairs = [(e, r) for e, r in zip(entries, results) if e.pk in held]
+        else:
+            pairs = list(zip(entries, results))
+        if not pairs:
+            return
+        logs = []
+        sent_ids = []
+        failed = {}
+        for entry, (ok, error) in pairs:
+            logs.append(NotificationLog(
+                event_id= entry.event_id,
+                reminder_id= entry.reminder_id,
+                user_id= entry.user_id,
+                channel= entry.channel,
+                status= NotificationLog.STATUS_SENT if ok else NotificationLog.STATUS_FAILED,
+                error_message= '' if ok else error,
+            ))
+            if ok:
+                sent_ids.append(entry.pk)
+            else:
+                failed.setdefault(error, []).append(entry.pk)
+
+        NotificationLog.objects.bulk_create(logs)
+        changed = 0
+        if sent_ids:
+            changed = Reminder.objects.filter(pk__in=sent_ids, is_sent=False).update(is_sent=True, sent_at=now)
+            claimed(sent_ids).delete()
+        if failed:
+            failed_ids = [pk for ids in failed.values() for pk in ids]
+            for error, ids in failed.items():
+                # numa queda do SMTP o bloco inteiro tem o mesmo erro: um UPDATE só
+                changed += Reminder.objects.filter(pk__in=ids, is_sent=False).update(**_failure_updates(now, error))
+            claimed(failed_ids).filter(reminder__dead_lettered_at__isnull=False).delete()
+            claimed(failed_ids).update(
+                due_at=Subquery(Reminder.objects.filter(pk=OuterRef('pk')).values('next_attempt_at')[:1]),
+                claimed_by='', claimed_until=None,
+            )
+        if changed:
+            bump_user_version(*{e.user_id for e, _ in pairs})
+    if failed:
+        touch_schedule()
+    if sent_ids:
+        monitoring.record_lag([e for e, (ok, _) in pairs if ok], now)
+
+
+def _chunks(groups, size):
+    """Blocos de grupos com ~``size`` lembretes; um grupo nunca é dividido."""
+    part, count = [], 0
+    for group in groups:
+        part.append(group)
+        count += len(group)
+        if count >= size:
+            yield part
+            part, count = [], 0
+    if part:
+        yield part
+
+
+def notify_reminders(reminders, token=None) -> list[tuple[bool, str]]:
+    """
+    Versão em lote de ``notify_reminder``.
+
+    Lembretes do mesmo usuário e canal saem juntos (``group_for_digest``). Cada
+    canal (``channels.py``) entrega no seu próprio pool de threads, com o seu
+    limite de concorrência, então um canal lento não atrasa os outros. Os
+    resultados são persistidos na thread principal em blocos de
+    ``REMINDER_PERSIST_CHUNK_SIZE``, cada um numa transação assim que sai: se o
+    worker cair no meio do lote, os blocos já gravados não são reenviados e os
+    demais voltam quando o lease expira. Log e estado continuam por lembrete,
+    com o resultado da entrega do grupo.
+
+    Aceita linhas do outbox (o despacho) ou ``Reminder`` (renderizados na hora).
+    """
+    reminders = [r if isinstance(r, ReminderOutbox) else outbox_row(r) for r in reminders]
+    if not reminders:
+        return []
+    by_reminder = {}
+
+    def persist(groups, delivered):
+        part, part_results = [], []
+        for group, result in zip(groups, delivered):
+            part += group
+            part_results += [result] * len(group)
+        _persist_results(part, part_results, token)
+        by_reminder.update(zip(map(id, part), part_results))
+
+    by_channel = {}
+    for group in group_for_digest(reminders):
+        by_channel.setdefault(group[0].channel, []).append(group)
+
+    chunk = settings.REMINDER_PERSIST_CHUNK_SIZE
+    opened, executors, futures = [], [], {}
     try:
-        send_event_email(user.email, subject, body)
-        NotificationLog.objects.create(
-            event= event,
-            reminder= reminder,
-            user= user,
-            channel= reminder.channel,
-            status= NotificationLog.STATUS_SENT,
+        for name, groups in by_channel.items():
+            channel = get_channel(name)
+            if channel is None:
+                persist(groups, [(False, f'Canal desconhecido: {name}')] * len(groups))
+                continue
+            try:
+                channel.open()
+            except Exception as exc:
+                persist(groups, [(False, str(exc))] * len(groups))
+                continue
+            opened.append(channel)
+            executor = None
+            if channel.threaded:
+                executor = ThreadPoolExecutor(max_workers=channel.concurrency, thread_name_prefix=f'notify-{name}')
+                executors.append(executor)
+            for part in _chunks(groups, chunk):
+                items = channel.prepare(part)
+                if executor is None:
+                    persist(part, channel.deliver(items))
+                else:
+                    futures[executor.submit(channel.deliver, items)] = part
+
+        for future in as_completed(futures):
+            part = futures[future]
+            try:
+                delivered = future.result()
+            except Exception as exc:
+                delivered = [(False, str(exc))] * len(part)
+            persist(part, delivered)
+    finally:
+        for executor in executors:
+            executor.shutdown(wait=True)
+        for channel in opened:
+            channel.close()
+    return [by_reminder[id(r)] for r in reminders]
+
+
+def notify_reminder(reminder: Reminder):
+    return notify_reminders([reminder])[0]
+
+
+def sync_event_reminders(event, reminders_data) -> None:
+    """
+    Ajusta os lembretes do evento ao payload sem recriar tudo: mantém os que já
+    existem (mesmo ``minutes_before``/canal, inclusive os já enviados), insere
+    os novos num bulk_create e remove os que saíram.
+    """
+    sync_reminders_bulk([(event, reminders_data)])
+
+
+def sync_reminders_bulk(pairs) -> None:
+    """``sync_event_reminders`` para vários ``(evento, payload)``: 1 SELECT, 1 DELETE, 1 INSERT."""
+    if not pairs:
+        return
+    default_minutes = Reminder._meta.get_field('minutes_before').default
+    existing = {event.pk: {} for event, _ in pairs}
+    for pk, event_id, minutes, channel in Reminder.objects.filter(
+        event__in=[event for event, _ in pairs]
+    ).values_list('pk', 'event_id', 'minutes_before', 'channel'):
+        existing[event_id][(minutes, channel)] = pk
+
+    stale, new = [], []
+    for event, reminders_data in pairs:
+        current = existing[event.pk]
+        wanted = {}
+        for data in reminders_data:
+            wanted[(data.get('minutes_before', default_minutes), data.get('channel', Reminder.CHANNEL_EMAIL))] = data
+        stale += [pk for key, pk in current.items() if key not in wanted]
+        new += [Reminder(event=event, **data) for key, data in wanted.items() if key not in current]
+
+    if stale:
+        Reminder.objects.filter(pk__in=stale).delete()
+    if new:
+        for reminder in new:
+            reminder.scheduled_for = reminder.compute_scheduled_for()
+        Reminder.objects.bulk_create(new)
+        sync_outbox([reminder.pk for reminder in new])
+        touch_schedule()
+        bump_user_version(*{event.owner_id for event, _ in pairs})
+
+
+def due_outbox(now=None, until=None):
+    """Linhas do outbox vencidas (até ``until``, por padrão agora) e sem reserva válida."""
+    now = now or timezone.now()
+    return ReminderOutbox.objects.filter(
+        Q(claimed_until__isnull=True) | Q(claimed_until__lte=now),
+        due_at__lte=until or now,
+    )
+
+
+def claim_due_reminders(limit=None, now=None, ids=None, shards=None, upcoming=False):
+    """
+    Reserva atomicamente um lote de lembretes vencidos (opcionalmente só entre
+    ``ids`` e/ou nos ``shards`` dados, ver ``scheduler/sharding.py``).
+    Com ``upcoming`` só entram ocorrências que ainda não começaram, as mais
+    próximas primeiro; senão, do vencimento mais antigo.
+
+    Retorna ``(token, ids)``; só quem tem o token processa o lote. A reserva é
+    feita no outbox, que só tem pendentes. No Postgres usa SKIP LOCKED, então
+    vários workers reservam lotes disjuntos sem esperar uns pelos outros. No
+    SQLite (sem SKIP LOCKED) o UPDATE condicional faz o mesmo papel: apenas um
+    worker vence a corrida por cada linha.
+
+    Com ``REMINDER_DIGEST_WINDOW_SECONDS``, leva junto os lembretes que
+    venceriam dentro da janela e entram no digest de um vencido do lote (mesmo
+    usuário e canal); sozinho, nenhum lembrete sai antes da hora.
+    """
+    now = now or timezone.now()
+    limit = limit or settings.REMINDER_CLAIM_BATCH_SIZE
+    token = uuid.uuid4().hex
+    lease_until = now + timedelta(seconds=settings.REMINDER_CLAIM_LEASE_SECONDS)
+    until = now + timedelta(seconds=settings.REMINDER_DIGEST_WINDOW_SECONDS)
+    skip_locked = connection.features.has_select_for_update_skip_locked
+
+    with transaction.atomic():
+        if upcoming:
+            qs = due_outbox(now).filter(occurrence_start__gt=now).order_by('occurrence_start', 'pk')
+        else:
+            qs = due_outbox(now).order_by('due_at', 'pk')
+        if ids is not None:
+            qs = qs.filter(pk__in=ids)
+        if shards is not None:
+            qs = qs.filter(shard__in=shards)
+        if skip_locked:
+            qs = qs.select_for_update(skip_locked=True)
+        picked = list(qs.values_list('pk', flat=True)[:limit])
+        if not picked:
+            return token, []
+        if until > now:
+            # só adianta o que vai sair junto com um vencido: mesmo usuário e mesmo canal
+            groups = set(ReminderOutbox.objects.filter(pk__in=picked).values_list('user_id', 'channel'))
+            same_digest = Q()
+            for user_id, channel in groups:
+                same_digest |= Q(user_id=user_id, channel=channel)
+            early = (
+                due_outbox(now, until=until)
+                .filter(same_digest, due_at__gt=now)
+                .order_by('due_at', 'pk')
+            )
+            if skip_locked:
+                early = early.select_for_update(skip_locked=True)
+            picked += list(early.values_list('pk', flat=True)[:limit])
+        due_outbox(now, until=until).filter(pk__in=picked).update(claimed_by=token, claimed_until=lease_until)
+
+    claimed = list(
+        ReminderOutbox.objects.filter(claimed_by=token).order_by('due_at', 'pk').values_list('pk', flat=True)
+    )
+    return token, claimed
+
+
+STALE_SEND, STALE_EXPIRE, STALE_SUMMARY = 'send', 'expire', 'summary'
+STALE_REASONS = {
+    STALE_EXPIRE: 'Expirado: o evento terminou antes do envio.',
+    STALE_SUMMARY: 'Resumido: o evento terminou antes do envio.',
+}
+
+
+def build_missed_summary(entries) -> InAppNotification:
+    """Aviso in-app com as ocorrências (já terminadas) cujos lembretes não saíram."""
+    occurrences = {}
+    for entry in entries:
+        occurrences.setdefault((entry.event_id, entry.occurrence_start), entry)
+    lines = [
+        f'{timezone.localtime(start).strftime("%d/%m %H:%M")} {entry.title}'
+        for (_, start), entry in sorted(occurrences.items(), key=lambda item: item[0][1])
+    ]
+    return InAppNotification(
+        user_id=entries[0].user_id,
+        event_id=entries[0].event_id if len(occurrences) == 1 else None,
+        title=f'{len(occurrences)} evento(s) terminaram sem o lembrete',
+        body='\n'.join(lines),
+    )
+
+
+def settle_stale_reminders(limit=None, now=None, ids=None, shards=None) -> int:
+    """
+    Aplica ``REMINDER_STALE_POLICY`` a um lote de lembretes vencidos cujo
+    evento terminou há mais de ``REMINDER_STALE_GRACE_SECONDS`` (o backlog
+    típico depois de uma queda do Redis/SMTP).
+
+    ``expire`` tira o lembrete da fila; ``summary`` também deixa um aviso
+    in-app por usuário com os eventos perdidos (não depende do canal que
+    falhou). Os lembretes vão para o dead-letter com o motivo e ganham um log
+    ``expired``. ``send`` não faz nada: eles seguem o despacho normal.
+    Retorna quantos lembretes saíram da fila.
+    """
+    policy = settings.REMINDER_STALE_POLICY
+    if policy not in STALE_REASONS:
+        return 0
+    now = now or timezone.now()
+    limit = limit or settings.REMINDER_CLAIM_BATCH_SIZE
+    token = uuid.uuid4().hex
+    reason = STALE_REASONS[policy]
+    summaries = []
+    with transaction.atomic():
+        ended = now - timedelta(seconds=settings.REMINDER_STALE_GRACE_SECONDS)
+        qs = due_outbox(now).filter(occurrence_end__lt=ended).order_by('due_at', 'pk')
+        if ids is not None:
+            qs = qs.filter(pk__in=ids)
+        if shards is not None:
+            qs = qs.filter(shard__in=shards)
+        if connection.features.has_select_for_update_skip_locked:
+            qs = qs.select_for_update(skip_locked=True)
+        picked = list(qs.values_list('pk', flat=True)[:limit])
+        if not picked:
+            return 0
+        # mesmo UPDATE condicional da reserva: no SQLite só um worker leva cada linha
+        due_outbox(now).filter(pk__in=picked).update(
+            claimed_by=token, claimed_until=now + timedelta(seconds=settings.REMINDER_CLAIM_LEASE_SECONDS),
         )
-        reminder.is_sent = True
-        reminder.sent_at = timezone.now()
-        reminder.save(update_fields=['is_sent', 'sent_at'])
-        return True, ""
-    except Exception as exc:
-        NotificationLog.objects.create(
-            event= event,
-            reminder= reminder,
-            user= user,
-            channel= reminder.channel,
-            status= NotificationLog.STATUS_FAILED,
-            error_message=str(exc),
+        entries = list(ReminderOutbox.objects.filter(claimed_by=token).order_by('due_at', 'pk'))
+        if not entries:
+            return 0
+        Reminder.objects.filter(pk__in=[e.pk for e in entries], is_sent=False).update(
+            dead_lettered_at=now, next_attempt_at=None, last_error=reason,
         )
-        return False, str(exc)
+        NotificationLog.objects.bulk_create([
+            NotificationLog(
+                event_id=e.event_id, reminder_id=e.reminder_id, user_id=e.user_id, channel=e.channel,
+                status=NotificationLog.STATUS_EXPIRED, error_message=reason,
+            )
+            for e in entries
+        ])
+        if policy == STALE_SUMMARY:
+            by_user = {}
+            for entry in entries:
+                by_user.setdefault(entry.user_id, []).append(entry)
+            summaries = InAppNotification.objects.bulk_create(
+                [build_missed_summary(group) for group in by_user.values()]
+            )
+        ReminderOutbox.objects.filter(claimed_by=token).delete()
+    for item in summaries:
+        push.publish(item.user_id, {
+            'id': item.pk, 'event': item.event_id, 'title': item.title,
+            'body': item.body, 'created_at': item.created_at,
+        })
+    bump_user_version(*{e.user_id for e in entries})
+    return len(entries)
+
+
+def requeue_reminders(queryset) -> int:
+    """Devolve à fila (tentativas zeradas, envio imediato) os lembretes pendentes do queryset."""
+    qs = queryset.filter(is_sent=False)
+    owners = set(qs.values_list('event__owner_id', flat=True).distinct())
+    ids = list(qs.values_list('pk', flat=True))
+    updated = Reminder.objects.filter(pk__in=ids).update(
+        attempts=0, next_attempt_at=None, last_error='', dead_lettered_at=None,
+    )
+    if updated:
+        sync_outbox(ids)
+        touch_schedule()
+        bump_user_version(*owners)
+    return updated
+
+
+def send_claimed_reminders(token: str) -> int:
+    """Envia os lembretes reservados com ``token``. Retorna quantos foram enviados."""
+    # tudo o que o envio precisa já está renderizado na linha: nenhum join
+    qs = ReminderOutbox.objects.filter(claimed_by=token).order_by('due_at', 'pk')
+    results = notify_reminders(qs, token=token)
+    # Falhas saem da reserva com next_attempt_at (backoff) ou vão para o dead-letter
+    return sum(1 for ok, _ in results if ok)
+
+
+def prepare_event(event) -> Event:
+    """
+    Faz em memória o que ``Event.save()`` faria antes de gravar (normalização e
+    validação), para caminhos que usam bulk_create/bulk_update.
+    """
+    if event.is_all_day:
+        event.start, event.end = Event.all_day_bounds(event.start, event.end)
+    # Sem consultas: o dono já é conhecido e o CheckConstraint é coberto por clean()
+    event.full_clean(exclude=['owner'], validate_unique=False, validate_constraints=False)
+    event.recurrence_end = rec.series_end(event) if event.recurrence else None
+    return event
+
+
+def _validated_event(owner, fields) -> Event:
+    return prepare_event(Event(owner=owner, **fields))
+
+
+def _flush_import_chunk(events, reminder_minutes) -> None:
+    with transaction.atomic():
+        Event.objects.bulk_create(events)
+        if reminder_minutes is not None:
+            now = timezone.now()
+            reminders = []
+            for event in events:
+                reminder = Reminder(event=event, minutes_before=reminder_minutes)
+                reminder.scheduled_for = reminder.compute_scheduled_for()
+                # histórico (evento ou série que já passou): sem lembrete, senão tudo vence de uma vez
+                if reminder.occurrence_start >= now:
+                    reminders.append(reminder)
+            Reminder.objects.bulk_create(reminders)
+            enqueue(reminders)
+
+
+def import_ics(owner, lines, batch_size=None, reminder_minutes=15, progress=None) -> dict:
+    """
+    Importa eventos de um arquivo ICS lido em streaming.
+
+    Os VEVENTs são validados em memória e gravados com bulk_create em lotes de
+    ``batch_size`` (eventos + lembrete padrão, só para o que ainda não começou),
+    então o custo fica no parsing e não em consultas por linha. ``progress(processados, criados)`` é chamado a
+    cada lote. Entradas inválidas não interrompem o import: vão para ``errors``.
+    """
+    batch_size = batch_size or settings.ICS_IMPORT_BATCH_SIZE
+    created = processed = 0
+    errors = []
+    chunk = []
+    for index, props in enumerate(iter_vevents(lines)):
+        processed += 1
+        try:
+            chunk.append(_validated_event(owner, vevent_to_fields(props)))
+        except ValidationError as exc:
+            errors.append({'index': index, 'uid': props.get('UID', ([], ''))[1], 'errors': exc.message_dict})
+        except (ValueError, TypeError) as exc:
+            errors.append({'index': index, 'uid': props.get('UID', ([], ''))[1], 'errors': str(exc)})
+        if len(chunk) >= batch_size:
+            _flush_import_chunk(chunk, reminder_minutes)
+            created += len(chunk)
+            chunk = []
+            if progress:
+                progress(processed, created)
+    if chunk:
+        _flush_import_chunk(chunk, reminder_minutes)
+        created += len(chunk)
+    if progress:
+        progress(processed, created)
+    if created:
+        bump_user_version(owner.pk)
+        if reminder_minutes is not None:
+            touch_schedule()
+    return {'processed': processed, 'created': created, 'errors': errors}
+
+
+EVENT_BULK_FIELDS = [
+    'title', 'description', 'location', 'start', 'end',
+    'is_all_day', 'recurrence', 'recurrence_end', 'updated_at',
+]
+
+
+def apply_event_batch(owner, creates, updates, delete_ids) -> list[int]:
+    """
+    Grava um lote já validado numa transação só.
+
+    ``creates``/``updates`` são listas de ``(evento, reminders_data)`` com os
+    eventos já preparados por ``prepare_event``; ``reminders_data`` None em um
+    update mantém os lembretes. ``delete_ids`` só com inteiros (validados
+    antes, para nada ser gravado se houver lixo). Retorna os ids efetivamente
+    excluídos.
+    """
+    if any(isinstance(pk, bool) or not isinstance(pk, int) for pk in delete_ids):
+        raise ValueError('delete_ids deve conter só ids inteiros.')
+    default_minutes = Reminder._meta.get_field('minutes_before').default
+    now = timezone.now()
+    with transaction.atomic():
+        if creates:
+            Event.objects.bulk_create([event for event, _ in creates])
+            sync_reminders_bulk([
+                (event, data if data else [{'minutes_before': default_minutes}])
+                for event, data in creates
+            ])
+        if updates:
+            for event, _ in updates:
+                event.updated_at = now
+            Event.objects.bulk_update([event for event, _ in updates], EVENT_BULK_FIELDS, batch_size=500)
+            for event, _ in updates:
+                if getattr(event, '_loaded_schedule', None) != (event.start, event.recurrence):
+                    event.reschedule_reminders()
+                    event._loaded_schedule = (event.start, event.recurrence)
+            # textos renderizados no outbox (título, local, descrição)
+            sync_outbox(event_ids=[event.pk for event, _ in updates])
+            sync_reminders_bulk([(event, data) for event, data in updates if data is not None])
+        deleted = []
+        if delete_ids:
+            qs = Event.objects.filter(owner=owner, pk__in=delete_ids)
+            deleted = list(qs.values_list('pk', flat=True))
+            qs.delete()
+    if creates or updates or deleted:
+        bump_user_version(owner.pk)
+    return deleted
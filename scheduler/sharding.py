@@ -0,0 +1,97 @@
+"""
+Despacho particionado entre vários nós (``run_reminder_scheduler``).
+
+O outbox é dividido em ``REMINDER_SHARDS`` shards pelo usuário dono do
+lembrete (o digest junta lembretes do mesmo usuário, então eles ficam no mesmo
+shard). Cada nó faz heartbeat em ``SchedulerNode`` e, a partir da lista de nós
+vivos, calcula os shards que deveria ter; solta os que sobraram e toma os que
+faltam em ``ShardLease`` com UPDATE condicional (só se o lease está livre,
+vencido ou já é seu). Nó que entra recebe shards no próximo heartbeat de cada
+um; nó que morre perde os leases quando eles vencem.
+
+Os leases distribuem o trabalho; a exclusividade do envio continua sendo a
+reserva por linha do outbox (``claim_due_reminders``), então dois nós com visões
+momentaneamente diferentes nunca enviam a mesma linha duas vezes.
+"""
+import os
+import socket
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.functions import Mod
+from django.utils import timezone
+
+from .models import ReminderOutbox, SchedulerNode, ShardLease
+
+
+def shard_for(user_id) -> int:
+    return user_id % settings.REMINDER_SHARDS
+
+
+def reshard_outbox() -> int:
+    """Recalcula o shard de todo o outbox (depois de mudar ``REMINDER_SHARDS``)."""
+    updated = ReminderOutbox.objects.exclude(shard=Mod('user_id', settings.REMINDER_SHARDS)).update(
+        shard=Mod('user_id', settings.REMINDER_SHARDS),
+    )
+    # leases de shards que deixaram de existir
+    ShardLease.objects.filter(shard__gte=settings.REMINDER_SHARDS).delete()
+    ensure_leases()
+    return updated
+
+
+def ensure_leases() -> None:
+    ShardLease.objects.bulk_create(
+        [ShardLease(shard=s) for s in range(settings.REMINDER_SHARDS)], ignore_conflicts=True,
+    )
+
+
+def unowned_shards(now=None) -> list[int]:
+    """Shards sem lease válido: ficam com a varredura do beat (rede de segurança)."""
+    now = now or timezone.now()
+    owned = set(ShardLease.objects.filter(owner__gt='', expires_at__gt=now).values_list('shard', flat=True))
+    return [s for s in range(settings.REMINDER_SHARDS) if s not in owned]
+
+
+def desired_shards(node, live_nodes) -> set[int]:
+    """Divisão determinística (round-robin sobre os nós ordenados): todos os nós chegam à mesma conta."""
+    live = sorted(set(live_nodes) | {node})
+    return {s for s in range(settings.REMINDER_SHARDS) if live[s % len(live)] == node}
+
+
+class ShardCoordinator:
+    def __init__(self, node=None, lease_seconds=None):
+        self.node = node or f'{socket.gethostname()}:{os.getpid()}'
+        self.lease = timedelta(seconds=lease_seconds or settings.REMINDER_SHARD_LEASE_SECONDS)
+        self.owned = frozenset()
+        self.next_heartbeat = None
+        ensure_leases()
+
+    def heartbeat(self, now=None) -> frozenset:
+        """Renova presença e leases e rebalanceia; retorna os shards que este nó detém."""
+        now = now or timezone.now()
+        SchedulerNode.objects.update_or_create(name=self.node, defaults={'last_seen': now})
+        # nós que morreram sem leave(): saem da tabela em vez de ficarem para sempre
+        SchedulerNode.objects.filter(last_seen__lte=now - self.lease).delete()
+        live = SchedulerNode.objects.values_list('name', flat=True)
+        desired = desired_shards(self.node, live)
+
+        ShardLease.objects.filter(owner=self.node).exclude(shard__in=desired).update(owner='', expires_at=None)
+        ShardLease.objects.filter(
+            Q(owner=self.node) | Q(owner='') | Q(expires_at__lte=now), shard__in=desired,
+        ).update(owner=self.node, expires_at=now + self.lease)
+        self.owned = frozenset(
+            ShardLease.objects.filter(owner=self.node, expires_at__gt=now).values_list('shard', flat=True)
+        )
+        # renova com folga: três heartbeats por lease
+        self.next_heartbeat = now + self.lease / 3
+        return self.owned
+
+    def heartbeat_due(self, now) -> bool:
+        return self.next_heartbeat is None or now >= self.next_heartbeat
+
+    def leave(self) -> None:
+        """Saída limpa: solta os shards na hora em vez de esperar o lease vencer."""
+        ShardLease.objects.filter(owner=self.node).update(owner='', expires_at=None)
+        SchedulerNode.objects.filter(name=self.node).delete()
+        self.owned = frozenset()
@@ -0,0 +1,48 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .caching import bump_user_version
+from .models import Event, Reminder
+from .outbox import refresh_recipient, sync_outbox
+from .timing import touch_schedule
+
+# Campos alterados pelo próprio despacho: não mudam a agenda
+_DISPATCH_FIELDS = {'is_sent', 'sent_at'}
+
+
+def _reminder_owner(reminder):
+    if Reminder.event.is_cached(reminder):
+        return reminder.event.owner_id
+    return Event.objects.filter(pk=reminder.event_id).values_list('owner_id', flat=True).first()
+
+
+@receiver(post_save, sender=Reminder)
+def reminder_saved(sender, instance, update_fields=None, **kwargs):
+    # is_sent/sent_at aparecem na resposta da API: a versão muda mesmo no despacho
+    bump_user_version(_reminder_owner(instance))
+    sync_outbox([instance.pk])
+    if update_fields and set(update_fields) <= _DISPATCH_FIELDS:
+        return
+    touch_schedule()
+
+
+@receiver(post_delete, sender=Reminder)
+def reminder_deleted(sender, instance, **kwargs):
+    # em cascata o evento pode já ter sumido; aí o próprio evento avisa
+    bump_user_version(_reminder_owner(instance))
+    touch_schedule()
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+def event_changed(sender, instance, **kwargs):
+    bump_user_version(instance.owner_id)
+
+
+@receiver(post_save, sender=get_user_model())
+def user_saved(sender, instance, created=False, update_fields=None, **kwargs):
+    # o outbox guarda e-mail e nome renderizados; last_login (a cada login) não importa
+    if created or (update_fields and not {'email', 'username'} & set(update_fields)):
+        return
+    refresh_recipient(instance)
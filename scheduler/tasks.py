@@ -1,28 +1,148 @@
+import time
+from datetime import timedelta
+
 from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
 from django.utils import timezone
-from django.db import transaction
 from .models import Reminder
-from .services import notify_reminder
+from . import monitoring, retention
+from .caching import bump_user_version
+from .outbox import sync_outbox
+from .services import claim_due_reminders, send_claimed_reminders, settle_stale_reminders
+from .sharding import unowned_shards
+from .timing import touch_schedule
+
+
+def dispatch_due_reminders(ids=None, shards=None):
+    """
+    Reserva lembretes vencidos (opcionalmente só entre ``ids`` e/ou nos
+    ``shards`` dados) em lotes e os despacha.
+
+    Com ``REMINDER_DISPATCH_FANOUT`` cada lote vai para uma task
+    ``send_reminder_batch`` (qualquer worker livre processa); sem ele os lotes
+    são enviados aqui mesmo, mas ainda sem segurar locks durante o envio.
+
+    Ordem pensada para recuperar backlog (ex.: depois de uma queda do SMTP):
+    primeiro ``REMINDER_STALE_POLICY`` nos lembretes de eventos já terminados,
+    depois as ocorrências que ainda não começaram e por fim o resto, do mais
+    antigo. Nenhum lote novo é reservado depois de
+    ``REMINDER_DISPATCH_BUDGET_SECONDS``: cada lote já sai do outbox ao ser
+    gravado, então a próxima execução continua de onde esta parou em vez de
+    ser morta pelo time limit e recomeçar. ``complete`` diz se a fila esvaziou.
+    """
+    fanout = settings.REMINDER_DISPATCH_FANOUT
+    limit = settings.REMINDER_CLAIM_BATCH_SIZE
+    budget = settings.REMINDER_DISPATCH_BUDGET_SECONDS
+    started = time.perf_counter()
+    sent_count = claimed = batches = expired = 0
+    stale, upcoming, complete = True, True, False
+    while batches < settings.REMINDER_MAX_BATCHES_PER_RUN:
+        if time.perf_counter() - started >= budget:
+            break
+        if stale:
+            settled = settle_stale_reminders(ids=ids, shards=shards)
+            expired += settled
+            stale = settled >= limit
+            continue
+        token, claimed_ids = claim_due_reminders(ids=ids, shards=shards, upcoming=upcoming)
+        if not claimed_ids:
+            if upcoming:
+                upcoming = False
+                continue
+            complete = True
+            break
+        if upcoming and len(claimed_ids) < limit:
+            upcoming = False
+        claimed += len(claimed_ids)
+        batches += 1
+        if fanout:
+            send_reminder_batch.delay(token)
+        else:
+            sent_count += send_claimed_reminders(token)
+    seconds = time.perf_counter() - started
+    result = {
+        'sent': sent_count, 'claimed': claimed, 'batches': batches, 'expired': expired,
+        'complete': complete, 'seconds': round(seconds, 3),
+        'claimed_per_second': round(claimed / seconds, 1) if seconds else 0.0,
+    }
+    # o que ficou para trás (só o índice de vencidos do outbox)
+    backlog = monitoring.backlog_stats()
+    result['backlog'], result['oldest_due_seconds'] = backlog['depth'], backlog['oldest_due_seconds']
+    monitoring.record_run(result)
+    return result
+
+
+CATCH_UP_KEY = 'scheduler:dispatch:catch_up'
 
 
 @shared_task(name='scheduler.check_due_reminders')
-def check_due_reminders():
+def check_due_reminders(continuation=False):
+    """
+    Varredura do beat: só os shards sem scheduler dedicado vivo (todos, se não há nenhum).
+
+    Se a execução parou pelo orçamento com backlog, agenda a continuação logo
+    em seguida em vez de esperar o próximo beat; só uma fica na fila por vez.
+    """
+    if continuation:
+        cache.delete(CATCH_UP_KEY)
+    shards = unowned_shards()
+    result = dispatch_due_reminders(shards=None if len(shards) == settings.REMINDER_SHARDS else shards)
+    result['continued'] = False
+    if not result['complete'] and result['backlog']:
+        if cache.add(CATCH_UP_KEY, 1, timeout=int(settings.REMINDER_DISPATCH_BUDGET_SECONDS * 2) + 1):
+            result['continued'] = True
+            check_due_reminders.apply_async(kwargs={'continuation': True})
+    return result
+
+
+@shared_task(name='scheduler.send_reminder_batch')
+def send_reminder_batch(token):
+    return {'sent': send_claimed_reminders(token)}
+
+
+@shared_task(name='scheduler.materialize_recurring_reminders')
+def materialize_recurring_reminders():
+    """
+    Avança lembretes já enviados de séries recorrentes para a próxima ocorrência.
+
+    Só entram as ocorrências dentro de ``REMINDER_RECURRENCE_HORIZON_HOURS``:
+    cada lembrete de série ocupa uma única linha, que "rola" pela série. Um
+    lembrete que foi para o dead-letter também avança: a próxima ocorrência
+    recomeça com as tentativas zeradas.
+    """
     now = timezone.now()
-    # Buscar lembretes vencidos e não enviados
+    horizon = now + timedelta(hours=settings.REMINDER_RECURRENCE_HORIZON_HOURS)
     qs = (
         Reminder.objects
-        .select_related('event', 'event__owner')
-        .filter(is_sent=False, scheduled_for__lte=now)
-        .order_by('scheduled_for')
+        .select_related('event')
+        .filter(Q(is_sent=True) | Q(dead_lettered_at__isnull=False), event__recurrence__gt='')
+        .filter(Q(event__recurrence_end__isnull=True) | Q(event__recurrence_end__gt=now))
     )
-    sent_count = 0
-    for reminder in qs:
-        # Em transação reduzimos riscos de concorrência
-        with transaction.atomic():
-            r = Reminder.objects.select_for_update().get(pk=reminder.pk)
-            if r.is_sent:
-                continue
-            ok, _ = notify_reminder(r)
-            if ok:
-                sent_count += 1
-    return {'sent': sent_count}
\ No newline at end of file
+    advanced = []
+    for reminder in qs.iterator():
+        after = max(reminder.occurrence_start + timedelta(microseconds=1), now)
+        start = reminder.event.next_occurrence_start(after=after)
+        if start is None:
+            continue
+        scheduled_for = start - timedelta(minutes=reminder.minutes_before)
+        if scheduled_for > horizon:
+            continue
+        reminder.scheduled_for = scheduled_for
+        reminder.is_sent = False
+        reminder.sent_at = None
+        reminder.reset_attempts()
+        advanced.append(reminder)
+    if advanced:
+        Reminder.objects.bulk_update(advanced, ['scheduled_for', 'is_sent', 'sent_at', *Reminder.RETRY_FIELDS], batch_size=500)
+        sync_outbox([r.pk for r in advanced])
+        touch_schedule()
+        bump_user_version(*{r.event.owner_id for r in advanced})
+    return {'advanced': len(advanced)}
+
+
+@shared_task(name='scheduler.compact_notification_logs')
+def compact_notification_logs():
+    """Retenção do NotificationLog: agrega e remove os logs vencidos em lotes."""
+    return retention.compact_notification_logs()
@@ -1,10 +1,14 @@
+from base64 import b64decode
 from datetime import timedelta
-from django.test import TestCase
+from urllib.parse import parse_qs, urlsplit
+
+from asgiref.sync import sync_to_async
+from django.test import AsyncClient, TestCase
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 
 from rest_framework.test import APIClient
-from scheduler.models import Event
+from scheduler.models import Event, Reminder
 
 User = get_user_model()
 
@@ -53,3 +57,182 @@ class ApiTests(TestCase):
         payload = {'event': other.id, 'minutes_before': 10, 'channel': 'email'}
         resp = self.client.post('/api/reminders/', payload, format='json')
         self.assertEqual(resp.status_code, 403)
+
+    def test_update_reminders_diffs_instead_of_recreating(self):
+        start = timezone.now() + timedelta(hours=3)
+        ev = Event.objects.create(
+            owner=self.user, title='Planejamento',
+            start=start, end=start + timedelta(hours=1), is_all_day=False
+        )
+        kept = Reminder.objects.create(event=ev, minutes_before=15, is_sent=True, sent_at=timezone.now())
+        Reminder.objects.create(event=ev, minutes_before=60)
+
+        payload = {'reminders': [{'minutes_before': 15}, {'minutes_before': 5}]}
+        resp = self.client.patch(f'/api/events/{ev.id}/', payload, format='json')
+        self.assertEqual(resp.status_code, 200, resp.content)
+
+        self.assertEqual(
+            sorted(ev.reminders.values_list('minutes_before', flat=True)), [5, 15]
+        )
+        kept.refresh_from_db()
+        self.assertTrue(kept.is_sent)  # não é recriado nem reenviado
+        new = ev.reminders.get(minutes_before=5)
+        self.assertEqual(new.scheduled_for, ev.start - timedelta(minutes=5))
+
+    def test_patch_start_moves_pending_reminders(self):
+        start = timezone.now() + timedelta(hours=3)
+        ev = Event.objects.create(
+            owner=self.user, title='Demo',
+            start=start, end=start + timedelta(hours=1), is_all_day=False
+        )
+        r = Reminder.objects.create(event=ev, minutes_before=15)
+        new_start = start + timedelta(hours=2)
+        resp = self.client.patch(
+            f'/api/events/{ev.id}/',
+            {'start': new_start.isoformat(), 'end': (new_start + timedelta(hours=1)).isoformat()},
+            format='json',
+        )
+        self.assertEqual(resp.status_code, 200, resp.content)
+        r.refresh_from_db()
+        self.assertEqual(r.scheduled_for, new_start - timedelta(minutes=15))
+
+    def test_calendar_feed_streams_all_events_and_supports_conditional_get(self):
+        start = timezone.now() + timedelta(hours=1)
+        for i in range(3):
+            Event.objects.create(
+                owner=self.user, title=f'Evento {i}',
+                start=start, end=start + timedelta(hours=1), is_all_day=False
+            )
+        url = self.client.get('/api/events/feed/').data['url']
+        anon = APIClient()
+
+        resp = anon.get(url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.streaming)
+        body = b''.join(resp.streaming_content).decode('utf-8')
+        self.assertEqual(body.count('BEGIN:VEVENT'), 3)
+        etag = resp['ETag']
+
+        self.assertEqual(anon.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(anon.get(url, HTTP_IF_MODIFIED_SINCE=resp['Last-Modified']).status_code, 304)
+
+        Event.objects.filter(owner=self.user).first().delete()
+        self.assertEqual(anon.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        # rotacionar invalida o link antigo
+        new_url = self.client.post('/api/events/feed/').data['url']
+        self.assertNotEqual(new_url, url)
+        self.assertEqual(anon.get(url).status_code, 404)
+
+    async def test_calendar_feed_streams_asynchronously_under_asgi(self):
+        start = timezone.now() + timedelta(hours=1)
+        for i in range(3):
+            await Event.objects.acreate(
+                owner=self.user, title=f'Evento {i}', start=start, end=start + timedelta(hours=1), is_all_day=False,
+            )
+        url = (await sync_to_async(self.client.get)('/api/events/feed/')).data['url']
+
+        resp = await AsyncClient().get(url)
+        self.assertEqual(resp.status_code, 200)
+        # iterador assíncrono: o ASGI não precisa ler o feed inteiro antes de enviar
+        self.assertTrue(resp.is_async)
+        body = b''.join([chunk async for chunk in resp.streaming_content]).decode('utf-8')
+        self.assertEqual(body.count('BEGIN:VEVENT'), 3)
+
+    def test_event_list_uses_keyset_pagination(self):
+        start = timezone.now() + timedelta(days=1)
+        # inícios repetidos: o id precisa desempatar o cursor
+        for i in range(5):
+            Event.objects.create(
+                owner=self.user, title=f'E{i}',
+                start=start + timedelta(hours=i // 2), end=start + timedelta(hours=3),
+                is_all_day=False,
+            )
+        seen = []
+        url = '/api/events/?page_size=2'
+        while url:
+            resp = self.client.get(url)
+            self.assertEqual(resp.status_code, 200)
+            self.assertLessEqual(len(resp.data['results']), 2)
+            seen += [e['title'] for e in resp.data['results']]
+            url = resp.data['next']
+        self.assertEqual(seen, ['E0', 'E1', 'E2', 'E3', 'E4'])
+
+        resp = self.client.get('/api/events/?ordering=-end&page_size=3')
+        self.assertEqual(len(resp.data['results']), 3)
+        self.assertIsNotNone(resp.data['next'])
+
+    def test_cursor_is_exact_on_tied_values(self):
+        start = timezone.now() + timedelta(days=1)
+        ids = [
+            Event.objects.create(
+                owner=self.user, title='Igual', start=start, end=start + timedelta(hours=1), is_all_day=False,
+            ).pk
+            for _ in range(7)
+        ]
+        seen, pages = [], []
+        url = '/api/events/?ordering=title&page_size=2'
+        while url:
+            resp = self.client.get(url)
+            pages.append(resp.data)
+            seen += [e['id'] for e in resp.data['results']]
+            url = resp.data['next']
+        self.assertEqual(seen, ids)
+        # o cursor guarda (título, id), nada de OFFSET
+        cursor = parse_qs(urlsplit(pages[1]['next']).query)['cursor'][0]
+        self.assertNotIn('o', parse_qs(b64decode(cursor).decode()))
+        # e volta exatamente para a página anterior
+        back = self.client.get(pages[2]['previous']).data
+        self.assertEqual([e['id'] for e in back['results']], ids[2:4])
+
+    def test_batch_upserts_and_deletes_with_per_item_results(self):
+        start = timezone.now() + timedelta(days=1)
+        moved = Event.objects.create(
+            owner=self.user, title='Mover', start=start, end=start + timedelta(hours=1), is_all_day=False
+        )
+        r = Reminder.objects.create(event=moved, minutes_before=10)
+        gone = Event.objects.create(
+            owner=self.user, title='Apagar', start=start, end=start + timedelta(hours=1), is_all_day=False
+        )
+        new_start = start + timedelta(hours=5)
+        payload = {
+            'upserts': [
+                {'title': 'Novo A', 'start': start.isoformat(), 'end': (start + timedelta(hours=1)).isoformat()},
+                {'title': 'Novo B', 'start': start.isoformat(), 'end': (start + timedelta(hours=1)).isoformat(),
+                 'reminders': [{'minutes_before': 5}, {'minutes_before': 30}]},
+                {'id': moved.id, 'start': new_start.isoformat(), 'end': (new_start + timedelta(hours=1)).isoformat()},
+                {'title': 'Inválido', 'start': start.isoformat(), 'end': (start - timedelta(hours=1)).isoformat()},
+            ],
+            'deletes': [gone.id, 999999],
+        }
+        resp = self.client.post('/api/events/batch/', payload, format='json')
+        self.assertEqual(resp.status_code, 200, resp.content)
+
+        statuses = [item['status'] for item in resp.data['upserts']]
+        self.assertEqual(statuses, ['created', 'created', 'updated', 'error'])
+        self.assertEqual(
+            [d['status'] for d in resp.data['deletes']], ['deleted', 'not_found']
+        )
+        a, b = (Event.objects.get(pk=item['id']) for item in resp.data['upserts'][:2])
+        self.assertEqual(list(a.reminders.values_list('minutes_before', flat=True)), [15])
+        self.assertEqual(sorted(b.reminders.values_list('minutes_before', flat=True)), [5, 30])
+        r.refresh_from_db()
+        self.assertEqual(r.scheduled_for, new_start - timedelta(minutes=10))
+        self.assertFalse(Event.objects.filter(pk=gone.id).exists())
+
+    def test_batch_rejects_malformed_bodies_and_ids(self):
+        for body in ([{'title': 'X'}], 'x', 3):
+            resp = self.client.post('/api/events/batch/', body, format='json')
+            self.assertEqual(resp.status_code, 400, body)
+
+        start = timezone.now() + timedelta(days=1)
+        keep = Event.objects.create(owner=self.user, title='Fica', start=start, end=start + timedelta(hours=1))
+        item = {'title': 'T', 'start': start.isoformat(), 'end': (start + timedelta(hours=1)).isoformat()}
+        resp = self.client.post('/api/events/batch/', {
+            'upserts': [{**item, 'id': 'abc'}, {**item, 'id': [1]}, {**item, 'id': {'a': 1}}, item],
+            'deletes': ['x', [keep.id], keep.id],
+        }, format='json')
+        self.assertEqual(resp.status_code, 200, resp.content)
+        self.assertEqual([u['status'] for u in resp.data['upserts']], ['error', 'error', 'error', 'created'])
+        self.assertEqual([d['status'] for d in resp.data['deletes']], ['error', 'error', 'deleted'])
+        self.assertFalse(Event.objects.filter(pk=keep.id).exists())
@@ -0,0 +1,46 @@
+import tempfile
+
+from django.test import TestCase
+from django.utils import timezone
+
+from scheduler import benchmarks
+from scheduler.models import Event, NotificationLog, Reminder
+
+
+class BenchmarkTests(TestCase):
+    def setUp(self):
+        self.result = benchmarks.generate_dataset(users=3, events_per_user=30, seed=7)
+
+    def test_dataset_is_consistent(self):
+        self.assertEqual(self.result['events'], Event.objects.count())
+        self.assertEqual(self.result['reminders'], Reminder.objects.count())
+        self.assertEqual(NotificationLog.objects.count(), Reminder.objects.filter(is_sent=True).count())
+        # o histórico fica no passado, não no momento da geração
+        self.assertFalse(NotificationLog.objects.filter(created_at__gt=timezone.now()).exists())
+
+    def test_same_seed_same_data(self):
+        benchmarks.generate_dataset(users=3, events_per_user=30, seed=7, prefix='outro')
+        titles = [
+            list(Event.objects.filter(owner__username__startswith=prefix).order_by('pk').values_list('title', 'is_all_day'))
+            for prefix in ('bench', 'outro')
+        ]
+        self.assertEqual(titles[0], titles[1])
+
+    def test_report_round_trip_and_compare(self):
+        names = ['reminders.drain', 'api.events.search', 'ui.events']
+        pending = Reminder.objects.filter(is_sent=False).count()
+        report = benchmarks.run_benchmarks(names, repeat=2, warmup=0, backlog=20)
+
+        self.assertEqual(list(report['scenarios']), names)
+        for stats in report['scenarios'].values():
+            self.assertLessEqual(stats['p50_ms'], stats['p99_ms'])
+            self.assertGreater(stats['queries'], 0)
+        # o backlog é drenado dentro de uma transação desfeita a cada repetição
+        self.assertEqual(Reminder.objects.filter(is_sent=False).count(), pending)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = benchmarks.save_report(report, directory)
+            self.assertEqual(benchmarks.latest_report(directory), path)
+        rows = benchmarks.compare_reports(report, report)
+        self.assertTrue(rows)
+        self.assertTrue(all(change == 0 for *_, change in rows))
@@ -0,0 +1,91 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.test import APIClient
+
+from scheduler import services
+from scheduler.models import Event, Reminder
+from scheduler.tasks import dispatch_due_reminders
+
+User = get_user_model()
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend', REMINDER_DISPATCH_FANOUT=False)
+class EventResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'Passw0rd!234')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        start = timezone.now() + timedelta(minutes=2)
+        self.event = Event.objects.create(
+            owner=self.user, title='Standup', start=start, end=start + timedelta(minutes=15),
+        )
+        self.reminder = Reminder.objects.create(event=self.event, minutes_before=5)
+
+    def _list(self):
+        resp = self.client.get('/api/events/')
+        self.assertEqual(resp.status_code, 200)
+        return resp.data['results']
+
+    def test_repeat_reads_do_not_touch_the_db(self):
+        first = self._list()
+        with self.assertNumQueries(0):
+            self.assertEqual(self._list(), first)
+        detail = f'/api/events/{self.event.pk}/'
+        self.client.get(detail)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(detail).data['title'], 'Standup')
+
+    def test_cache_is_per_user_and_per_query(self):
+        self._list()
+        other = User.objects.create_user('bob', 'bob@example.com', 'Passw0rd!234')
+        self.client.force_authenticate(user=other)
+        self.assertEqual(self._list(), [])
+        self.client.force_authenticate(user=self.user)
+        resp = self.client.get('/api/events/', {'search': 'nada'})
+        self.assertEqual(resp.data['results'], [])
+
+    def test_api_and_model_writes_invalidate(self):
+        self._list()
+        self.client.patch(f'/api/reminders/{self.reminder.pk}/', {'minutes_before': 1}, format='json')
+        self.assertEqual(self._list()[0]['reminders'][0]['minutes_before'], 1)
+
+        # UPDATE em massa ao mover o evento
+        self.event.start += timedelta(hours=1)
+        self.event.end += timedelta(hours=1)
+        self.event.save()
+        self.reminder.refresh_from_db()
+        scheduled = self._list()[0]['reminders'][0]['scheduled_for']
+        self.assertEqual(scheduled, serializers.DateTimeField().to_representation(self.reminder.scheduled_for))
+
+        self.client.get(f'/api/events/{self.event.pk}/')
+        self.event.delete()
+        self.assertEqual(self.client.get(f'/api/events/{self.event.pk}/').status_code, 404)
+
+    def test_dispatch_marks_reminders_sent_in_cached_list(self):
+        Reminder.objects.filter(pk=self.reminder.pk).update(scheduled_for=timezone.now() - timedelta(seconds=1))
+        self.assertFalse(self._list()[0]['reminders'][0]['is_sent'])
+        self.assertEqual(dispatch_due_reminders()['sent'], 1)
+        self.assertTrue(self._list()[0]['reminders'][0]['is_sent'])
+
+    def test_bulk_paths_invalidate(self):
+        self._list()
+        services.sync_event_reminders(self.event, [{'minutes_before': 30}])
+        self.assertEqual([r['minutes_before'] for r in self._list()[0]['reminders']], [30])
+
+
+class SharedCacheCheckTests(TestCase):
+    def test_deploy_check_rejects_a_process_local_cache(self):
+        from scheduler.checks import shared_cache_check
+
+        local = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        with self.settings(CACHES=local):
+            self.assertEqual([e.id for e in shared_cache_check(None)], ['scheduler.E001'])
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://redis:6379/2'}}
+        with self.settings(CACHES=shared):
+            self.assertEqual(shared_cache_check(None), [])
@@ -0,0 +1,110 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from scheduler.models import Event, InAppNotification, NotificationLog, Reminder, ReminderOutbox
+from scheduler.tasks import check_due_reminders, dispatch_due_reminders
+
+User = get_user_model()
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend', REMINDER_DISPATCH_FANOUT=False,
+    REMINDER_DIGEST_WINDOW_SECONDS=0, REMINDER_STALE_POLICY='summary',
+)
+class CatchUpTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'Passw0rd!234')
+        self.now = timezone.now()
+
+    def _reminder(self, title, starts_in, minutes=30, duration=timedelta(minutes=30)):
+        start = self.now + starts_in
+        event = Event.objects.create(owner=self.user, title=title, start=start, end=start + duration)
+        return Reminder.objects.create(event=event, minutes_before=minutes)
+
+    def test_summary_policy_settles_finished_events_without_sending(self):
+        over = [self._reminder(f'Antigo {i}', -timedelta(hours=2 + i)) for i in range(2)]
+        upcoming = self._reminder('Logo', timedelta(minutes=5))
+
+        result = dispatch_due_reminders()
+        self.assertEqual((result['sent'], result['expired'], result['complete']), (1, 2, True))
+        self.assertEqual([m.subject for m in mail.outbox], ['Lembrete: Logo'])
+        for reminder in over:
+            reminder.refresh_from_db()
+            self.assertTrue(reminder.is_dead_lettered)
+            self.assertFalse(reminder.is_sent)
+        self.assertEqual(NotificationLog.objects.filter(status=NotificationLog.STATUS_EXPIRED).count(), 2)
+        summary = InAppNotification.objects.get(user=self.user)
+        self.assertIn('Antigo 0', summary.body)
+        self.assertIn('Antigo 1', summary.body)
+        upcoming.refresh_from_db()
+        self.assertTrue(upcoming.is_sent)
+        self.assertFalse(ReminderOutbox.objects.exists())
+
+    def test_event_without_duration_still_gets_its_reminder(self):
+        # ICS sem DTEND: fim == início, e o lembrete "na hora" vence junto com o fim
+        self._reminder('Marco', -timedelta(seconds=30), minutes=0, duration=timedelta(0))
+        result = dispatch_due_reminders()
+        self.assertEqual((result['sent'], result['expired']), (1, 0))
+        self.assertEqual([m.subject for m in mail.outbox], ['Lembrete: Marco'])
+        self.assertFalse(InAppNotification.objects.exists())
+
+    @override_settings(REMINDER_STALE_POLICY='expire')
+    def test_expire_policy_leaves_no_summary(self):
+        self._reminder('Antigo', -timedelta(hours=2))
+        self.assertEqual(dispatch_due_reminders()['expired'], 1)
+        self.assertFalse(InAppNotification.objects.exists())
+        self.assertEqual(mail.outbox, [])
+
+    @override_settings(REMINDER_STALE_POLICY='send')
+    def test_send_policy_keeps_the_old_behaviour(self):
+        self._reminder('Antigo', -timedelta(hours=2))
+        result = dispatch_due_reminders()
+        self.assertEqual((result['sent'], result['expired']), (1, 0))
+
+    @override_settings(REMINDER_CLAIM_BATCH_SIZE=1, REMINDER_MAX_BATCHES_PER_RUN=1)
+    def test_events_not_started_go_first(self):
+        # em andamento (começou há 10 min) e com vencimento mais antigo
+        self._reminder('Em andamento', -timedelta(minutes=10), duration=timedelta(hours=2))
+        self._reminder('Depois', timedelta(minutes=20))
+        self._reminder('Agora', timedelta(minutes=5))
+
+        self.assertFalse(dispatch_due_reminders()['complete'])
+        self.assertEqual([m.subject for m in mail.outbox], ['Lembrete: Agora'])
+        dispatch_due_reminders()
+        dispatch_due_reminders()
+        self.assertEqual(
+            [m.subject for m in mail.outbox],
+            ['Lembrete: Agora', 'Lembrete: Depois', 'Lembrete: Em andamento'],
+        )
+
+    @override_settings(REMINDER_CLAIM_BATCH_SIZE=2, REMINDER_MAX_BATCHES_PER_RUN=1)
+    def test_runs_resume_where_the_last_one_stopped(self):
+        for i in range(5):
+            self._reminder(f'E{i}', timedelta(minutes=5 + i))
+        runs = 0
+        while not dispatch_due_reminders()['complete']:
+            runs += 1
+        # um lote por execução, nenhum reenvio: 3 execuções para 5 lembretes
+        self.assertEqual(runs, 3)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(NotificationLog.objects.count(), 5)
+
+    def test_exhausted_budget_schedules_one_continuation(self):
+        self._reminder('Logo', timedelta(minutes=5))
+        with override_settings(REMINDER_DISPATCH_BUDGET_SECONDS=0), \
+                mock.patch.object(check_due_reminders, 'apply_async') as apply_async:
+            result = check_due_reminders()
+            self.assertEqual((result['claimed'], result['complete'], result['continued']), (0, False, True))
+            # a continuação ainda está na fila: o tick seguinte do beat não agenda outra
+            self.assertFalse(check_due_reminders()['continued'])
+        apply_async.assert_called_once_with(kwargs={'continuation': True})
+
+        result = check_due_reminders(continuation=True)
+        self.assertEqual((result['sent'], result['complete'], result['continued']), (1, True, False))
@@ -0,0 +1,201 @@
+import hashlib
+import hmac
+import json
+import socket
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.exceptions import ValidationError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from scheduler import netguard, services
+from scheduler.channels import HTTPPool
+from scheduler.models import Event, InAppNotification, NotificationLog, Reminder, WebhookEndpoint
+
+User = get_user_model()
+
+
+def _resolve(hosts):
+    # getaddrinfo falso: os testes não dependem de DNS
+    def getaddrinfo(host, port, *args, **kwargs):
+        address = hosts.get(host, host)
+        family = socket.AF_INET6 if ':' in address else socket.AF_INET
+        return [(family, socket.SOCK_STREAM, 6, '', (address, port))]
+    return getaddrinfo
+
+
+class _WebhookHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.server.gate.wait(5)
+        self.server.requests.append((self.path, self.headers['X-Agenda-Signature'], body))
+        status = 500 if self.path == '/quebrado' else 204
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class _WebhookStub(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _WebhookHandler)
+        self.connections = 0
+        self.requests = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def url(self, path='/hook'):
+        return f'http://127.0.0.1:{self.server_address[1]}{path}'
+
+
+class HTTPPoolTests(TestCase):
+    def test_connections_are_reused(self):
+        server = _WebhookStub()
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        pool = HTTPPool(maxsize=2)
+        self.addCleanup(pool.close)
+        for _ in range(3):
+            self.assertEqual(pool.request('POST', server.url(), body=b'{}', headers={'X-Agenda-Signature': '-'})[0], 204)
+        self.assertEqual(server.connections, 1)
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend', REMINDER_DIGEST_WINDOW_SECONDS=600,
+    WEBHOOK_ALLOW_PRIVATE=True,
+)
+class ChannelDispatchTests(TestCase):
+    def setUp(self):
+        self.server = _WebhookStub()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.addCleanup(self.server.gate.set)
+
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'Passw0rd!234')
+        self.endpoint = WebhookEndpoint.objects.create(user=self.user, url=self.server.url())
+        start = timezone.now() + timedelta(minutes=5)
+        self.event = Event.objects.create(owner=self.user, title='Planning', start=start, end=start + timedelta(hours=1))
+
+    def _reminder(self, channel, minutes=5):
+        return Reminder.objects.create(event=self.event, minutes_before=minutes, channel=channel)
+
+    def test_webhook_posts_signed_digest(self):
+        reminders = [self._reminder(Reminder.CHANNEL_WEBHOOK, m) for m in (5, 10)]
+        self.assertEqual(services.notify_reminders(reminders), [(True, '')] * 2)
+
+        [(path, signature, body)] = self.server.requests
+        expected = 'sha256=' + hmac.new(self.endpoint.secret.encode(), body, hashlib.sha256).hexdigest()
+        self.assertEqual(signature, expected)
+        self.assertEqual(sorted(r['id'] for r in json.loads(body)['reminders']), sorted(r.pk for r in reminders))
+        self.assertEqual(NotificationLog.objects.filter(channel='webhook', status='sent').count(), 2)
+
+    def test_webhook_errors_are_per_reminder_failures(self):
+        self.endpoint.url = self.server.url('/quebrado')
+        self.endpoint.save()
+        other = User.objects.create_user('bob', 'bob@example.com', 'Passw0rd!234')
+        start = timezone.now() + timedelta(minutes=5)
+        no_hook = Reminder.objects.create(
+            event=Event.objects.create(owner=other, title='X', start=start, end=start + timedelta(hours=1)),
+            channel=Reminder.CHANNEL_WEBHOOK,
+        )
+        with self.assertLogs('scheduler.channels', 'WARNING'):
+            results = services.notify_reminders([self._reminder(Reminder.CHANNEL_WEBHOOK), no_hook])
+        self.assertEqual(results, [(False, 'Falha na entrega do webhook.'), (False, 'Webhook não configurado.')])
+        self.assertEqual(Reminder.objects.filter(attempts=1).count(), 2)
+
+    def test_slow_webhook_does_not_hold_email(self):
+        self.server.gate.clear()
+        order = []
+        persist = services._persist_results
+
+        def record(reminders, results, token=None):
+            order.append((reminders[0].channel, self.server.gate.is_set()))
+            persist(reminders, results, token)
+            self.server.gate.set()
+
+        hook, email = self._reminder(Reminder.CHANNEL_WEBHOOK), self._reminder(Reminder.CHANNEL_EMAIL, 10)
+        with mock.patch.object(services, '_persist_results', side_effect=record):
+            results = services.notify_reminders([hook, email])
+        self.assertEqual(results, [(True, '')] * 2)
+        self.assertEqual(order, [('email', False), ('webhook', True)])
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_inapp_channel_and_inbox_api(self):
+        services.notify_reminders([self._reminder(Reminder.CHANNEL_INAPP)])
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        resp = client.get('/api/inbox/', {'read_at__isnull': 'true'})
+        [item] = resp.data['results']
+        self.assertEqual(item['title'], 'Planning')
+        client.post(f'/api/inbox/{item["id"]}/read/')
+        self.assertEqual(client.get('/api/inbox/', {'read_at__isnull': 'true'}).data['results'], [])
+        self.assertIsNotNone(InAppNotification.objects.get().read_at)
+
+    def test_webhook_endpoint_api(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        with mock.patch('socket.getaddrinfo', side_effect=_resolve({'example.com': '93.184.216.34'})):
+            resp = client.put('/api/webhook/', {'url': 'https://example.com/agenda', 'is_active': True}, format='json')
+        self.assertEqual(resp.status_code, 200, resp.content)
+        self.assertEqual(resp.data['secret'], self.endpoint.secret)
+        self.assertEqual(WebhookEndpoint.objects.get().url, 'https://example.com/agenda')
+        self.assertEqual(client.delete('/api/webhook/').status_code, 204)
+        self.assertEqual(client.get('/api/webhook/').status_code, 404)
+
+
+class WebhookTargetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'Passw0rd!234')
+
+    def test_only_public_http_targets_are_accepted(self):
+        hosts = {'example.com': '93.184.216.34', 'interno.example.com': '10.0.0.5', 'localhost': '127.0.0.1'}
+        blocked = [
+            'ftp://example.com/hook', 'http://localhost:8000/', 'http://127.0.0.1/', 'http://[::1]/',
+            'http://169.254.169.254/latest/meta-data/', 'http://interno.example.com/', 'http://[::ffff:10.0.0.1]/',
+        ]
+        with mock.patch('socket.getaddrinfo', side_effect=_resolve(hosts)):
+            netguard.validate_webhook_url('https://example.com/hook')
+            for url in blocked:
+                with self.subTest(url=url), self.assertRaises(ValidationError):
+                    netguard.validate_webhook_url(url)
+
+            client = APIClient()
+            client.force_authenticate(user=self.user)
+            resp = client.put('/api/webhook/', {'url': 'http://127.0.0.1:6379/', 'is_active': True}, format='json')
+        self.assertEqual(resp.status_code, 400)
+        self.assertFalse(WebhookEndpoint.objects.exists())
+
+    def test_private_target_is_refused_at_send_time_with_a_generic_reason(self):
+        # cadastrado quando ainda resolvia para um IP público (ou direto no banco)
+        server = _WebhookStub()
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        WebhookEndpoint.objects.create(user=self.user, url=server.url())
+        start = timezone.now() + timedelta(minutes=5)
+        event = Event.objects.create(owner=self.user, title='Planning', start=start, end=start + timedelta(hours=1))
+        reminder = Reminder.objects.create(event=event, minutes_before=5, channel=Reminder.CHANNEL_WEBHOOK)
+
+        with self.assertLogs('scheduler.channels', 'WARNING') as logs:
+            self.assertEqual(services.notify_reminders([reminder]), [(False, 'Falha na entrega do webhook.')])
+        self.assertIn('não público', logs.output[0])
+        self.assertEqual(server.requests, [])
+        self.assertEqual(server.connections, 0)
@@ -0,0 +1,122 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from scheduler.conflicts import find_conflicts
+from scheduler.models import Event
+from scheduler.web_views import EventForm
+
+User = get_user_model()
+
+
+class ConflictTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'Passw0rd!234')
+        self.other = User.objects.create_user('bob', 'bob@example.com', 'Passw0rd!234')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.base = (timezone.now() + timedelta(days=1)).replace(minute=0, second=0, microsecond=0)
+        self.meeting = Event.objects.create(
+            owner=self.user, title='Reunião', start=self.base, end=self.base + timedelta(hours=1),
+        )
+        Event.objects.create(
+            owner=self.other, title='Outro dono', start=self.base, end=self.base + timedelta(hours=1),
+        )
+
+    def test_overlap_rules(self):
+        b = self.base
+        self.assertEqual(find_conflicts(self.user.pk, b + timedelta(minutes=30), b + timedelta(hours=2)), [self.meeting])
+        # encostar não é conflito, nem o próprio evento
+        self.assertEqual(find_conflicts(self.user.pk, b + timedelta(hours=1), b + timedelta(hours=2)), [])
+        self.assertEqual(find_conflicts(self.user.pk, b, b + timedelta(hours=1), exclude_pk=self.meeting.pk), [])
+        # segundos dentro do mesmo minuto do índice ainda são resolvidos pelo filtro exato
+        self.assertEqual(find_conflicts(self.user.pk, b - timedelta(seconds=30), b), [])
+
+    def test_index_tracks_updates(self):
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cur:
+                cur.execute('SELECT count(*) FROM scheduler_event_span')
+                self.assertEqual(cur.fetchone()[0], 2)
+        self.meeting.start += timedelta(hours=3)
+        self.meeting.end += timedelta(hours=3)
+        self.meeting.save()
+        self.assertEqual(find_conflicts(self.user.pk, self.base, self.base + timedelta(hours=1)), [])
+
+    def test_recurring_series_is_checked_by_occurrence(self):
+        start = self.base - timedelta(weeks=3) + timedelta(hours=5)
+        series = Event.objects.create(
+            owner=self.user, title='Semanal', start=start, end=start + timedelta(hours=1),
+            recurrence='FREQ=WEEKLY',
+        )
+        hit = self.base + timedelta(hours=5, minutes=30)
+        self.assertEqual(find_conflicts(self.user.pk, hit, hit + timedelta(minutes=10)), [series])
+        miss = self.base + timedelta(days=1, hours=5)
+        self.assertEqual(find_conflicts(self.user.pk, miss, miss + timedelta(hours=1)), [])
+
+    def test_api_rejects_conflict_only_when_asked(self):
+        payload = {
+            'title': 'Almoço',
+            'start': (self.base + timedelta(minutes=30)).isoformat(),
+            'end': (self.base + timedelta(minutes=90)).isoformat(),
+        }
+        resp = self.client.post('/api/events/', {**payload, 'check_conflicts': True}, format='json')
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual([int(c['id']) for c in resp.data['conflicts']], [self.meeting.pk])
+
+        resp = self.client.post('/api/events/', payload, format='json')
+        self.assertEqual(resp.status_code, 201, resp.content)
+        self.assertNotIn('check_conflicts', resp.data)
+
+    def test_api_checks_later_occurrences_of_a_new_series(self):
+        # a primeira ocorrência está livre; a da 3ª semana bate na reunião
+        first = self.base - timedelta(weeks=2)
+        payload = {
+            'title': 'Semanal', 'recurrence': 'FREQ=WEEKLY;COUNT=4', 'check_conflicts': True,
+            'start': (first + timedelta(minutes=30)).isoformat(),
+            'end': (first + timedelta(minutes=90)).isoformat(),
+        }
+        self.assertEqual(find_conflicts(self.user.pk, first, first + timedelta(hours=1)), [])
+        resp = self.client.post('/api/events/', payload, format='json')
+        self.assertEqual(resp.status_code, 400, resp.content)
+        self.assertEqual([int(c['id']) for c in resp.data['conflicts']], [self.meeting.pk])
+
+        # além do horizonte não é checado
+        later = Event.objects.create(
+            owner=self.user, title='Revisão', start=self.base + timedelta(days=10),
+            end=self.base + timedelta(days=10, hours=1),
+        )
+        daily = self.base + timedelta(days=1, minutes=30)
+        args = (self.user.pk, daily, daily + timedelta(hours=1))
+        with self.settings(CONFLICT_HORIZON_DAYS=7):
+            self.assertEqual(find_conflicts(*args, recurrence='FREQ=DAILY'), [])
+        self.assertEqual(find_conflicts(*args, recurrence='FREQ=DAILY'), [later])
+
+    def test_all_day_is_checked_with_the_stored_bounds(self):
+        day = timezone.localtime(self.base).replace(hour=10) + timedelta(days=3)
+        lunch = Event.objects.create(owner=self.user, title='Almoço', start=day, end=day + timedelta(hours=1))
+        # 14h-15h não bate, mas o dia inteiro (00:00-23:59:59) sim
+        resp = self.client.post('/api/events/', {
+            'title': 'Feriado', 'is_all_day': True, 'check_conflicts': True,
+            'start': (day + timedelta(hours=4)).isoformat(), 'end': (day + timedelta(hours=5)).isoformat(),
+        }, format='json')
+        self.assertEqual(resp.status_code, 400, resp.content)
+        self.assertEqual([int(c['id']) for c in resp.data['conflicts']], [lunch.pk])
+
+    def test_api_update_ignores_itself(self):
+        resp = self.client.patch(f'/api/events/{self.meeting.pk}/', {
+            'end': (self.base + timedelta(minutes=90)).isoformat(), 'check_conflicts': True,
+        }, format='json')
+        self.assertEqual(resp.status_code, 200, resp.content)
+
+    def test_form_reports_conflicts(self):
+        local = timezone.localtime(self.base)
+        form = EventForm({
+            'title': 'Almoço', 'start': local.strftime('%Y-%m-%dT%H:%M'),
+            'end': (local + timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M'), 'check_conflicts': 'on',
+        }, user=self.user)
+        self.assertFalse(form.is_valid())
+        self.assertIn('Reunião', form.non_field_errors()[0])
@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from scheduler.freebusy import busy_intervals, free_slots, merge_intervals
+from scheduler.models import Event
+
+User = get_user_model()
+
+BASE = datetime(2030, 3, 4, 8, 0, tzinfo=dt_timezone.utc)  # segunda-feira
+
+
+def h(hours):
+    return BASE + timedelta(hours=hours)
+
+
+class FreeBusyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'Passw0rd!234')
+        self.bob = User.objects.create_user('bob', 'bob@example.com', 'Passw0rd!234')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _event(self, owner, start, end, **kw):
+        return Event.objects.create(owner=owner, title='x', start=start, end=end, **kw)
+
+    def test_merge_and_free_slots(self):
+        busy = merge_intervals([(1, 3), (2, 4), (4, 5), (7, 8)])
+        self.assertEqual(busy, [(1, 5), (7, 8)])
+        self.assertEqual(free_slots(busy, 0, 10), [(0, 1), (5, 7), (8, 10)])
+
+    def test_merges_overlaps_including_recurring_and_clips_to_range(self):
+        self._event(self.user, h(-2), h(1))        # começa antes do intervalo
+        self._event(self.user, h(0.5), h(2))       # sobrepõe o anterior
+        self._event(self.user, h(20), h(30))       # fora do intervalo
+        self._event(self.user, h(3), h(4), recurrence='FREQ=DAILY')
+        busy = busy_intervals([self.user.pk], h(0), h(10))[self.user.pk]
+        self.assertEqual(busy, [(h(0), h(2)), (h(3), h(4))])
+
+    def test_cached_until_user_events_change(self):
+        self._event(self.user, h(1), h(2))
+        busy_intervals([self.user.pk], h(0), h(10))
+        with self.assertNumQueries(0):
+            busy_intervals([self.user.pk], h(0), h(10))
+
+        ev = self._event(self.user, h(5), h(6))
+        self.assertEqual(len(busy_intervals([self.user.pk], h(0), h(10))[self.user.pk]), 2)
+        ev.delete()
+        self.assertEqual(len(busy_intervals([self.user.pk], h(0), h(10))[self.user.pk]), 1)
+
+    def test_endpoint_for_several_users(self):
+        self._event(self.user, h(1), h(2))
+        self._event(self.bob, h(4), h(5))
+        query = {
+            'start': h(0).isoformat(), 'end': h(8).isoformat(),
+            'users': f'{self.user.pk},{self.bob.pk}',
+        }
+        # sem a permissão, só a própria agenda
+        self.assertEqual(self.client.get('/api/freebusy/', query).status_code, 403)
+        self.assertEqual(self.client.get('/api/freebusy/', {**query, 'users': str(self.user.pk)}).status_code, 200)
+        self.assertEqual(self.client.get('/api/freebusy/', {**query, 'users': '999999'}).status_code, 403)
+
+        self.user.user_permissions.add(Permission.objects.get(codename='view_others_freebusy'))
+        self.user = User.objects.get(pk=self.user.pk)  # descarta o cache de permissões
+        self.client.force_authenticate(user=self.user)
+        resp = self.client.get('/api/freebusy/', query)
+        self.assertEqual(resp.status_code, 200, resp.content)
+        by_user = {u['user']: u for u in resp.data['users']}
+        self.assertEqual(len(by_user[self.bob.pk]['busy']), 1)
+        self.assertEqual(len(by_user[self.user.pk]['free']), 2)
+        self.assertNotIn('title', str(resp.data))
+
+        resp = self.client.get('/api/freebusy/', {'start': h(8).isoformat(), 'end': h(0).isoformat()})
+        self.assertEqual(resp.status_code, 400)
@@ -0,0 +1,126 @@
+import io
+import tempfile
+from datetime import datetime, timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from scheduler.ics import iter_vevents, vevent_to_fields
+from scheduler.models import Event, Reminder
+from scheduler.services import import_ics
+from scheduler.tasks import check_due_reminders
+
+User = get_user_model()
+
+SAMPLE = (
+    'BEGIN:VCALENDAR\r\n'
+    'VERSION:2.0\r\n'
+    'BEGIN:VEVENT\r\n'
+    'UID:a@x\r\n'
+    'DTSTART:20300105T130000Z\r\n'
+    'DTEND:20300105T140000Z\r\n'
+    'SUMMARY:Reunião com um título bem\r\n'
+    '  comprido\r\n'
+    'DESCRIPTION:linha 1\\nlinha 2\\, fim\r\n'
+    'BEGIN:VALARM\r\n'
+    'DESCRIPTION:alarme\r\n'
+    'END:VALARM\r\n'
+    'END:VEVENT\r\n'
+    'BEGIN:VEVENT\r\n'
+    'UID:b@x\r\n'
+    'DTSTART;VALUE=DATE:20300110\r\n'
+    'DTEND;VALUE=DATE:20300111\r\n'
+    'SUMMARY:Feriado\r\n'
+    'END:VEVENT\r\n'
+    'BEGIN:VEVENT\r\n'
+    'UID:c@x\r\n'
+    'DTSTART:20300105T130000Z\r\n'
+    'DTEND:20300105T120000Z\r\n'
+    'SUMMARY:Fim antes do início\r\n'
+    'END:VEVENT\r\n'
+    'END:VCALENDAR\r\n'
+)
+
+
+class IcsParserTests(TestCase):
+    def test_parses_folded_escaped_and_all_day_entries(self):
+        events = [vevent_to_fields(p) for p in iter_vevents(io.StringIO(SAMPLE))]
+        self.assertEqual(len(events), 3)
+        first, holiday = events[0], events[1]
+        self.assertEqual(first['title'], 'Reunião com um título bem comprido')
+        self.assertEqual(first['description'], 'linha 1\nlinha 2, fim')
+        self.assertEqual(first['start'], datetime(2030, 1, 5, 13, tzinfo=dt_timezone.utc))
+        self.assertTrue(holiday['is_all_day'])
+        self.assertEqual(holiday['end'].date(), holiday['start'].date())
+
+
+class IcsImportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'Passw0rd!234')
+
+    def _calendar(self, n):
+        body = ''.join(
+            'BEGIN:VEVENT\r\n'
+            f'UID:{i}@x\r\n'
+            f'DTSTART:20300105T{i % 24:02d}0000Z\r\n'
+            f'DTEND:20300105T{i % 24:02d}3000Z\r\n'
+            f'SUMMARY:Evento {i}\r\n'
+            'END:VEVENT\r\n'
+            for i in range(n)
+        )
+        return io.BytesIO(f'BEGIN:VCALENDAR\r\n{body}END:VCALENDAR\r\n'.encode())
+
+    def test_queries_per_batch_not_per_row(self):
+        progress = []
+        # 2 lotes x (savepoint + INSERT eventos + INSERT lembretes + INSERT outbox + release)
+        with self.assertNumQueries(10):
+            result = import_ics(self.user, self._calendar(40), batch_size=20,
+                                progress=lambda p, c: progress.append((p, c)))
+        self.assertEqual(result['created'], 40)
+        self.assertEqual(Reminder.objects.filter(event__owner=self.user).count(), 40)
+        self.assertEqual(progress[-1], (40, 40))
+
+    @override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend', REMINDER_STALE_POLICY='send')
+    def test_past_events_get_no_reminder(self):
+        calendar = io.StringIO(
+            'BEGIN:VCALENDAR\r\n'
+            'BEGIN:VEVENT\r\nUID:p@x\r\nDTSTART:20240105T130000Z\r\nDTEND:20240105T140000Z\r\n'
+            'SUMMARY:Passado\r\nEND:VEVENT\r\n'
+            'BEGIN:VEVENT\r\nUID:s@x\r\nDTSTART:20240105T130000Z\r\nDTEND:20240105T140000Z\r\n'
+            'RRULE:FREQ=WEEKLY;COUNT=3\r\nSUMMARY:Série encerrada\r\nEND:VEVENT\r\n'
+            'BEGIN:VEVENT\r\nUID:w@x\r\nDTSTART:20240105T130000Z\r\nDTEND:20240105T140000Z\r\n'
+            'RRULE:FREQ=WEEKLY\r\nSUMMARY:Semanal\r\nEND:VEVENT\r\n'
+            'END:VCALENDAR\r\n'
+        )
+        self.assertEqual(import_ics(self.user, calendar)['created'], 3)
+        # só a série em andamento ganha lembrete, apontando para a próxima ocorrência
+        reminder = Reminder.objects.get()
+        self.assertEqual(reminder.event.title, 'Semanal')
+        self.assertGreater(reminder.occurrence_start, timezone.now())
+        self.assertEqual(check_due_reminders()['sent'], 0)
+        self.assertEqual(mail.outbox, [])
+
+    def test_endpoint_reports_per_entry_errors(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        upload = SimpleUploadedFile('agenda.ics', SAMPLE.encode(), content_type='text/calendar')
+        resp = client.post('/api/events/import/ics/', {'file': upload}, format='multipart')
+        self.assertEqual(resp.status_code, 200, resp.content)
+        self.assertEqual(resp.data['created'], 2)
+        self.assertEqual([e['uid'] for e in resp.data['errors']], ['c@x'])
+        holiday = Event.objects.get(title='Feriado')
+        self.assertEqual((holiday.start.hour, holiday.end.hour), (0, 23))
+
+    def test_management_command(self):
+        with tempfile.NamedTemporaryFile('wb', suffix='.ics') as fh:
+            fh.write(self._calendar(3).getvalue())
+            fh.flush()
+            out = io.StringIO()
+            call_command('import_ics', 'alice', fh.name, stdout=out)
+        self.assertIn('3 evento(s) importado(s)', out.getvalue())
+        self.assertEqual(Event.objects.filter(owner=self.user).count(), 3)
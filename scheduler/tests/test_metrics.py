@@ -0,0 +1,56 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from app import metrics
+from scheduler.models import Event
+from scheduler.tasks import check_due_reminders
+
+User = get_user_model()
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        for histogram in metrics.REGISTRY:
+            histogram.clear()
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'Passw0rd!234')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        start = timezone.now() + timedelta(hours=1)
+        Event.objects.create(owner=self.user, title='Planning', start=start, end=start + timedelta(hours=1))
+
+    def _sample(self, text, name):
+        line = next(line for line in text.splitlines() if line.startswith(name + ' '))
+        return float(line.rsplit(' ', 1)[1])
+
+    def test_requests_and_tasks_are_exposed_per_view(self):
+        self.client.get('/api/events/')
+        self.client.get('/api/events/')
+        check_due_reminders.apply()
+
+        resp = self.client.get('/metrics')
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp['Content-Type'].startswith('text/plain'))
+        text = resp.content.decode()
+        self.assertIn('# TYPE http_request_duration_seconds histogram', text)
+        self.assertEqual(self._sample(text, 'http_request_duration_seconds_count{view="event-list"}'), 2)
+        self.assertGreater(self._sample(text, 'http_request_queries_sum{view="event-list"}'), 0)
+        self.assertEqual(self._sample(text, 'http_request_queries_bucket{view="event-list",le="+Inf"}'), 2)
+        self.assertEqual(self._sample(text, 'celery_task_duration_seconds_count{task="scheduler.check_due_reminders"}'), 1)
+        self.assertGreater(self._sample(text, 'celery_task_queries_sum{task="scheduler.check_due_reminders"}'), 0)
+
+    @override_settings(METRICS_TOKEN='segredo')
+    def test_token_is_required_when_configured(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        resp = self.client.get('/metrics', headers={'Authorization': 'Bearer segredo'})
+        self.assertEqual(resp.status_code, 200)
+
+    @override_settings(METRICS_SLOW_REQUEST_MS=0.001, METRICS_SLOW_QUERY_COUNT=2)
+    def test_slow_requests_log_heaviest_queries(self):
+        with self.assertLogs('app.metrics', 'WARNING') as logs:
+            self.client.get('/api/events/')
+        self.assertIn('GET event-list', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
@@ -47,3 +47,23 @@ class ModelTests(TestCase):
         r = Reminder.objects.create(event=ev, minutes_before=30)
         expected = ev.start - timedelta(minutes=30)
         self.assertEqual(r.scheduled_for.replace(microsecond=0), expected.replace(microsecond=0))
+
+    def test_moving_event_reschedules_only_pending_reminders(self):
+        start = timezone.now() + timedelta(hours=2)
+        ev = Event.objects.create(
+            owner=self.user, title='Reunião',
+            start=start, end=start + timedelta(hours=1), is_all_day=False
+        )
+        pending = Reminder.objects.create(event=ev, minutes_before=30)
+        sent = Reminder.objects.create(event=ev, minutes_before=60, is_sent=True, sent_at=timezone.now())
+        old_sent_for = sent.scheduled_for
+
+        ev = Event.objects.get(pk=ev.pk)
+        ev.start = start + timedelta(days=1)
+        ev.end = ev.start + timedelta(hours=1)
+        ev.save()
+
+        pending.refresh_from_db()
+        sent.refresh_from_db()
+        self.assertEqual(pending.scheduled_for, ev.start - timedelta(minutes=30))
+        self.assertEqual(sent.scheduled_for, old_sent_for)
@@ -0,0 +1,70 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from scheduler import monitoring
+from scheduler.models import Event, Reminder
+from scheduler.tasks import check_due_reminders
+
+User = get_user_model()
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend', REMINDER_LAG_DEGRADED_SECONDS=300)
+class DispatchMonitoringTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'Passw0rd!234')
+        self.now = timezone.now()
+
+    def _reminder(self, late_minutes):
+        # lembrete que venceu há ``late_minutes``
+        start = self.now + timedelta(minutes=5)
+        ev = Event.objects.create(owner=self.user, title='Planning', start=start, end=start + timedelta(minutes=30))
+        return Reminder.objects.create(event=ev, minutes_before=5 + late_minutes)
+
+    def test_health_degrades_with_old_backlog(self):
+        self.assertEqual(self.client.get('/health/').json()['status'], 'ok')
+        self._reminder(late_minutes=10)
+        self._reminder(late_minutes=1)
+
+        data = self.client.get('/health/').json()
+        self.assertEqual(data['status'], 'degraded')
+        self.assertEqual(data['reminders']['backlog'], 2)
+        self.assertGreaterEqual(data['reminders']['oldest_due_seconds'], 600)
+
+    def test_dispatch_records_lag_backlog_and_throughput(self):
+        self._reminder(late_minutes=2)
+        result = check_due_reminders()
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual((result['sent'], result['backlog'], result['oldest_due_seconds']), (1, 0, 0.0))
+        self.assertIn('claimed_per_second', result)
+        self.assertEqual(monitoring.last_run()['claimed'], 1)
+        counts, total, count = monitoring.lag_histogram()[Reminder.CHANNEL_EMAIL]
+        self.assertEqual(count, 1)
+        self.assertGreaterEqual(total, 120)
+        # cumulativo: acima de 2 min, dentro do bucket de 5 min
+        self.assertEqual(counts[monitoring.LAG_BUCKETS.index(120)], 0)
+        self.assertEqual(counts[monitoring.LAG_BUCKETS.index(300)], 1)
+
+        text = self.client.get('/metrics').content.decode()
+        self.assertIn('scheduler_reminder_delivery_lag_seconds_count{channel="email"} 1', text)
+        self.assertIn('scheduler_reminder_backlog 0', text)
+        self.assertIn('scheduler_dispatch_runs_total 1', text)
+
+    def test_backlog_query_reads_only_the_outbox_index(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('plano verificado só no SQLite')
+        with CaptureQueriesContext(connection) as captured:
+            monitoring.backlog_stats(self.now)
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {captured[0]["sql"]}')
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        # COUNT/MIN saem só do índice do outbox, sem ler a tabela
+        self.assertIn('COVERING INDEX scheduler_outbox_due_idx', plan)
@@ -0,0 +1,87 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.utils import timezone
+
+from scheduler import services
+from scheduler.models import Event, Reminder, ReminderOutbox
+from scheduler.tasks import dispatch_due_reminders
+
+User = get_user_model()
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend', REMINDER_DISPATCH_FANOUT=False,
+    REMINDER_RETRY_BASE_SECONDS=60, REMINDER_MAX_ATTEMPTS=2,
+)
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'Passw0rd!234')
+        start = timezone.now() + timedelta(minutes=1)
+        self.event = Event.objects.create(
+            owner=self.user, title='Planning', location='Sala 1', start=start, end=start + timedelta(hours=1),
+        )
+        self.reminder = Reminder.objects.create(event=self.event, minutes_before=5)
+
+    def _row(self):
+        return ReminderOutbox.objects.get(pk=self.reminder.pk)
+
+    def test_row_follows_reminder_event_and_user(self):
+        row = self._row()
+        self.assertEqual((row.recipient, row.title, row.due_at), ('alice@example.com', 'Planning', self.reminder.scheduled_for))
+
+        self.event.title = 'Planning Q3'
+        self.event.start += timedelta(hours=2)
+        self.event.end += timedelta(hours=2)
+        self.event.save()
+        self.user.email = 'alice@novo.example.com'
+        self.user.save()
+        row = self._row()
+        self.assertEqual(row.title, 'Planning Q3')
+        self.assertEqual(row.occurrence_start, self.event.start)
+        self.assertEqual(row.recipient, 'alice@novo.example.com')
+
+    def test_delivered_rows_leave_and_send_path_needs_no_joins(self):
+        history = Event.objects.create(owner=self.user, title='Antigo', start=self.event.start, end=self.event.end)
+        Reminder.objects.bulk_create([
+            Reminder(event=history, minutes_before=m, scheduled_for=self.event.start, is_sent=True) for m in range(20)
+        ])
+        self.assertEqual(ReminderOutbox.objects.count(), 1)
+
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(dispatch_due_reminders()['sent'], 1)
+        selects = [q['sql'] for q in captured if q['sql'].startswith('SELECT')]
+        self.assertFalse([sql for sql in selects if 'JOIN' in sql], selects)
+        self.assertEqual(mail.outbox[0].to, ['alice@example.com'])
+        self.assertFalse(ReminderOutbox.objects.exists())
+
+    def test_failures_are_postponed_then_dropped_and_requeue_restores(self):
+        with mock.patch.object(services, 'send_event_emails', side_effect=lambda msgs, connection=None: [(False, 'SMTP fora')] * len(msgs)):
+            dispatch_due_reminders()
+            self.reminder.refresh_from_db()
+            self.assertEqual(self._row().due_at, self.reminder.next_attempt_at)
+            self.assertEqual(self._row().claimed_by, '')
+
+            services.claim_due_reminders(now=self.reminder.next_attempt_at)
+            token = ReminderOutbox.objects.get().claimed_by
+            services.send_claimed_reminders(token)
+        self.reminder.refresh_from_db()
+        self.assertTrue(self.reminder.is_dead_lettered)
+        self.assertFalse(ReminderOutbox.objects.exists())
+
+        services.requeue_reminders(Reminder.objects.all())
+        self.assertEqual(self._row().due_at, self.reminder.scheduled_for)
+
+    def test_sync_keeps_a_live_claim(self):
+        token, ids = services.claim_due_reminders()
+        self.assertEqual(ids, [self.reminder.pk])
+        self.event.title = 'Renomeado'
+        self.event.save()
+        self.assertEqual(self._row().claimed_by, token)
+        # outro worker não consegue reservar a mesma linha
+        self.assertEqual(services.claim_due_reminders()[1], [])
@@ -0,0 +1,112 @@
+import asyncio
+import json
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from scheduler import services
+from scheduler.models import Event, Reminder
+from scheduler.push import hub, sse_app
+
+User = get_user_model()
+
+
+def _scope(headers=(), query=b''):
+    return {'type': 'http', 'method': 'GET', 'path': '/api/stream/', 'headers': list(headers), 'query_string': query}
+
+
+class _Client:
+    """Cliente SSE falso: coleta o que o app envia e desconecta quando pedido."""
+
+    def __init__(self):
+        self.sent = []
+        self.gone = asyncio.Event()
+        self._requested = False
+
+    async def receive(self):
+        if not self._requested:
+            self._requested = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await self.gone.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        self.sent.append(message)
+
+    def body(self) -> str:
+        return b''.join(m.get('body', b'') for m in self.sent if m['type'] == 'http.response.body').decode()
+
+    async def wait_for(self, predicate, timeout=5):
+        async def poll():
+            while not predicate():
+                await asyncio.sleep(0.01)
+        await asyncio.wait_for(poll(), timeout)
+
+
+@override_settings(PUSH_REDIS_URL='', PUSH_KEEPALIVE_SECONDS=0.05, REMINDER_DIGEST_WINDOW_SECONDS=0)
+class PushStreamTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'Passw0rd!234')
+        self.token = Token.objects.create(user=self.user)
+
+    def test_requires_authentication(self):
+        async def scenario():
+            client = _Client()
+            await sse_app(_scope(), client.receive, client.send)
+            return client.sent[0]['status']
+        self.assertEqual(async_to_sync(scenario)(), 401)
+
+    def test_inapp_reminder_is_pushed_to_connected_client(self):
+        start = timezone.now() + timedelta(minutes=5)
+        event = Event.objects.create(owner=self.user, title='Planning', start=start, end=start + timedelta(hours=1))
+        reminder = Reminder.objects.create(event=event, minutes_before=5, channel=Reminder.CHANNEL_INAPP)
+
+        async def scenario():
+            client = _Client()
+            auth = [(b'authorization', f'Token {self.token.key}'.encode())]
+            task = asyncio.ensure_future(sse_app(_scope(auth), client.receive, client.send))
+            await client.wait_for(lambda: hub.connections() == 1)
+            # o despacho é síncrono e publica de outra thread
+            await sync_to_async(services.notify_reminders)([reminder])
+            await client.wait_for(lambda: 'event: reminder' in client.body() and ': ping' in client.body())
+            client.gone.set()
+            await task
+            return client
+
+        client = async_to_sync(scenario)()
+        self.assertEqual(client.sent[0]['status'], 200)
+        self.assertIn((b'content-type', b'text/event-stream'), client.sent[0]['headers'])
+        data = next(line for line in client.body().splitlines() if line.startswith('data: '))
+        self.assertEqual(json.loads(data[len('data: '):])['title'], 'Planning')
+        self.assertEqual(hub.connections(), 0)
+
+    def test_other_users_do_not_receive(self):
+        other = User.objects.create_user('bob', 'bob@example.com', 'Passw0rd!234')
+
+        async def scenario():
+            client = _Client()
+            task = asyncio.ensure_future(sse_app(_scope(query=f'token={self.token.key}'.encode()), client.receive, client.send))
+            await client.wait_for(lambda: hub.connections() == 1)
+            hub.dispatch(other.pk, '{}')
+            await client.wait_for(lambda: ': ping' in client.body())
+            client.gone.set()
+            await task
+            return client.body()
+
+        self.assertNotIn('event: reminder', async_to_sync(scenario)())
+
+
+class PushScriptTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'Passw0rd!234')
+        self.client.force_login(self.user)
+
+    def test_wsgi_pages_only_open_the_stream_when_enabled(self):
+        # o runserver/WSGI não tem /api/stream/: sem o script o navegador não fica tentando reconectar
+        self.assertNotContains(self.client.get('/web/events/'), "EventSource('/api/stream/')")
+        with self.settings(PUSH_STREAM_ENABLED=True):
+            self.assertContains(self.client.get('/web/events/'), "EventSource('/api/stream/')")
@@ -0,0 +1,134 @@
+import io
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from scheduler.models import Event, Reminder
+from scheduler.recurrence import occurrences
+from scheduler.services import import_ics
+from scheduler.tasks import materialize_recurring_reminders
+
+User = get_user_model()
+
+
+class RecurrenceTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'Passw0rd!234')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        # série semanal sem fim que começou há 10 semanas (próxima ocorrência daqui a 1h)
+        start = (timezone.now() - timedelta(weeks=10) + timedelta(hours=1)).replace(microsecond=0)
+        self.weekly = Event.objects.create(
+            owner=self.user, title='1:1 semanal',
+            start=start, end=start + timedelta(minutes=30),
+            recurrence='FREQ=WEEKLY',
+        )
+
+    def test_expansion_only_covers_the_window(self):
+        now = timezone.now()
+        occ = list(occurrences(self.weekly, now, now + timedelta(weeks=3)))
+        self.assertEqual(len(occ), 3)
+        for o in occ:
+            self.assertGreaterEqual(o.end, now)
+            self.assertEqual(o.end - o.start, timedelta(minutes=30))
+        self.assertIsNone(self.weekly.recurrence_end)
+
+    def test_count_sets_series_end(self):
+        start = timezone.now().replace(microsecond=0)
+        ev = Event.objects.create(
+            owner=self.user, title='Curso', start=start, end=start + timedelta(hours=1),
+            recurrence='RRULE:FREQ=DAILY;COUNT=5',
+        )
+        self.assertEqual(ev.recurrence_end, start + timedelta(days=4, hours=1))
+
+    def test_invalid_rule_is_rejected_by_api(self):
+        start = timezone.now() + timedelta(hours=1)
+        resp = self.client.post('/api/events/', {
+            'title': 'X', 'start': start.isoformat(),
+            'end': (start + timedelta(hours=1)).isoformat(), 'recurrence': 'FREQ=SOMETIMES',
+        }, format='json')
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn('recurrence', resp.data)
+
+    def test_unsupported_rules_are_rejected_by_api(self):
+        start = timezone.now() + timedelta(hours=1)
+        for rule in (
+            'FREQ=DAILY\nEXDATE:20260101T000000Z',  # vira rruleset
+            'FREQ=SECONDLY;COUNT=3000000',
+            'FREQ=HOURLY',
+            'FREQ=DAILY;COUNT=1001',
+            f'FREQ=DAILY;UNTIL={(start + timedelta(days=365 * 11)):%Y%m%dT%H%M%SZ}',
+        ):
+            resp = self.client.post('/api/events/', {
+                'title': 'X', 'start': start.isoformat(),
+                'end': (start + timedelta(hours=1)).isoformat(), 'recurrence': rule,
+            }, format='json')
+            self.assertEqual(resp.status_code, 400, rule)
+            self.assertIn('recurrence', resp.data)
+
+    def test_until_sets_series_end(self):
+        start = timezone.now().replace(microsecond=0)
+        until = start + timedelta(days=2, hours=3)
+        ev = Event.objects.create(
+            owner=self.user, title='Curso', start=start, end=start + timedelta(hours=1),
+            recurrence=f'FREQ=DAILY;UNTIL={until.astimezone(dt_timezone.utc):%Y%m%dT%H%M%SZ}',
+        )
+        self.assertEqual(ev.recurrence_end, start + timedelta(days=2, hours=1))
+
+    def test_date_only_and_floating_until_from_ics(self):
+        calendar = io.StringIO(
+            'BEGIN:VCALENDAR\r\n'
+            'BEGIN:VEVENT\r\nUID:a@x\r\nDTSTART;VALUE=DATE:20300107\r\nDTEND;VALUE=DATE:20300108\r\n'
+            'RRULE:FREQ=WEEKLY;UNTIL=20300121\r\nSUMMARY:Plantão\r\nEND:VEVENT\r\n'
+            'BEGIN:VEVENT\r\nUID:b@x\r\nDTSTART:20300107T090000Z\r\nDTEND:20300107T100000Z\r\n'
+            'RRULE:FREQ=DAILY;UNTIL=20300109T090000\r\nSUMMARY:Daily\r\nEND:VEVENT\r\n'
+            'END:VCALENDAR\r\n'
+        )
+        result = import_ics(self.user, calendar, reminder_minutes=None)
+        self.assertEqual((result['created'], result['errors']), (2, []))
+        # a data do UNTIL é inclusiva: a ocorrência de 21/01 entra
+        shift = Event.objects.get(title='Plantão')
+        self.assertEqual(timezone.localtime(shift.recurrence_end).date(), date(2030, 1, 21))
+        self.assertEqual(len(list(occurrences(shift, shift.start, shift.start + timedelta(weeks=5)))), 3)
+        daily = Event.objects.get(title='Daily')
+        self.assertEqual(daily.recurrence_end, datetime(2030, 1, 9, 10, tzinfo=dt_timezone.utc))
+
+    def test_filter_and_occurrences_endpoint_include_past_series(self):
+        now = timezone.now()
+        window = {
+            'start_after': now.isoformat(),
+            'end_before': (now + timedelta(weeks=2)).isoformat(),
+        }
+        resp = self.client.get('/api/events/', {'start_after': window['start_after']})
+        self.assertEqual([e['id'] for e in resp.data['results']], [self.weekly.id])
+
+        resp = self.client.get('/api/events/occurrences/', window)
+        self.assertEqual(resp.status_code, 200, resp.content)
+        self.assertEqual(len(resp.data), 2)
+        self.assertTrue(all(o['event'] == self.weekly.id and o['is_recurring'] for o in resp.data))
+
+        resp = self.client.get('/api/events/occurrences/', {'start_after': window['start_after']})
+        self.assertEqual(resp.status_code, 400)
+
+    def test_reminder_targets_next_occurrence_and_rolls_forward(self):
+        now = timezone.now()
+        r = Reminder.objects.create(event=self.weekly, minutes_before=10)
+        first = r.occurrence_start
+        self.assertGreaterEqual(first, now)
+        self.assertLess(first, now + timedelta(weeks=1))
+
+        Reminder.objects.filter(pk=r.pk).update(is_sent=True, sent_at=now)
+        with self.settings(REMINDER_RECURRENCE_HORIZON_HOURS=24 * 8):
+            self.assertEqual(materialize_recurring_reminders(), {'advanced': 1})
+        r.refresh_from_db()
+        self.assertFalse(r.is_sent)
+        self.assertEqual(r.occurrence_start, first + timedelta(weeks=1))
+
+    def test_next_occurrence_beyond_horizon_is_not_materialized(self):
+        r = Reminder.objects.create(event=self.weekly, minutes_before=10)
+        Reminder.objects.filter(pk=r.pk).update(is_sent=True)
+        with self.settings(REMINDER_RECURRENCE_HORIZON_HOURS=1):
+            self.assertEqual(materialize_recurring_reminders(), {'advanced': 0})
@@ -0,0 +1,57 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from scheduler.models import Event, NotificationDailyStat, NotificationLog
+from scheduler.retention import compact_notification_logs
+
+User = get_user_model()
+
+
+@override_settings(NOTIFICATION_LOG_RETENTION_DAYS=30, NOTIFICATION_LOG_FAILED_RETENTION_DAYS=7)
+class NotificationRetentionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'Passw0rd!234')
+        self.now = timezone.now()
+        self.event = Event.objects.create(
+            owner=self.user, title='Standup', start=self.now, end=self.now + timedelta(minutes=15),
+        )
+
+    def _logs(self, status, days_ago, n=1):
+        logs = NotificationLog.objects.bulk_create([
+            NotificationLog(event=self.event, user=self.user, status=status) for _ in range(n)
+        ])
+        NotificationLog.objects.filter(pk__in=[log.pk for log in logs]).update(
+            created_at=self.now - timedelta(days=days_ago)
+        )
+
+    def test_expired_logs_become_daily_counts(self):
+        self._logs(NotificationLog.STATUS_SENT, 40, n=3)
+        self._logs(NotificationLog.STATUS_FAILED, 10, n=2)
+        self._logs(NotificationLog.STATUS_SENT, 10)     # ainda no TTL dos enviados
+        self._logs(NotificationLog.STATUS_FAILED, 1)
+
+        result = compact_notification_logs(now=self.now, batch_size=2)
+        self.assertEqual(result, {'compacted': 5, 'batches': 3})
+        self.assertEqual(NotificationLog.objects.count(), 2)
+        stats = {(s.status, s.day): s.count for s in NotificationDailyStat.objects.all()}
+        day = lambda d: timezone.localdate(self.now - timedelta(days=d))
+        self.assertEqual(stats, {
+            (NotificationLog.STATUS_SENT, day(40)): 3,
+            (NotificationLog.STATUS_FAILED, day(10)): 2,
+        })
+
+    def test_later_runs_add_to_existing_rows(self):
+        self._logs(NotificationLog.STATUS_FAILED, 10)
+        compact_notification_logs(now=self.now)
+        self._logs(NotificationLog.STATUS_FAILED, 10, n=2)
+        compact_notification_logs(now=self.now)
+        self.assertEqual(NotificationDailyStat.objects.get().count, 3)
+
+    def test_max_batches_bounds_a_run(self):
+        self._logs(NotificationLog.STATUS_SENT, 40, n=5)
+        self.assertEqual(compact_notification_logs(now=self.now, batch_size=2, max_batches=1),
+                         {'compacted': 2, 'batches': 1})
+        self.assertEqual(NotificationLog.objects.count(), 3)
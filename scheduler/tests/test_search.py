@@ -0,0 +1,75 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from scheduler.models import Event
+from scheduler.search import search_events, search_supported
+
+User = get_user_model()
+
+
+class FullTextSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'Passw0rd!234')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.start = timezone.now() + timedelta(days=1)
+
+    def _event(self, title, **fields):
+        return Event.objects.create(
+            owner=self.user, title=title, start=self.start, end=self.start + timedelta(hours=1), **fields
+        )
+
+    def _search(self, text, **params):
+        resp = self.client.get('/api/events/', {'search': text, **params})
+        self.assertEqual(resp.status_code, 200, resp.content)
+        return resp.data
+
+    def test_backend_has_an_index(self):
+        self.assertTrue(search_supported())
+
+    def test_ranks_title_matches_first_and_ignores_accents(self):
+        in_description = self._event('Almoço', description='depois da reunião com o time')
+        in_title = self._event('Reunião de planejamento')
+        self._event('Dentista')
+
+        ids = [e['id'] for e in self._search('reuniao')['results']]
+        self.assertEqual(ids, [in_title.pk, in_description.pk])
+        # prefixo e todos os termos obrigatórios
+        self.assertEqual([e['id'] for e in self._search('planej reun')['results']], [in_title.pk])
+
+    def test_index_follows_updates_and_deletes(self):
+        ev = self._event('Consulta')
+        self.assertEqual(len(self._search('consulta')['results']), 1)
+        ev.title = 'Academia'
+        ev.save()
+        self.assertEqual(self._search('consulta')['results'], [])
+        self.assertEqual(len(self._search('academia')['results']), 1)
+        ev.delete()
+        self.assertEqual(self._search('academia')['results'], [])
+
+    def test_ranked_results_paginate_with_cursor(self):
+        for i in range(5):
+            self._event(f'Sprint {i}', description='sprint ' * i)
+        seen, page = [], self._search('sprint', page_size=2)
+        while True:
+            seen += [e['id'] for e in page['results']]
+            if not page['next']:
+                break
+            page = self.client.get(page['next']).data
+        self.assertEqual(sorted(seen), sorted(Event.objects.values_list('pk', flat=True)))
+        self.assertEqual(len(seen), 5)
+
+    def test_other_owners_and_blank_terms(self):
+        User.objects.create_user('bob', 'bob@example.com', 'Passw0rd!234').events.create(
+            title='Reunião', start=self.start, end=self.start + timedelta(hours=1),
+        )
+        self.assertEqual(self._search('reunião')['results'], [])
+        self._event('Reunião')
+        qs = Event.objects.filter(owner=self.user)
+        self.assertEqual(search_events(qs, '  !! ').count(), 1)
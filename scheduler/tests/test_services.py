@@ -0,0 +1,198 @@
+import socketserver
+import threading
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail import EmailMessage
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from scheduler import services
+from scheduler.models import Event, Reminder, ReminderOutbox, NotificationLog
+
+User = get_user_model()
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    # SMTP mínimo: aceita tudo, exceto destinatários com "recusado" no endereço
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply('220 stub ESMTP')
+        in_data = False
+        for raw in self.rfile:
+            line = raw.decode().rstrip('\r\n')
+            if in_data:
+                if line == '.':
+                    in_data = False
+                    self.server.messages += 1
+                    self.reply('250 OK')
+                continue
+            cmd = line[:4].upper()
+            if cmd == 'EHLO':
+                self.reply('250-stub')
+                self.reply('250 OK')
+            elif cmd == 'RCPT' and 'recusado' in line:
+                self.reply('550 usuario inexistente')
+            elif cmd == 'DATA':
+                in_data = True
+                self.reply('354 envie')
+            elif cmd == 'QUIT':
+                self.reply('221 tchau')
+                break
+            else:
+                self.reply('250 OK')
+
+
+class _SMTPStub(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _SMTPHandler)
+        self.connections = 0
+        self.messages = 0
+
+
+def _message(to):
+    return EmailMessage('Assunto', 'Corpo', 'no-reply@agenda.local', [to])
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend', REMINDER_DIGEST_WINDOW_SECONDS=0)
+class BatchEmailLocmemTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'Passw0rd!234')
+        start = timezone.now() + timedelta(minutes=1)
+        self.event = Event.objects.create(
+            owner=self.user, title='Planning',
+            start=start, end=start + timedelta(hours=1), is_all_day=False
+        )
+
+    def test_notify_reminders_uses_one_connection_and_logs_each(self):
+        reminders = [Reminder.objects.create(event=self.event, minutes_before=m) for m in (5, 10, 15)]
+        with mock.patch.object(services, 'get_connection', wraps=services.get_connection) as get_conn:
+            results = services.notify_reminders(reminders)
+
+        self.assertEqual(results, [(True, '')] * 3)
+        self.assertEqual(get_conn.call_count, 1)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(NotificationLog.objects.filter(status=NotificationLog.STATUS_SENT).count(), 3)
+
+
+class BatchEmailSMTPTests(TestCase):
+    def setUp(self):
+        self.server = _SMTPStub()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        host, port = self.server.server_address
+        self.settings_override = override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+            EMAIL_HOST=host, EMAIL_PORT=port, EMAIL_USE_TLS=False,
+        )
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+    def test_messages_share_a_single_smtp_session(self):
+        results = services.send_event_emails([_message(f'u{i}@example.com') for i in range(5)])
+        self.assertEqual(results, [(True, '')] * 5)
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(self.server.messages, 5)
+
+    def test_failure_is_reported_per_message(self):
+        results = services.send_event_emails([
+            _message('a@example.com'),
+            _message('recusado@example.com'),
+            _message('b@example.com'),
+        ])
+        self.assertEqual([ok for ok, _ in results], [True, False, True])
+        self.assertIn('recusado@example.com', results[1][1])
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(self.server.messages, 2)
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class BulkPersistenceTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'Passw0rd!234')
+        start = timezone.now() + timedelta(minutes=1)
+        self.event = Event.objects.create(
+            owner=self.user, title='Retro',
+            start=start, end=start + timedelta(hours=1), is_all_day=False
+        )
+
+    def _claimed(self, n):
+        for m in range(1, n + 1):
+            Reminder.objects.create(event=self.event, minutes_before=m)
+        token, _ = services.claim_due_reminders()
+        return token, list(ReminderOutbox.objects.filter(claimed_by=token))
+
+    def test_writes_do_not_grow_with_batch_size(self):
+        token, reminders = self._claimed(6)
+        # savepoint + SELECT das reservas + bulk_create + UPDATE + DELETE do outbox + release
+        with self.assertNumQueries(6):
+            services.notify_reminders(reminders, token=token)
+        self.assertEqual(Reminder.objects.filter(is_sent=True).count(), 6)
+        self.assertFalse(ReminderOutbox.objects.exists())
+        self.assertEqual(NotificationLog.objects.count(), 6)
+
+    def test_reclaimed_rows_are_not_marked_by_stale_worker(self):
+        token, reminders = self._claimed(2)
+        # lease expirou e outro worker reservou as mesmas linhas
+        ReminderOutbox.objects.update(claimed_by='outro', claimed_until=timezone.now() + timedelta(minutes=1))
+        services.notify_reminders(reminders, token=token)
+        self.assertFalse(Reminder.objects.filter(is_sent=True).exists())
+        # nem log: a entrega fica por conta de quem detém a reserva agora
+        self.assertFalse(NotificationLog.objects.exists())
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend', REMINDER_DIGEST_WINDOW_SECONDS=600)
+class DigestTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user('alice', 'alice@example.com', 'Passw0rd!234')
+        self.bob = User.objects.create_user('bob', 'bob@example.com', 'Passw0rd!234')
+        self.now = timezone.now()
+
+    def _event(self, owner, title, minutes_from_now):
+        start = self.now + timedelta(minutes=minutes_from_now)
+        return Event.objects.create(owner=owner, title=title, start=start, end=start + timedelta(minutes=30))
+
+    def test_one_message_per_user_with_per_reminder_logs(self):
+        planning = self._event(self.alice, 'Planning', 5)
+        review = self._event(self.alice, 'Review', 8)
+        other = self._event(self.bob, 'Dentista', 5)
+        reminders = [
+            Reminder.objects.create(event=planning, minutes_before=5),
+            Reminder.objects.create(event=planning, minutes_before=10),
+            Reminder.objects.create(event=review, minutes_before=10),
+            Reminder.objects.create(event=other, minutes_before=10),
+        ]
+        results = services.notify_reminders(reminders)
+
+        self.assertEqual(results, [(True, '')] * 4)
+        self.assertEqual(len(mail.outbox), 2)
+        digest = next(m for m in mail.outbox if m.to == ['alice@example.com'])
+        self.assertEqual(digest.subject, 'Lembretes: 2 eventos em breve')
+        self.assertEqual(digest.body.count('Planning'), 1)
+        self.assertIn('Review', digest.body)
+        self.assertEqual(NotificationLog.objects.count(), 4)
+        self.assertEqual(Reminder.objects.filter(is_sent=True).count(), 4)
+
+    def test_claim_pulls_in_same_user_reminders_within_window(self):
+        due = Reminder.objects.create(event=self._event(self.alice, 'Planning', 1), minutes_before=5)
+        soon = Reminder.objects.create(event=self._event(self.alice, 'Review', 8), minutes_before=1)
+        later = Reminder.objects.create(event=self._event(self.alice, 'Almoço', 60), minutes_before=5)
+        Reminder.objects.create(event=self._event(self.bob, 'Dentista', 8), minutes_before=1)
+        # outro canal: não entraria no digest, então espera a sua hora
+        other_channel = Reminder.objects.create(
+            event=self._event(self.alice, 'Call', 8), minutes_before=1, channel=Reminder.CHANNEL_INAPP,
+        )
+
+        _, ids = services.claim_due_reminders(now=self.now)
+        self.assertEqual(sorted(ids), sorted([due.pk, soon.pk]))
+        self.assertNotIn(later.pk, ids)
+        self.assertNotIn(other_channel.pk, ids)
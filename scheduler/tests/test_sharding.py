@@ -0,0 +1,107 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from scheduler.models import Event, Reminder, ReminderOutbox, SchedulerNode, ShardLease
+from scheduler.services import claim_due_reminders
+from scheduler.sharding import ShardCoordinator, reshard_outbox, shard_for, unowned_shards
+from scheduler.tasks import check_due_reminders
+from scheduler.timing import ReminderScheduler
+
+User = get_user_model()
+
+
+@override_settings(REMINDER_SHARDS=4, REMINDER_SHARD_LEASE_SECONDS=30)
+class ShardCoordinatorTests(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        self.a = ShardCoordinator(node='a')
+        self.b = ShardCoordinator(node='b')
+
+    def test_nodes_split_the_shards(self):
+        self.assertEqual(self.a.heartbeat(self.now), {0, 1, 2, 3})
+        # b entra: pega o que está livre/combinado; a solta a sua metade no próximo heartbeat
+        self.b.heartbeat(self.now)
+        self.assertEqual(self.a.heartbeat(self.now + timedelta(seconds=10)), {0, 2})
+        self.assertEqual(self.b.heartbeat(self.now + timedelta(seconds=10)), {1, 3})
+        self.assertEqual(unowned_shards(self.now + timedelta(seconds=10)), [])
+
+    def test_never_takes_a_live_lease_from_another_node(self):
+        self.a.heartbeat(self.now)
+        # b vê os dois nós, mas os shards 1 e 3 ainda estão com a: espera a soltar
+        self.assertEqual(self.b.heartbeat(self.now), frozenset())
+
+    def test_dead_node_loses_its_shards_after_the_lease(self):
+        self.a.heartbeat(self.now)
+        self.b.heartbeat(self.now)
+        self.a.heartbeat(self.now)
+        self.b.heartbeat(self.now)
+        # a para de renovar: depois do lease, b fica com tudo
+        later = self.now + timedelta(seconds=31)
+        self.assertEqual(self.b.heartbeat(later), {0, 1, 2, 3})
+        self.assertEqual(list(SchedulerNode.objects.values_list('name', flat=True)), ['b'])
+
+    def test_leave_releases_immediately(self):
+        self.a.heartbeat(self.now)
+        self.a.leave()
+        self.assertEqual(unowned_shards(self.now), [0, 1, 2, 3])
+        self.assertEqual(self.b.heartbeat(self.now), {0, 1, 2, 3})
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend', REMINDER_DISPATCH_FANOUT=False,
+    REMINDER_SHARDS=2, REMINDER_DIGEST_WINDOW_SECONDS=0,
+)
+class ShardedDispatchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.now()
+        self.users = [User.objects.create_user(f'u{i}', f'u{i}@example.com', 'Passw0rd!234') for i in range(4)]
+        self.reminders = {}
+        for user in self.users:
+            event = Event.objects.create(
+                owner=user, title='Sync', start=self.now + timedelta(minutes=1), end=self.now + timedelta(hours=1),
+            )
+            self.reminders[user.pk] = Reminder.objects.create(event=event, minutes_before=5)
+
+    def _shard_ids(self, shard):
+        return {r.pk for uid, r in self.reminders.items() if shard_for(uid) == shard}
+
+    def test_outbox_rows_carry_the_owner_shard(self):
+        for uid, r in self.reminders.items():
+            self.assertEqual(ReminderOutbox.objects.get(pk=r.pk).shard, uid % 2)
+
+    def test_claims_stay_inside_the_shards(self):
+        _, ids = claim_due_reminders(shards=[0])
+        self.assertEqual(set(ids), self._shard_ids(0))
+        _, ids = claim_due_reminders(shards=[0])
+        self.assertEqual(ids, [])
+
+    def test_scheduler_dispatches_only_owned_shards(self):
+        a, b = ShardCoordinator(node='a'), ShardCoordinator(node='b')
+        a.heartbeat(self.now)
+        b.heartbeat(self.now)
+        a.heartbeat(self.now)
+        b.heartbeat(self.now)
+        fired_a, fired_b = [], []
+        ReminderScheduler(window_minutes=10, dispatch=fired_a.extend, coordinator=a).tick(self.now)
+        ReminderScheduler(window_minutes=10, dispatch=fired_b.extend, coordinator=b).tick(self.now)
+        self.assertEqual(set(fired_a), self._shard_ids(0))
+        self.assertEqual(set(fired_b), self._shard_ids(1))
+
+    def test_beat_sweep_skips_owned_shards(self):
+        ShardLease.objects.create(shard=0, owner='a', expires_at=timezone.now() + timedelta(minutes=1))
+        result = check_due_reminders()
+        self.assertEqual(result['sent'], len(self._shard_ids(1)))
+        self.assertEqual(set(ReminderOutbox.objects.values_list('pk', flat=True)), self._shard_ids(0))
+        self.assertEqual(len(mail.outbox), len(self._shard_ids(1)))
+
+    def test_reshard_after_changing_the_count(self):
+        with self.settings(REMINDER_SHARDS=3):
+            self.assertEqual(reshard_outbox(), sum(1 for uid in self.reminders if uid % 2 != uid % 3))
+            for uid, r in self.reminders.items():
+                self.assertEqual(ReminderOutbox.objects.get(pk=r.pk).shard, uid % 3)
@@ -1,11 +1,14 @@
 from datetime import timedelta
+from unittest import mock
 from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.core import mail
+from rest_framework.test import APIClient
 
-from scheduler.models import Event, Reminder, NotificationLog
-from scheduler.tasks import check_due_reminders
+from scheduler.models import Event, Reminder, ReminderOutbox, NotificationLog
+from scheduler.services import claim_due_reminders
+from scheduler.tasks import check_due_reminders, send_reminder_batch
 
 User = get_user_model()
 
@@ -43,3 +46,105 @@ class TaskTests(TestCase):
 
         self.assertEqual(len(mail.outbox), 1)
         self.assertIn('Lembrete: Chamada rápida', mail.outbox[0].subject)
+
+    def _due_event(self, title='Daily', minutes=(2, 3)):
+        start = timezone.now() + timedelta(minutes=1)
+        ev = Event.objects.create(
+            owner=self.user, title=title,
+            start=start, end=start + timedelta(minutes=15), is_all_day=False
+        )
+        for m in minutes:
+            Reminder.objects.create(event=ev, minutes_before=m)
+        return ev
+
+    def test_claim_is_exclusive_between_workers(self):
+        self._due_event()
+        token_a, ids_a = claim_due_reminders(limit=1)
+        token_b, ids_b = claim_due_reminders(limit=1)
+        self.assertEqual(len(ids_a), 1)
+        self.assertEqual(len(ids_b), 1)
+        self.assertNotEqual(ids_a, ids_b)
+        # tudo reservado: um terceiro worker não pega nada
+        self.assertEqual(claim_due_reminders()[1], [])
+
+    @override_settings(REMINDER_DISPATCH_FANOUT=True, REMINDER_CLAIM_BATCH_SIZE=1)
+    def test_fanout_dispatches_one_task_per_batch(self):
+        self._due_event()
+        with mock.patch.object(send_reminder_batch, 'delay') as delay:
+            result = check_due_reminders()
+        self.assertEqual({k: result[k] for k in ('sent', 'claimed', 'batches')}, {'sent': 0, 'claimed': 2, 'batches': 2})
+        self.assertEqual(delay.call_count, 2)
+
+        for call in delay.call_args_list:
+            send_reminder_batch(*call.args)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertFalse(Reminder.objects.filter(is_sent=False).exists())
+        self.assertFalse(ReminderOutbox.objects.exists())
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    REMINDER_DISPATCH_FANOUT=False,
+    REMINDER_RETRY_BASE_SECONDS=60, REMINDER_RETRY_MAX_SECONDS=600, REMINDER_MAX_ATTEMPTS=3,
+)
+class RetryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'Passw0rd!234')
+        start = timezone.now() + timedelta(minutes=1)
+        self.event = Event.objects.create(
+            owner=self.user, title='Daily', start=start, end=start + timedelta(minutes=15),
+        )
+        self.reminder = Reminder.objects.create(event=self.event, minutes_before=2)
+
+    def _fail_at(self, now):
+        with mock.patch('scheduler.services.send_event_emails', side_effect=lambda msgs, **kw: [(False, 'SMTP fora')] * len(msgs)), \
+                mock.patch('django.utils.timezone.now', return_value=now):
+            return check_due_reminders()
+
+    def test_failures_back_off_then_dead_letter(self):
+        now = timezone.now()
+        self.assertEqual(self._fail_at(now)['claimed'], 1)
+        self.reminder.refresh_from_db()
+        self.assertEqual(self.reminder.attempts, 1)
+        self.assertEqual(self.reminder.last_error, 'SMTP fora')
+        self.assertEqual(self.reminder.next_attempt_at - now, timedelta(seconds=60))
+
+        # dentro do backoff não é reservado de novo
+        self.assertEqual(self._fail_at(now + timedelta(seconds=30))['claimed'], 0)
+        self._fail_at(now + timedelta(seconds=61))
+        self.reminder.refresh_from_db()
+        self.assertEqual(self.reminder.attempts, 2)
+        self.assertEqual(self.reminder.next_attempt_at - now, timedelta(seconds=61 + 120))
+
+        self._fail_at(now + timedelta(seconds=200))
+        self.reminder.refresh_from_db()
+        self.assertEqual(self.reminder.attempts, 3)
+        self.assertTrue(self.reminder.is_dead_lettered)
+        self.assertIsNone(self.reminder.next_attempt_at)
+        self.assertEqual(self._fail_at(now + timedelta(days=1))['claimed'], 0)
+        self.assertEqual(NotificationLog.objects.filter(status=NotificationLog.STATUS_FAILED).count(), 3)
+
+    def test_dead_letter_api_lists_and_requeues(self):
+        Reminder.objects.filter(pk=self.reminder.pk).update(
+            attempts=3, dead_lettered_at=timezone.now(), last_error='SMTP fora',
+        )
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        resp = client.get('/api/reminders/dead-letter/')
+        self.assertEqual([r['id'] for r in resp.data['results']], [self.reminder.pk])
+
+        resp = client.post('/api/reminders/dead-letter/requeue/', {'ids': [self.reminder.pk]}, format='json')
+        self.assertEqual(resp.data, {'requeued': 1})
+        self.assertEqual(client.get('/api/reminders/dead-letter/').data['results'], [])
+        self.assertEqual(check_due_reminders()['sent'], 1)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_dead_letter_requeue_rejects_bad_ids(self):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        for ids in (['x'], [[1]], 'x', [True]):
+            resp = client.post('/api/reminders/dead-letter/requeue/', {'ids': ids}, format='json')
+            self.assertEqual(resp.status_code, 400, ids)
+        for body in ([self.reminder.pk], 'x', 1):
+            resp = client.post('/api/reminders/dead-letter/requeue/', body, format='json')
+            self.assertEqual(resp.status_code, 400, body)
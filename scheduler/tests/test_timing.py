@@ -0,0 +1,79 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from scheduler.models import Event, Reminder, ReminderOutbox
+from scheduler.timing import ReminderHeap, ReminderScheduler
+
+User = get_user_model()
+
+
+class ReminderHeapTests(TestCase):
+    def test_pop_due_returns_only_due_in_order(self):
+        now = timezone.now()
+        heap = ReminderHeap()
+        heap.load([(now + timedelta(seconds=30), 3), (now - timedelta(seconds=5), 1), (now, 2)])
+        self.assertEqual(heap.pop_due(now), [1, 2])
+        self.assertEqual(heap.next_due(), now + timedelta(seconds=30))
+        self.assertEqual(len(heap), 1)
+
+
+class ReminderSchedulerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('alice', 'alice@example.com', 'Passw0rd!234')
+        self.now = timezone.now()
+        self.event = Event.objects.create(
+            owner=self.user, title='Standup',
+            start=self.now + timedelta(minutes=5), end=self.now + timedelta(minutes=20),
+        )
+        self.fired = []
+        self.scheduler = ReminderScheduler(window_minutes=10, dispatch=self.fired.extend)
+
+    def test_fires_within_the_second_and_reads_db_only_on_change(self):
+        r = Reminder.objects.create(event=self.event, minutes_before=3)  # vence em now+2min
+        self.scheduler.tick(self.now)
+        self.assertEqual(self.fired, [])
+
+        # sem mudanças na agenda os ticks não tocam no banco
+        with self.assertNumQueries(0):
+            self.scheduler.tick(r.scheduled_for - timedelta(seconds=1))
+        self.assertEqual(self.fired, [])
+        # o disparo só confere se o id saiu do outbox
+        with self.assertNumQueries(1):
+            self.scheduler.tick(r.scheduled_for)
+        self.assertEqual(self.fired, [r.pk])
+
+    def test_new_reminder_invalidates_window(self):
+        self.scheduler.tick(self.now)
+        r = Reminder.objects.create(event=self.event, minutes_before=1)
+        self.scheduler.tick(r.scheduled_for)
+        self.assertEqual(self.fired, [r.pk])
+
+    def test_unclaimed_ids_go_back_to_the_heap(self):
+        r = Reminder.objects.create(event=self.event, minutes_before=3)
+        # o despacho não reservou nada (orçamento, outro worker): a linha continua no outbox
+        self.scheduler.tick(r.scheduled_for)
+        self.assertEqual(self.fired, [r.pk])
+        self.assertEqual(self.scheduler.heap.next_due(), r.scheduled_for + ReminderScheduler.retry_after)
+        self.scheduler.tick(r.scheduled_for + ReminderScheduler.retry_after)
+        self.assertEqual(self.fired, [r.pk, r.pk])
+
+        # reservado por outro worker: só volta quando o lease dele vence
+        lease = r.scheduled_for + timedelta(minutes=2)
+        ReminderOutbox.objects.filter(pk=r.pk).update(claimed_by='outro', claimed_until=lease)
+        self.scheduler.tick(lease - timedelta(minutes=1))
+        self.assertEqual(self.scheduler.heap.next_due(), lease)
+
+        # enviado: sai do outbox e não volta
+        sent = Reminder.objects.create(event=self.event, minutes_before=6)  # venceu há 1 min
+        scheduler = ReminderScheduler(window_minutes=1)
+        with override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend', REMINDER_DIGEST_WINDOW_SECONDS=0,
+        ):
+            self.assertEqual(scheduler.tick(), [sent.pk])
+        self.assertFalse(ReminderOutbox.objects.filter(pk=sent.pk).exists())
+        self.assertEqual(len(scheduler.heap), 0)
@@ -0,0 +1,134 @@
+import heapq
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import ReminderOutbox
+
+SCHEDULE_VERSION_KEY = 'scheduler:reminders:version'
+
+
+def schedule_version() -> int:
+    return cache.get(SCHEDULE_VERSION_KEY, 0)
+
+
+def touch_schedule() -> None:
+    """Avisa os schedulers em memória que a janela de lembretes mudou."""
+    if not cache.add(SCHEDULE_VERSION_KEY, 1, timeout=None):
+        try:
+            cache.incr(SCHEDULE_VERSION_KEY)
+        except ValueError:
+            cache.set(SCHEDULE_VERSION_KEY, 1, timeout=None)
+
+
+class ReminderHeap:
+    """Min-heap de ``(scheduled_for, reminder_id)`` da janela pré-carregada."""
+
+    def __init__(self):
+        self._heap = []
+
+    def __len__(self):
+        return len(self._heap)
+
+    def load(self, entries):
+        self._heap = list(entries)
+        heapq.heapify(self._heap)
+
+    def next_due(self):
+        return self._heap[0][0] if self._heap else None
+
+    def push(self, when, reminder_id) -> None:
+        heapq.heappush(self._heap, (when, reminder_id))
+
+    def pop_due(self, now) -> list[int]:
+        ids = []
+        while self._heap and self._heap[0][0] <= now:
+            ids.append(heapq.heappop(self._heap)[1])
+        return ids
+
+
+class ReminderScheduler:
+    """
+    Mantém em memória os lembretes pendentes dos próximos N minutos.
+
+    O banco só é lido de novo quando a janela acaba ou quando algum lembrete é
+    criado/alterado/removido (versão no cache, ver ``touch_schedule``).
+
+    Com um ``coordinator`` (``sharding.ShardCoordinator``) só carrega e despacha
+    os shards que este nó detém, recarregando quando a divisão muda.
+
+    Um id disparado que o despacho não reservou (orçamento esgotado, outro
+    worker, lease do fan-out) volta para o heap: o beat não varre shards com
+    dono, então ninguém mais tentaria antes da próxima janela.
+    """
+    # espera antes de tentar de novo um id que não saiu do outbox
+    retry_after = timedelta(seconds=5)
+
+    def __init__(self, window_minutes=None, dispatch=None, coordinator=None):
+        self.window = timedelta(minutes=window_minutes or settings.REMINDER_WINDOW_MINUTES)
+        self.heap = ReminderHeap()
+        self.version = None
+        self.window_end = None
+        self._dispatch = dispatch
+        self.coordinator = coordinator
+
+    @property
+    def shards(self):
+        return None if self.coordinator is None else sorted(self.coordinator.owned)
+
+    def dispatch(self, ids):
+        if self._dispatch is not None:
+            return self._dispatch(ids)
+        from .tasks import dispatch_due_reminders
+        return dispatch_due_reminders(ids=ids, shards=self.shards)
+
+    def rebalance(self, now) -> bool:
+        """Heartbeat do coordenador quando vence; True se os shards deste nó mudaram."""
+        if self.coordinator is None or not self.coordinator.heartbeat_due(now):
+            return False
+        before = self.coordinator.owned
+        if self.coordinator.heartbeat(now) == before:
+            return False
+        self.version = None
+        return True
+
+    def refresh(self, now) -> bool:
+        version = schedule_version()
+        if version == self.version and self.window_end is not None and now < self.window_end:
+            return False
+        self.window_end = now + self.window
+        # due_at do outbox já é a próxima tentativa para falhas em backoff
+        qs = ReminderOutbox.objects.filter(due_at__lt=self.window_end)
+        if self.coordinator is not None:
+            qs = qs.filter(shard__in=self.coordinator.owned)
+        self.heap.load(qs.values_list('due_at', 'pk'))
+        self.version = version
+        return True
+
+    def tick(self, now=None) -> list[int]:
+        now = now or timezone.now()
+        self.rebalance(now)
+        self.refresh(now)
+        ids = self.heap.pop_due(now)
+        if ids:
+            self.dispatch(ids)
+            self.requeue(ids, now)
+        return ids
+
+    def requeue(self, ids, now) -> None:
+        """Devolve ao heap os ``ids`` que ainda estão no outbox (reservados: depois do lease)."""
+        retry = now + self.retry_after
+        rows = ReminderOutbox.objects.filter(pk__in=ids).values_list('pk', 'due_at', 'claimed_until')
+        for pk, due_at, claimed_until in rows:
+            self.heap.push(max(due_at, retry, claimed_until or retry), pk)
+
+    def seconds_until_next(self, now, max_sleep: float) -> float:
+        wake = [self.heap.next_due()]
+        if self.coordinator is not None:
+            wake.append(self.coordinator.next_heartbeat)
+        wake = [t for t in wake if t is not None]
+        if not wake:
+            return max_sleep
+        return max(0.05, min(max_sleep, (min(wake) - now).total_seconds()))
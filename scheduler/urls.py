@@ -1,12 +1,20 @@
 from rest_framework.routers import DefaultRouter
 from django.urls import path, include
-from .views import EventViewSet, ReminderViewSet, NotificationLogViewSet
+from .views import (
+    EventViewSet, ReminderViewSet, NotificationLogViewSet, InAppNotificationViewSet,
+    FreeBusyView, WebhookEndpointView, calendar_feed,
+)
 
 router = DefaultRouter()
 router.register(r'events', EventViewSet, basename= 'event')
 router.register(r'reminders', ReminderViewSet, basename= 'reminder')
 router.register(r'notifications', NotificationLogViewSet, basename= 'notification')
+router.register(r'inbox', InAppNotificationViewSet, basename= 'inbox')
 
 urlpatterns = [
     path("", include(router.urls)),
+    path("freebusy/", FreeBusyView.as_view(), name="freebusy"),
+    path("webhook/", WebhookEndpointView.as_view(), name="webhook"),
+    # Feed público (autenticado pelo token secreto na URL) para clientes de calendário
+    path("feeds/<str:token>.ics", calendar_feed, name="calendar-feed"),
 ]
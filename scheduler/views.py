@@ -1,29 +1,84 @@
+from datetime import timedelta
+
 from rest_framework import viewsets, permissions, decorators
-from rest_framework.exceptions import PermissionDenied
-from django.http import HttpResponse
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.filters import OrderingFilter
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Count, Max
+from django.http import HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
 from django.utils import timezone
+from django.utils.http import http_date
+from django_filters.rest_framework import DjangoFilterBackend
 
-from .models import Event, Reminder, NotificationLog
-from .serializers import EventSerializer, ReminderSerializer, NotificationLogSerializer
+from .caching import response_cache_key, user_version
+from .models import CalendarFeed, Event, InAppNotification, Reminder, NotificationLog, WebhookEndpoint
+from .serializers import (
+    EventSerializer, ReminderSerializer, NotificationLogSerializer, OccurrenceSerializer,
+    FreeBusyQuerySerializer, InAppNotificationSerializer, WebhookEndpointSerializer,
+)
 from .permissions import IsOwner
 from .filters import EventFilter
+from .pagination import EventPagination, InAppNotificationPagination, ReminderPagination, NotificationLogPagination
+from .recurrence import expand_events
+from .freebusy import busy_intervals, free_slots
+from .ics import aiter_calendar, iter_calendar
+from .search import FullTextSearchFilter
+from .services import apply_event_batch, import_ics, prepare_event, requeue_reminders
+
+
+def _parse_id(value):
+    """Id inteiro positivo vindo do corpo JSON (int ou string de dígitos), ou None se inválido."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, str) and value.strip().isdigit():
+        value = int(value)
+    return value if isinstance(value, int) and value > 0 else None
+
+
+class VersionedCacheMixin:
+    """
+    Cacheia as respostas de ``list``/``retrieve`` por usuário, com a versão da
+    agenda na chave (ver ``caching.bump_user_version``). Uma leitura repetida
+    não toca no banco; qualquer escrita troca a versão e as entradas antigas
+    simplesmente expiram.
+    """
+
+    def _cached(self, handler, request, *args, **kwargs):
+        timeout = settings.EVENT_RESPONSE_CACHE_SECONDS
+        if not timeout:
+            return handler(request, *args, **kwargs)
+        key = response_cache_key(request, user_version(request.user.pk))
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, timeout=timeout)
+        return response
 
+    def list(self, request, *args, **kwargs):
+        return self._cached(super().list, request, *args, **kwargs)
 
-def _ics_escape(value: str) -> str:
-    if value is None:
-        return ''
-    return (
-        value.replace('\\', '\\\\')
-             .replace('\n', '\\n')
-             .replace(',', '\\,')
-             .replace(';', '\\;')
-    )
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached(super().retrieve, request, *args, **kwargs)
 
 
-class EventViewSet(viewsets.ModelViewSet):
+class EventViewSet(VersionedCacheMixin, viewsets.ModelViewSet):
     serializer_class = EventSerializer
     permission_classes = [permissions.IsAuthenticated, IsOwner]
     filterset_class = EventFilter
+    pagination_class = EventPagination
+    filter_backends = [DjangoFilterBackend, OrderingFilter, FullTextSearchFilter]
+    # usados só no fallback sem índice de texto (icontains)
     search_fields = ['title', 'description', 'location']
     ordering_fields = ['start', 'end', 'title']
 
@@ -35,34 +90,106 @@ class EventViewSet(viewsets.ModelViewSet):
             raise PermissionDenied('Sem permissão.')
         instance.delete()
 
+    @decorators.action(detail=False, methods=['get'])
+    def occurrences(self, request):
+        # Expande séries só dentro da janela pedida (start_after + end_before, ou date)
+        window_start, window_end = EventFilter(request.query_params, request=request).window()
+        if window_start is None or window_end is None:
+            raise ValidationError({'detail': 'Informe start_after e end_before (ou date).'})
+        if window_end - window_start > timedelta(days=settings.EVENT_OCCURRENCES_MAX_DAYS):
+            raise ValidationError({'detail': f'Janela máxima: {settings.EVENT_OCCURRENCES_MAX_DAYS} dias.'})
+
+        events = self.filter_queryset(Event.objects.filter(owner=request.user))
+        occurrences = expand_events(events, window_start, window_end)
+        return Response(OccurrenceSerializer(occurrences, many=True).data)
+
+    @decorators.action(detail=False, methods=['get', 'post'])
+    def feed(self, request):
+        # GET devolve (e cria, se preciso) o link do feed; POST gera um link novo
+        feed, _ = CalendarFeed.objects.get_or_create(user=request.user)
+        if request.method == 'POST':
+            feed.rotate()
+        url = request.build_absolute_uri(reverse('calendar-feed', args=[feed.token]))
+        return Response({'url': url})
+
+    @decorators.action(detail=False, methods=['post'])
+    def batch(self, request):
+        """
+        Aplica centenas de upserts/exclusões numa requisição só.
+
+        Corpo: ``{"upserts": [{...evento, "id"?}], "deletes": [ids]}``. Itens com
+        ``id`` atualizam (parcialmente), sem ``id`` criam. Itens inválidos voltam
+        com os erros e não impedem os demais; os válidos são gravados com
+        operações em lote numa única transação.
+        """
+        if not isinstance(request.data, dict):
+            raise ValidationError({'detail': 'O corpo deve ser um objeto JSON.'})
+        upserts = request.data.get('upserts', [])
+        deletes = request.data.get('deletes', [])
+        if not isinstance(upserts, list) or not isinstance(deletes, list):
+            raise ValidationError({'detail': 'Use listas em "upserts" e "deletes".'})
+        if len(upserts) + len(deletes) > settings.EVENT_BATCH_MAX_ITEMS:
+            raise ValidationError({'detail': f'Máximo de {settings.EVENT_BATCH_MAX_ITEMS} itens por lote.'})
+
+        # ids já validados: None cria, int atualiza, False é um id inválido
+        upsert_ids = []
+        for item in upserts:
+            raw = item.get('id') if isinstance(item, dict) else None
+            upsert_ids.append(None if raw in (None, '') else (_parse_id(raw) or False))
+        delete_ids = [_parse_id(value) for value in deletes]
+
+        existing = Event.objects.filter(owner=request.user).in_bulk([pk for pk in upsert_ids if pk])
+        creates, updates, results, seen = [], [], [], set()
+        for index, (item, pk) in enumerate(zip(upserts, upsert_ids)):
+            if pk is False:
+                results.append({'index': index, 'status': 'error', 'errors': {'id': 'Id inválido.'}})
+                continue
+            instance = existing.get(pk) if pk else None
+            if not isinstance(item, dict) or (pk and instance is None) or (pk and pk in seen):
+                results.append({'index': index, 'status': 'error', 'errors': {'id': 'Item inválido, repetido ou evento não encontrado.'}})
+                continue
+            seen.add(pk)
+            serializer = self.get_serializer(instance, data=item, partial=instance is not None)
+            if not serializer.is_valid():
+                results.append({'index': index, 'status': 'error', 'errors': serializer.errors})
+                continue
+            data = dict(serializer.validated_data)
+            reminders_data = data.pop('reminders', None)
+            event = instance or Event(owner=request.user)
+            for attr, val in data.items():
+                setattr(event, attr, val)
+            try:
+                prepare_event(event)
+            except DjangoValidationError as exc:
+                results.append({'index': index, 'status': 'error', 'errors': exc.message_dict})
+                continue
+            (updates if instance else creates).append((event, reminders_data))
+            results.append({'index': index, 'status': 'updated' if instance else 'created', 'event': event})
+
+        deleted = set(apply_event_batch(request.user, creates, updates, [pk for pk in delete_ids if pk]))
+        for result in results:
+            if 'event' in result:
+                result['id'] = result.pop('event').pk
+        delete_results = []
+        for value, pk in zip(deletes, delete_ids):
+            if pk is None:
+                delete_results.append({'id': value, 'status': 'error', 'errors': {'id': 'Id inválido.'}})
+            else:
+                delete_results.append({'id': pk, 'status': 'deleted' if pk in deleted else 'not_found'})
+        return Response({'upserts': results, 'deletes': delete_results})
+
+    @decorators.action(detail=False, methods=['post'], url_path='import/ics', parser_classes=[MultiPartParser])
+    def import_calendar(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValidationError({'file': 'Envie o arquivo .ics no campo "file".'})
+        result = import_ics(request.user, upload)
+        return Response(result)
+
     @decorators.action(detail=True, methods=['get'], url_path='export/ics')
     def export_ics(self, request, pk=None):
         event = self.get_object()
-        start = timezone.localtime(event.start).strftime('%Y%m%dT%H%M%S')
-        end = timezone.localtime(event.end).strftime('%Y%m%dT%H%M%S')
-        dtstamp = timezone.now().strftime('%Y%m%dT%H%M%S')
-
-        summary = _ics_escape(event.title or '')
-        description = _ics_escape(event.description or '')
-        location = _ics_escape(event.location or '')
-
-        ics = ''.join([
-            'BEGIN:VCALENDAR\r\n',
-            'VERSION:2.0\r\n',
-            'PRODID:-//Agenda//PT-BR//EN\r\n',
-            'CALSCALE:GREGORIAN\r\n',
-            'METHOD:PUBLISH\r\n',
-            'BEGIN:VEVENT\r\n',
-            f'UID:event-{event.id}@agenda\r\n',
-            f'DTSTAMP:{dtstamp}\r\n',
-            f'DTSTART:{start}\r\n',
-            f'DTEND:{end}\r\n',
-            f'SUMMARY:{summary}\r\n',
-            f'DESCRIPTION:{description}\r\n',
-            f'LOCATION:{location}\r\n',
-            'END:VEVENT\r\n',
-            'END:VCALENDAR\r\n',
-        ])
+        ics = ''.join(iter_calendar([event]))
         resp = HttpResponse(ics, content_type='text/calendar; charset=utf-8')
         resp['Content-Disposition'] = f'attachment; filename="event-{event.id}.ics"'
         return resp
@@ -71,6 +198,7 @@ class EventViewSet(viewsets.ModelViewSet):
 class ReminderViewSet(viewsets.ModelViewSet):
     serializer_class = ReminderSerializer
     permission_classes = [permissions.IsAuthenticated, IsOwner]
+    pagination_class = ReminderPagination
     ordering_fields = ['scheduled_for', 'minutes_before']
 
     def get_queryset(self):
@@ -82,11 +210,150 @@ class ReminderViewSet(viewsets.ModelViewSet):
             raise PermissionDenied('Sem permissão para adicionar lembrete a este evento.')
         serializer.save()
 
+    @decorators.action(detail=False, methods=['get'], url_path='dead-letter')
+    def dead_letter(self, request):
+        # lembretes que esgotaram as tentativas de envio
+        qs = self.filter_queryset(self.get_queryset().filter(dead_lettered_at__isnull=False))
+        page = self.paginate_queryset(qs)
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+    @decorators.action(detail=False, methods=['post'], url_path='dead-letter/requeue')
+    def requeue_dead_letter(self, request):
+        # corpo opcional {"ids": [...]}; sem ids devolve todo o dead-letter do usuário
+        if not isinstance(request.data, dict):
+            raise ValidationError({'detail': 'O corpo deve ser um objeto JSON.'})
+        qs = self.get_queryset().filter(dead_lettered_at__isnull=False)
+        ids = request.data.get('ids')
+        if ids is not None:
+            parsed = [_parse_id(value) for value in ids] if isinstance(ids, list) else [None]
+            if None in parsed:
+                raise ValidationError({'ids': 'Use uma lista de ids inteiros.'})
+            qs = qs.filter(pk__in=parsed)
+        return Response({'requeued': requeue_reminders(qs)})
+
+    @decorators.action(detail=True, methods=['post'])
+    def requeue(self, request, pk=None):
+        reminder = self.get_object()
+        if reminder.is_sent:
+            raise ValidationError({'detail': 'Lembrete já enviado.'})
+        requeue_reminders(Reminder.objects.filter(pk=reminder.pk))
+        reminder.refresh_from_db()
+        return Response(self.get_serializer(reminder).data)
+
 
 class NotificationLogViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = NotificationLogSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = NotificationLogPagination
     ordering_fields = ['created_at']
 
     def get_queryset(self):
         return NotificationLog.objects.filter(user=self.request.user).select_related('event', 'reminder')
+
+
+class InAppNotificationViewSet(viewsets.ReadOnlyModelViewSet):
+    serializer_class = InAppNotificationSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = InAppNotificationPagination
+    filterset_fields = {'read_at': ['isnull']}
+
+    def get_queryset(self):
+        return InAppNotification.objects.filter(user=self.request.user)
+
+    @decorators.action(detail=True, methods=['post'])
+    def read(self, request, pk=None):
+        notification = self.get_object()
+        if notification.read_at is None:
+            notification.read_at = timezone.now()
+            notification.save(update_fields=['read_at'])
+        return Response(self.get_serializer(notification).data)
+
+    @decorators.action(detail=False, methods=['post'], url_path='read-all')
+    def read_all(self, request):
+        count = self.get_queryset().filter(read_at__isnull=True).update(read_at=timezone.now())
+        return Response({'read': count})
+
+
+class WebhookEndpointView(APIView):
+    """``/api/webhook/``: URL que recebe os lembretes do canal webhook (GET, PUT, DELETE)."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        endpoint = get_object_or_404(WebhookEndpoint, user=request.user)
+        return Response(WebhookEndpointSerializer(endpoint).data)
+
+    def put(self, request):
+        endpoint = WebhookEndpoint.objects.filter(user=request.user).first()
+        serializer = WebhookEndpointSerializer(endpoint, data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(user=request.user)
+        return Response(serializer.data)
+
+    def delete(self, request):
+        WebhookEndpoint.objects.filter(user=request.user).delete()
+        return Response(status=204)
+
+
+class FreeBusyView(APIView):
+    """
+    ``GET /api/freebusy/?start=...&end=...&users=1,2``
+
+    Intervalos ocupados (já unidos) e livres de cada usuário no período. Só
+    horários são expostos, nunca títulos ou detalhes dos eventos. Consultar
+    outros usuários exige a permissão ``scheduler.view_others_freebusy``.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        query = FreeBusyQuerySerializer(data=request.query_params, context={'request': request})
+        query.is_valid(raise_exception=True)
+        start, end = query.validated_data['start'], query.validated_data['end']
+        user_ids = query.validated_data.get('users') or [request.user.pk]
+
+        busy = busy_intervals(user_ids, start, end)
+        return Response({
+            'start': start,
+            'end': end,
+            'users': [
+                {
+                    'user': uid,
+                    'busy': [{'start': s, 'end': e} for s, e in busy[uid]],
+                    'free': [{'start': s, 'end': e} for s, e in free_slots(busy[uid], start, end)],
+                }
+                for uid in user_ids
+            ],
+        })
+
+
+def calendar_feed(request, token):
+    """
+    Feed ICS assinável com todos os eventos do dono do token.
+
+    O documento é gerado em streaming e vem com ETag/Last-Modified derivados
+    de ``Event.updated_at``: clientes que fazem polling recebem 304 sem
+    regenerar nada. Sob ASGI o conteúdo precisa ser um iterador assíncrono
+    (um síncrono é lido inteiro na memória antes de ir para o cliente), então
+    usa ``aiterator()``; sob WSGI, ``iterator()``.
+    """
+    feed = get_object_or_404(CalendarFeed.objects.select_related('user'), token=token)
+    events = Event.objects.filter(owner=feed.user)
+    stats = events.aggregate(last=Max('updated_at'), total=Count('id'))
+    last_modified = int(stats['last'].timestamp()) if stats['last'] else None
+    # a contagem entra na ETag para que exclusões também invalidem o feed
+    etag = f'"{stats["total"]}-{stats["last"].timestamp() if stats["last"] else 0}"'
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    events = events.order_by('start', 'id')
+    if isinstance(request, ASGIRequest):
+        content = aiter_calendar(events.aiterator(chunk_size=500))
+    else:
+        content = iter_calendar(events.iterator(chunk_size=500))
+    resp = StreamingHttpResponse(content, content_type='text/calendar; charset=utf-8')
+    resp['ETag'] = etag
+    if last_modified is not None:
+        resp['Last-Modified'] = http_date(last_modified)
+    resp['Cache-Control'] = 'private, no-cache'
+    return resp
@@ -1,13 +1,17 @@
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, redirect, get_object_or_404
-from django.forms import ModelForm
+from django.core.exceptions import ValidationError
+from django.forms import BooleanField, ModelForm
 from django.forms.widgets import DateTimeInput
 
+from .conflicts import find_conflicts
 from .models import Event
 
 
 class EventForm(ModelForm):
+    check_conflicts = BooleanField(required=False, initial=True, label='Avisar sobre conflitos de horário')
+
     class Meta:
         model = Event
         fields = ['title', 'description', 'location', 'start', 'end', 'is_all_day']
@@ -25,6 +29,19 @@ class EventForm(ModelForm):
         self.fields['end'].input_formats = [fmt]
         self._user = user  # guardamos o usuário para o save()
 
+    def clean(self):
+        data = super().clean()
+        start, end = data.get('start'), data.get('end')
+        if data.get('check_conflicts') and start and end:
+            if data.get('is_all_day'):
+                start, end = Event.all_day_bounds(start, end)
+            owner = self.instance.owner_id if self.instance.pk else self._user.pk
+            conflicts = find_conflicts(owner, start, end, exclude_pk=self.instance.pk)
+            if conflicts:
+                titles = ', '.join(f'"{e.title}"' for e in conflicts)
+                raise ValidationError(f'Conflita com: {titles}.', code='conflict')
+        return data
+
     def save(self, commit=True):
         obj = super().save(commit=False)
         if not obj.pk: